@@ -1,6 +1,9 @@
+from acquiring import utils
+
 from .adapter import PayPalAdapter, PayPalResponse, PayPalStatusEnum
 from .blocks import PayPalAfterCreatingOrder, PayPalCreateOrder
 from .domain import Amount, Order, OrderIntentEnum, PurchaseUnit
+from .webhooks import PayPalWebhookIngestion
 
 __all__ = [
     "Amount",
@@ -11,5 +14,11 @@ __all__ = [
     "PayPalCreateOrder",
     "PayPalResponse",
     "PayPalStatusEnum",
+    "PayPalWebhookIngestion",
     "PurchaseUnit",
 ]
+
+if utils.is_httpx_installed():
+    from .async_adapter import AsyncPayPalAdapter
+
+    __all__ += ["AsyncPayPalAdapter"]
@@ -1,15 +1,19 @@
 import base64
 import json
+import threading
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from http import HTTPStatus
 from typing import Optional
 from urllib.parse import urljoin
 from uuid import UUID
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from acquiring import domain, protocols
+from acquiring import domain, protocols, utils
 
+from . import tokens, webhook_ids
 from .domain import Order, OrderIntentEnum, PayPalStatusEnum
 
 
@@ -20,6 +24,7 @@ class PayPalResponse:
     raw_data: str
     status: PayPalStatusEnum
     intent: OrderIntentEnum
+    data: dict = field(default_factory=dict)  # raw_data, parsed only once
 
 
 GET_ACCESS_TOKEN = "v1/oauth2/token"
@@ -32,6 +37,15 @@ class PayPalAdapter:
     """
     PayPal APIs use REST, authenticate with OAuth 2.0 access tokens,
     and return HTTP response codes and responses encoded in JSON.
+
+    Every request goes through a pool of keep-alive connections, so that only the first one
+    pays for the TCP and TLS handshakes. pool_maxsize is best sized to the number of threads calling PayPal.
+
+    Access tokens are shared by every adapter of the process with the same client_id and base_url (see tokens.py),
+    and so are webhook subscriptions for the same callback_url (see webhook_ids.py).
+
+    Orders go through resilience, which retries timeouts, dropped connections and 5xx responses.
+    That is safe because PayPal deduplicates requests with the same PayPal-Request-Id.
     """
 
     base_url: str
@@ -41,20 +55,26 @@ class PayPalAdapter:
     provider_name: str = "paypal"
     webhook_id: Optional[str] = None
 
-    access_token: str = field(init=False, repr=False)
-    scope: list[str] = field(init=False, repr=False)
-    expires_in: int = field(init=False, repr=False)
+    pool_connections: int = 10  # Number of hosts to keep a pool for
+    pool_maxsize: int = 10  # Connections kept alive per host
+    connect_timeout: float = 3.05  # seconds
+    read_timeout: float = 30  # seconds
+    resilience: domain.Resilience = field(default_factory=domain.Resilience)  # around orders
+
+    http_adapter: HTTPAdapter = field(init=False, repr=False)
+    _local: threading.local = field(init=False, repr=False)
 
     def __repr__(self) -> str:
-        """String representation of the class"""
-        return f"PayPalAdapter:base_url={self.base_url}|access_token={self.access_token}|expires in {self.expires_in} seconds"
+        """String representation of the class, which must neither authenticate nor show the access token"""
+        return f"PayPalAdapter:base_url={self.base_url}|client_id={self.client_id}"
 
     def __post_init__(self) -> None:
         """
-        PayPal integrations use a client ID and client secret to authenticate API calls.
+        Building the adapter does not talk to PayPal.
 
-        Exchange your client ID and client secret for access token, scope,
-        and the number of seconds the access token is valid.
+        PayPal integrations use a client ID and client secret to authenticate API calls.
+        They get exchanged for an access token on first use (or on warm_up),
+        and webhook events get subscribed to on the first order, unless webhook_id is provided.
 
         See
         https://developer.paypal.com/api/rest/#link-sampleresponse
@@ -63,9 +83,117 @@ class PayPalAdapter:
         if not self.base_url.endswith("/"):
             raise BadUrlError("base_url must end with /")
 
-        self._authenticate()
+        self.http_adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        self._local = threading.local()
+
+    def warm_up(self) -> None:
+        """
+        Authenticate and subscribe to webhook events right away, rather than on first use.
+
+        Meant for worker start-up, when failing early is preferable.
+        Raises UnauthorizedError, or Resilience.Unavailable when PayPal cannot be reached.
+        """
+        self._get_token()
+        self._ensure_webhook()
+
+    def register_webhook(self) -> str:
+        """
+        Subscribe callback_url to every webhook event, and return the id of the webhook.
+
+        Meant to be called once at deploy time, so that adapters get built with that webhook_id
+        and never subscribe again.
+        """
+        webhook_id = self._subscribe_to_webhook_events()
+        webhook_ids.webhook_registry.set(self._webhook_key, webhook_id)
+        self.webhook_id = webhook_id
+        return webhook_id
+
+    def _ensure_webhook(self) -> str:
         if self.webhook_id is None:
-            self._subscribe_to_webhook_events()
+            self.webhook_id = webhook_ids.webhook_registry.get(self._webhook_key, self._subscribe_to_webhook_events)
+        return self.webhook_id
+
+    @property
+    def _webhook_key(self) -> webhook_ids.WebhookKey:
+        return (self.client_id, self.base_url, self.callback_url)
+
+    @property
+    def _token_key(self) -> tokens.TokenKey:
+        return (self.client_id, self.base_url)
+
+    def _get_token(self) -> tokens.AccessToken:
+        return tokens.token_cache.get(self._token_key, self._authenticate)
+
+    @property
+    def access_token(self) -> str:
+        return self._get_token().access_token
+
+    @property
+    def scope(self) -> list[str]:
+        return self._get_token().scope
+
+    @property
+    def expires_in(self) -> int:
+        """Seconds until the current access token expires"""
+        return int(self._get_token().remaining)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        requests.Session is not guaranteed to be thread safe, so each thread gets its own,
+        all of them sharing the same pool of connections through http_adapter.
+        """
+        session: Optional[requests.Session] = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.http_adapter)
+            session.mount("http://", self.http_adapter)
+            self._local.session = session
+        return session
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        """See https://requests.readthedocs.io/en/latest/user/advanced/#timeouts"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def close(self) -> None:
+        """Closes the connections kept alive in the pool"""
+        self.http_adapter.close()
+
+    def _post_with_access_token(
+        self,
+        url: str,
+        headers: dict[str, str],
+        json: Optional[dict] = None,
+        data: Optional[str] = None,
+        read_timeout: Optional[float] = None,
+    ) -> requests.Response:
+        """
+        POST authorized with the cached access token.
+
+        If PayPal rejects the token (e.g. it got revoked before expiring), retry once with a new one.
+        """
+        timeout = self.timeout if read_timeout is None else (self.connect_timeout, read_timeout)
+        token = self._get_token()
+        response = self.session.post(
+            url,
+            headers={**headers, "Authorization": f"Bearer {token.access_token}"},
+            json=json,
+            data=data,
+            timeout=timeout,
+        )
+        if response.status_code != HTTPStatus.UNAUTHORIZED:
+            return response
+
+        tokens.token_cache.invalidate(self._token_key, token)
+        token = self._get_token()
+        return self.session.post(
+            url,
+            headers={**headers, "Authorization": f"Bearer {token.access_token}"},
+            json=json,
+            data=data,
+            timeout=timeout,
+        )
 
     @domain.wrapped_by_transaction
     def create_order(
@@ -80,61 +208,35 @@ class PayPalAdapter:
         headers = {
             "Content-Type": "application/json",
             "PayPal-Request-Id": str(request_id),
-            "Authorization": f"Bearer {self.access_token}",
             "Prefer": "return=representation",
         }
-        data = {
-            "intent": order.intent,
-            "purchase_units": [
-                {
-                    "reference_id": str(purchase_unit.reference_id),
-                    "amount": {
-                        "currency_code": purchase_unit.amount.currency_code,
-                        "value": purchase_unit.amount.value,
-                    },
-                }
-                for purchase_unit in order.purchase_units
-            ],
-            "payment_source": {
-                "paypal": {
-                    "experience_context": {
-                        "payment_method_preference": "IMMEDIATE_PAYMENT_REQUIRED",
-                        "locale": "en-US",
-                        "shipping_preference": "NO_SHIPPING",
-                        "user_action": "PAY_NOW",
-                        "return_url": "https://example.com/returnUrl",
-                        "cancel_url": "https://example.com/cancelUrl",
-                    },
-                },
-            },
-        }
+
+        def post(read_timeout: Optional[float]) -> requests.Response:
+            # Authenticating and subscribing to webhook events on the first order get retried along with it
+            self._ensure_webhook()
+            try:
+                response = self._post_with_access_token(
+                    url, json=order_data(order, payment_method), headers=headers, read_timeout=read_timeout
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exception:
+                raise domain.Resilience.Unavailable(str(exception))
+            if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                raise domain.Resilience.Unavailable(response.text)
+            return response
 
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = self.resilience.call(CREATE_ORDER, post)
             response.raise_for_status()
+        except domain.Resilience.Unavailable as exception:
+            return order_response(str(exception), order, failed=True)
         except requests.exceptions.HTTPError:
-            return PayPalResponse(
-                external_id=None,
-                timestamp=None,
-                raw_data=response.text,
-                status=PayPalStatusEnum.FAILED,
-                intent=order.intent,
-            )
+            return order_response(response.text, order, failed=True)
+        except UnauthorizedError as exception:
+            return order_response(str(exception), order, failed=True)
 
-        serialized_response = response.json()
-        return PayPalResponse(
-            external_id=serialized_response["id"],
-            timestamp=(
-                datetime.fromisoformat(serialized_response["create_time"])
-                if serialized_response.get("create_time")
-                else datetime.now(timezone.utc)
-            ),
-            raw_data=response.text,
-            status=PayPalStatusEnum(serialized_response["status"]),
-            intent=OrderIntentEnum(serialized_response["intent"]),
-        )
+        return order_response(response.text, order)
 
-    def _authenticate(self) -> None:
+    def _authenticate(self) -> tokens.AccessToken:
         url = urljoin(self.base_url, GET_ACCESS_TOKEN)
 
         credentials_b64 = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
@@ -145,29 +247,35 @@ class PayPalAdapter:
         }
 
         try:
-            response = requests.post(url, headers=headers, data={"grant_type": "client_credentials"})
-            response.raise_for_status()
-
-            serialized_response = response.json()
-            self.scope = serialized_response["scope"].split(" ")
-            self.access_token = serialized_response["access_token"]
-            self.expires_in = serialized_response["expires_in"]
+            response = self.session.post(
+                url, headers=headers, data={"grant_type": "client_credentials"}, timeout=self.timeout
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exception:
+            raise domain.Resilience.Unavailable(str(exception))
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise domain.Resilience.Unavailable(response.text)  # an outage, rather than bad credentials
 
+        try:
+            response.raise_for_status()
         except requests.exceptions.HTTPError as exception:
             raise UnauthorizedError(*exception.args)
 
-    def _subscribe_to_webhook_events(self) -> None:
-        assert self.access_token is not None
+        serialized_response = response.json()
+        return tokens.AccessToken(
+            access_token=serialized_response["access_token"],
+            scope=serialized_response["scope"].split(" "),
+            expires_in=serialized_response["expires_in"],
+        )
 
+    def _subscribe_to_webhook_events(self) -> str:
         url = urljoin(self.base_url, CREATE_WEBHOOK)
 
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.access_token}",
         }
 
         try:
-            response = requests.post(
+            response = self._post_with_access_token(
                 url,
                 headers=headers,
                 data=json.dumps(
@@ -179,11 +287,78 @@ class PayPalAdapter:
                     }
                 ),
             )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exception:
+            raise domain.Resilience.Unavailable(str(exception))
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise domain.Resilience.Unavailable(response.text)
+
+        try:
             response.raise_for_status()
         except requests.exceptions.HTTPError:
             raise UnauthorizedError(response.text)
 
-        self.webhook_id = response.json()["id"]
+        return response.json()["id"]
+
+
+def order_data(order: Order, payment_method: "protocols.PaymentMethod") -> dict:
+    """
+    Body of the request that creates order in PayPal.
+
+    Every purchase unit carries the id of payment_method as custom_id,
+    which PayPal echoes back in webhooks (see webhooks.PayPalWebhookIngestion).
+    """
+    return {
+        "intent": order.intent,
+        "purchase_units": [
+            {
+                "reference_id": str(purchase_unit.reference_id),
+                "custom_id": str(payment_method.id),
+                "amount": {
+                    "currency_code": purchase_unit.amount.currency_code,
+                    "value": purchase_unit.amount.value,
+                },
+            }
+            for purchase_unit in order.purchase_units
+        ],
+        "payment_source": {
+            "paypal": {
+                "experience_context": {
+                    "payment_method_preference": "IMMEDIATE_PAYMENT_REQUIRED",
+                    "locale": "en-US",
+                    "shipping_preference": "NO_SHIPPING",
+                    "user_action": "PAY_NOW",
+                    "return_url": "https://example.com/returnUrl",
+                    "cancel_url": "https://example.com/cancelUrl",
+                },
+            },
+        },
+    }
+
+
+def order_response(raw_data: str, order: Order, failed: bool = False) -> PayPalResponse:
+    """PayPalResponse out of the body PayPal responded with when creating order"""
+    if failed:
+        return PayPalResponse(
+            external_id=None,
+            timestamp=None,
+            raw_data=raw_data,
+            status=PayPalStatusEnum.FAILED,
+            intent=order.intent,
+        )
+
+    serialized_response = utils.json_loads(raw_data)
+    return PayPalResponse(
+        external_id=serialized_response["id"],
+        timestamp=(
+            datetime.fromisoformat(serialized_response["create_time"])
+            if serialized_response.get("create_time")
+            else datetime.now(timezone.utc)
+        ),
+        raw_data=raw_data,
+        status=PayPalStatusEnum(serialized_response["status"]),
+        intent=OrderIntentEnum(serialized_response["intent"]),
+        data=serialized_response,
+    )
 
 
 class UnauthorizedError(Exception):
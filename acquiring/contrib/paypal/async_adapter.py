@@ -0,0 +1,240 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import urljoin
+from uuid import UUID
+
+import httpx
+
+from acquiring import domain, protocols
+
+from . import tokens, webhook_ids
+from .adapter import (
+    CREATE_ORDER,
+    CREATE_WEBHOOK,
+    GET_ACCESS_TOKEN,
+    BadUrlError,
+    UnauthorizedError,
+    order_data,
+    order_response,
+)
+from .domain import Order
+
+
+@dataclass
+class AsyncPayPalAdapter:
+    """
+    Same as PayPalAdapter, on top of httpx.AsyncClient, so that many orders can be in flight
+    from a single thread of an ASGI worker.
+
+    The client pools up to max_connections connections, keeping max_keepalive_connections of them alive.
+    It is best built and used inside the same event loop, and closed with aclose once done.
+
+    Access tokens and webhook subscriptions are shared with every PayPalAdapter and AsyncPayPalAdapter of the process.
+    Orders go through resilience, as in PayPalAdapter.
+    """
+
+    base_url: str
+    callback_url: str
+    client_id: str
+    client_secret: str
+    provider_name: str = "paypal"
+    webhook_id: Optional[str] = None
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    connect_timeout: float = 3.05  # seconds
+    read_timeout: float = 30  # seconds
+    resilience: domain.Resilience = field(default_factory=domain.Resilience)  # around orders
+
+    client: httpx.AsyncClient = field(init=False, repr=False)
+
+    def __repr__(self) -> str:
+        """String representation of the class, which must neither authenticate nor show the access token"""
+        return f"AsyncPayPalAdapter:base_url={self.base_url}|client_id={self.client_id}"
+
+    def __post_init__(self) -> None:
+        """
+        Building the adapter does not talk to PayPal.
+
+        See PayPalAdapter.__post_init__
+        """
+        if not self.base_url.endswith("/"):
+            raise BadUrlError("base_url must end with /")
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+        )
+
+    async def __aenter__(self) -> "AsyncPayPalAdapter":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the connections kept alive in the pool"""
+        await self.client.aclose()
+
+    async def warm_up(self) -> None:
+        """See PayPalAdapter.warm_up"""
+        await self._get_token()
+        await self._ensure_webhook()
+
+    async def _ensure_webhook(self) -> str:
+        if self.webhook_id is None:
+            self.webhook_id = await webhook_ids.webhook_registry.aget(
+                self._webhook_key, self._subscribe_to_webhook_events
+            )
+        return self.webhook_id
+
+    @property
+    def _webhook_key(self) -> webhook_ids.WebhookKey:
+        return (self.client_id, self.base_url, self.callback_url)
+
+    @property
+    def _token_key(self) -> tokens.TokenKey:
+        return (self.client_id, self.base_url)
+
+    async def _get_token(self) -> tokens.AccessToken:
+        return await tokens.token_cache.aget(self._token_key, self._authenticate)
+
+    async def _post_with_access_token(
+        self,
+        url: str,
+        headers: dict[str, str],
+        json: Optional[dict] = None,
+        content: Optional[str] = None,
+        read_timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """See PayPalAdapter._post_with_access_token"""
+        timeout = (
+            self.client.timeout if read_timeout is None else httpx.Timeout(read_timeout, connect=self.connect_timeout)
+        )
+        token = await self._get_token()
+        response = await self.client.post(
+            url,
+            headers={**headers, "Authorization": f"Bearer {token.access_token}"},
+            json=json,
+            content=content,
+            timeout=timeout,
+        )
+        if response.status_code != HTTPStatus.UNAUTHORIZED:
+            return response
+
+        tokens.token_cache.invalidate(self._token_key, token)
+        token = await self._get_token()
+        return await self.client.post(
+            url,
+            headers={**headers, "Authorization": f"Bearer {token.access_token}"},
+            json=json,
+            content=content,
+            timeout=timeout,
+        )
+
+    @domain.wrapped_by_transaction
+    async def create_order(
+        self,
+        unit_of_work: "protocols.AsyncUnitOfWork",
+        payment_method: "protocols.PaymentMethod",
+        request_id: UUID,
+        order: Order,
+    ) -> "protocols.AdapterResponse":
+        url = urljoin(self.base_url, CREATE_ORDER)
+
+        headers = {
+            "Content-Type": "application/json",
+            "PayPal-Request-Id": str(request_id),
+            "Prefer": "return=representation",
+        }
+
+        async def post(read_timeout: Optional[float]) -> httpx.Response:
+            await self._ensure_webhook()  # see PayPalAdapter.create_order
+            try:
+                response = await self._post_with_access_token(
+                    url, json=order_data(order, payment_method), headers=headers, read_timeout=read_timeout
+                )
+            except httpx.TransportError as exception:
+                raise domain.Resilience.Unavailable(str(exception))
+            if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                raise domain.Resilience.Unavailable(response.text)
+            return response
+
+        try:
+            response = await self.resilience.acall(CREATE_ORDER, post)
+            response.raise_for_status()
+        except domain.Resilience.Unavailable as exception:
+            return order_response(str(exception), order, failed=True)
+        except httpx.HTTPStatusError:
+            return order_response(response.text, order, failed=True)
+        except UnauthorizedError as exception:
+            return order_response(str(exception), order, failed=True)
+
+        return order_response(response.text, order)
+
+    async def _authenticate(self) -> tokens.AccessToken:
+        url = urljoin(self.base_url, GET_ACCESS_TOKEN)
+
+        credentials_b64 = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+
+        headers = {
+            "Authorization": f"Basic {credentials_b64}",
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+
+        try:
+            response = await self.client.post(url, headers=headers, data={"grant_type": "client_credentials"})
+        except httpx.TransportError as exception:
+            raise domain.Resilience.Unavailable(str(exception))
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise domain.Resilience.Unavailable(response.text)  # an outage, rather than bad credentials
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exception:
+            raise UnauthorizedError(*exception.args)
+
+        serialized_response = response.json()
+        return tokens.AccessToken(
+            access_token=serialized_response["access_token"],
+            scope=serialized_response["scope"].split(" "),
+            expires_in=serialized_response["expires_in"],
+        )
+
+    async def _subscribe_to_webhook_events(self) -> str:
+        url = urljoin(self.base_url, CREATE_WEBHOOK)
+
+        headers = {
+            "Content-Type": "application/json",
+        }
+
+        try:
+            response = await self._post_with_access_token(
+                url,
+                headers=headers,
+                content=json.dumps(
+                    {
+                        "url": f"{self.callback_url}",
+                        "event_types": [
+                            {"name": "*"},
+                        ],
+                    }
+                ),
+            )
+        except httpx.TransportError as exception:
+            raise domain.Resilience.Unavailable(str(exception))
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise domain.Resilience.Unavailable(response.text)
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            raise UnauthorizedError(response.text)
+
+        return response.json()["id"]
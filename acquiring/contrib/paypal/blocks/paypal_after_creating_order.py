@@ -15,15 +15,18 @@ class PayPalAfterCreatingOrder:
         webhook_data: paypal.domain.PayPalWebhookData,
     ) -> "protocols.BlockResponse":
         with unit_of_work as uow:
-            uow.transactions.add(
-                domain.Transaction(
-                    external_id=webhook_data.id,
-                    timestamp=webhook_data.create_time,
-                    raw_data=webhook_data.raw_data,
-                    provider_name="paypal",
-                    payment_method_id=payment_method.id,
+            try:
+                uow.transactions.add(
+                    domain.Transaction(
+                        external_id=webhook_data.id,
+                        timestamp=webhook_data.create_time,
+                        raw_data=webhook_data.raw_data,
+                        provider_name="paypal",
+                        payment_method_id=payment_method.id,
+                    )
                 )
-            )
+            except domain.Transaction.Duplicated:
+                pass  # a redelivery of this event got stored meanwhile, so it has already been processed
             uow.commit()
 
         if webhook_data.event_type == "CHECKOUT.ORDER.APPROVED":
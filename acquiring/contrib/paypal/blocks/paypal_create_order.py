@@ -1,4 +1,3 @@
-import json
 import uuid
 from dataclasses import dataclass
 from typing import Sequence
@@ -54,7 +53,7 @@ class PayPalCreateOrder:
                 error_message=str(response.raw_data),
             )
 
-        parsed_data = self._parse_response_data(json.loads(response.raw_data))
+        parsed_data = self._parse_response_data(response.data)
 
         return domain.BlockResponse(
             status=enums.OperationStatusEnum.COMPLETED,
@@ -0,0 +1,134 @@
+"""
+Process-wide cache of PayPal OAuth 2.0 access tokens.
+
+Every PayPalAdapter built with the same credentials reuses the same access token,
+instead of exchanging the client ID and client secret again.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+REFRESH_MARGIN = 0.1  # Refresh once less than this fraction of the lifetime of the token is left
+
+
+@dataclass(frozen=True)
+class AccessToken:
+    access_token: str
+    scope: list[str]
+    expires_in: int  # seconds, as returned by PayPal
+    obtained_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def remaining(self) -> float:
+        """Seconds until the access token expires"""
+        return self.obtained_at + self.expires_in - time.monotonic()
+
+    def is_expired(self) -> bool:
+        return self.remaining <= 0
+
+    def is_expiring(self) -> bool:
+        return self.remaining <= self.expires_in * REFRESH_MARGIN
+
+
+TokenKey = tuple[str, str]  # client_id, base_url
+
+
+@dataclass
+class TokenCache:
+    """
+    Thread safe cache of access tokens, keyed by client ID and base URL.
+
+    An expired token (or a missing one) gets fetched while the caller waits.
+    A token that is about to expire is still returned, while a background thread fetches the next one.
+
+    aget does the same for coroutines, fetching in a task of the running event loop instead of a thread.
+    """
+
+    _tokens: dict[TokenKey, AccessToken] = field(default_factory=dict)
+    _locks: dict[TokenKey, threading.Lock] = field(default_factory=dict)
+    _refreshing: set[TokenKey] = field(default_factory=set)
+    _tasks: dict[TokenKey, "asyncio.Task[AccessToken]"] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _key_lock(self, key: TokenKey) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: TokenKey, fetch: Callable[[], AccessToken]) -> AccessToken:
+        token = self._tokens.get(key)
+        if token is None or token.is_expired():
+            # Only one thread per key talks to PayPal, the rest wait and reuse its token
+            with self._key_lock(key):
+                token = self._tokens.get(key)
+                if token is None or token.is_expired():
+                    token = fetch()
+                    self._tokens[key] = token
+            return token
+
+        if token.is_expiring():
+            self._refresh_in_background(key, fetch)
+        return token
+
+    async def aget(self, key: TokenKey, fetch: Callable[[], Awaitable[AccessToken]]) -> AccessToken:
+        token = self._tokens.get(key)
+        if token is None or token.is_expired():
+            # Shielded, so that a cancelled caller does not cancel the fetch other callers are waiting for
+            return await asyncio.shield(self._fetch_in_task(key, fetch))
+
+        if token.is_expiring():
+            self._fetch_in_task(key, fetch)
+        return token
+
+    def invalidate(self, key: TokenKey, token: AccessToken) -> None:
+        """Drops token (e.g. PayPal rejected it), unless another thread has already replaced it"""
+        with self._key_lock(key):
+            if self._tokens.get(key) is token:
+                del self._tokens[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._refreshing.clear()
+            self._tasks.clear()
+
+    def _refresh_in_background(self, key: TokenKey, fetch: Callable[[], AccessToken]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                with self._key_lock(key):
+                    self._tokens[key] = fetch()
+            except Exception:  # nosec B110 the current token is still valid, next call will try again
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _fetch_in_task(self, key: TokenKey, fetch: Callable[[], Awaitable[AccessToken]]) -> "asyncio.Task[AccessToken]":
+        """Only one task per key talks to PayPal, every coroutine of the same event loop awaits that one"""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return task
+
+        async def fetch_and_store() -> AccessToken:
+            token = await fetch()
+            self._tokens[key] = token
+            return token
+
+        task = loop.create_task(fetch_and_store())
+        # Refreshing in the background leaves nobody to await the task, so its exception gets retrieved here
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._tasks[key] = task
+        return task
+
+
+token_cache = TokenCache()
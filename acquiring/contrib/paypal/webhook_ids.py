@@ -0,0 +1,84 @@
+"""
+Process-wide registry of PayPal webhook subscriptions.
+
+Every PayPalAdapter and AsyncPayPalAdapter built with the same credentials and callback_url reuses the same webhook,
+instead of subscribing to webhook events again.
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+WebhookKey = tuple[str, str, str]  # client_id, base_url, callback_url
+
+
+@dataclass
+class WebhookRegistry:
+    """
+    Thread safe registry of webhook ids, keyed by client ID, base URL and callback URL.
+
+    A missing webhook gets subscribed while the caller waits, by only one thread per key at a time.
+    aget does the same for coroutines, by only one coroutine per event loop at a time.
+    """
+
+    _ids: dict[WebhookKey, str] = field(default_factory=dict)
+    _locks: dict[WebhookKey, threading.Lock] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _async_locks: dict[WebhookKey, tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = field(default_factory=dict)
+
+    def _key_lock(self, key: WebhookKey) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: WebhookKey, subscribe: Callable[[], str]) -> str:
+        webhook_id = self._ids.get(key)
+        if webhook_id is not None:
+            return webhook_id
+
+        # Only one thread per key talks to PayPal, the rest wait and reuse its webhook
+        with self._key_lock(key):
+            webhook_id = self._ids.get(key)
+            if webhook_id is None:
+                webhook_id = subscribe()
+                with self._lock:
+                    # A coroutine may have subscribed in the meantime, the first id stored is the one kept
+                    webhook_id = self._ids.setdefault(key, webhook_id)
+            return webhook_id
+
+    async def aget(self, key: WebhookKey, subscribe: Callable[[], Awaitable[str]]) -> str:
+        webhook_id = self._ids.get(key)
+        if webhook_id is not None:
+            return webhook_id
+
+        # The rest of the coroutines wait for the first one, and reuse its webhook
+        async with self._async_lock(key):
+            webhook_id = self._ids.get(key)
+            if webhook_id is None:
+                webhook_id = await subscribe()
+                with self._lock:
+                    # A thread may have subscribed in the meantime, the first id stored is the one kept
+                    webhook_id = self._ids.setdefault(key, webhook_id)
+            return webhook_id
+
+    def set(self, key: WebhookKey, webhook_id: str) -> None:
+        with self._lock:
+            self._ids[key] = webhook_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self._async_locks.clear()
+
+    def _async_lock(self, key: WebhookKey) -> asyncio.Lock:
+        """asyncio.Lock is bound to the event loop it is first used in, so every event loop gets its own"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            lock_loop, lock = self._async_locks.get(key, (None, None))
+            if lock is None or lock_loop is not loop:
+                lock = asyncio.Lock()
+                self._async_locks[key] = (loop, lock)
+            return lock
+
+
+webhook_registry = WebhookRegistry()
@@ -0,0 +1,283 @@
+"""
+Ingestion of PayPal webhook deliveries in batches.
+
+PayPal retries deliveries until they get acknowledged, and settlements come in bursts,
+so webhooks get acknowledged as soon as they are buffered, and stored many at a time.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional, cast
+from uuid import UUID
+
+from acquiring import domain, enums, protocols, utils
+
+from .blocks import PayPalAfterCreatingOrder
+from .domain import PayPalWebhookData
+
+APPROVED_EVENT_TYPE = "CHECKOUT.ORDER.APPROVED"
+PROVIDER_NAME = "paypal"
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_data(raw_data: str) -> PayPalWebhookData:
+    """PayPalWebhookData out of the body of a webhook delivery"""
+    data = utils.json_loads(raw_data)
+    return PayPalWebhookData(
+        id=data["id"],
+        event_version=data["event_version"],
+        create_time=datetime.fromisoformat(data["create_time"]),
+        resource_type=data["resource_type"],
+        resource_version=data["resource_version"],
+        event_type=data["event_type"],
+        summary=data["summary"],
+        raw_data=raw_data,
+    )
+
+
+def payment_method_id(webhook_data: PayPalWebhookData) -> Optional[UUID]:
+    """
+    Id of the PaymentMethod that the webhook refers to, as sent in the custom_id of the order (see order_data).
+
+    Orders carry it in their purchase units, captures and authorizations carry it in the resource itself.
+    """
+    resource = utils.json_loads(webhook_data.raw_data).get("resource", {})
+    custom_id = resource.get("custom_id") or next(
+        (unit["custom_id"] for unit in resource.get("purchase_units", []) if "custom_id" in unit), None
+    )
+    try:
+        return UUID(custom_id) if custom_id is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class ProcessedEvents:
+    """
+    Thread safe LRU of the ids of the webhook events already received, holding up to max_size of them.
+
+    It sits in front of the transactions table, where every event ends up stored once
+    (see the unique index on provider name and external id), so that most redeliveries never reach the database.
+    """
+
+    max_size: int = 100_000
+
+    _ids: OrderedDict[str, None] = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __contains__(self, id: str) -> bool:
+        with self._lock:
+            if id not in self._ids:
+                return False
+            self._ids.move_to_end(id)
+            return True
+
+    def add(self, id: str) -> bool:
+        """Remembers id, returning False when it was already remembered"""
+        with self._lock:
+            if id in self._ids:
+                self._ids.move_to_end(id)
+                return False
+
+            self._ids[id] = None
+            if len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+
+processed_events = ProcessedEvents()
+
+
+def is_duplicate(
+    unit_of_work: protocols.UnitOfWork,
+    webhook_data: PayPalWebhookData,
+    processed: ProcessedEvents = processed_events,
+) -> bool:
+    """
+    Whether the event has already been stored, to be checked before running PayPalAfterCreatingOrder.
+
+    Only the events missing from processed cost a query.
+    """
+    if webhook_data.id in processed:
+        return True
+
+    with unit_of_work as uow:
+        transactions = cast(protocols.TransactionRepository, uow.transactions)
+        if not transactions.existing_external_ids(PROVIDER_NAME, [webhook_data.id]):
+            return False
+
+    processed.add(webhook_data.id)
+    return True
+
+
+@dataclass
+class PayPalWebhookIngestion:
+    """
+    Buffers webhook deliveries, skipping the events already received, and stores them every batch_size of them.
+
+    A batch gets stored in a single unit of work, with one query for every Transaction in it,
+    and one query per PaymentMethod for the BlockEvents that PayPalAfterCreatingOrder would have added.
+    Once committed, saga.after_pay runs for the PaymentMethods whose orders got approved,
+    so PayPalAfterCreatingOrder must not be one of its after_pay_blocks.
+
+    Redeliveries are skipped as they are received when their event is buffered or processed remembers it,
+    and in a single query per batch otherwise.
+    Deliveries that cannot be traced back to an existing PaymentMethod are dropped.
+    Buffered deliveries have already been acknowledged, so call flush regularly and before the process stops.
+    Events that fail to be stored while the rest of their batch gets stored are set aside in dead_letters.
+    """
+
+    unit_of_work: protocols.UnitOfWork
+    saga: Optional[protocols.PaymentMethodSaga] = None
+    batch_size: int = 500
+    processed: ProcessedEvents = field(default_factory=lambda: processed_events)
+    dead_letters: list[PayPalWebhookData] = field(default_factory=list, init=False, repr=False)  # see _store
+
+    _buffer: list[PayPalWebhookData] = field(default_factory=list, init=False, repr=False)
+    _buffered: set[str] = field(default_factory=set, init=False, repr=False)  # ids of the events in _buffer
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _flush_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def receive(self, raw_data: str) -> bool:
+        """Buffers a webhook delivery, returning False when its event had already been received"""
+        data = webhook_data(raw_data)
+        if data.id in self.processed:
+            return False
+
+        with self._lock:
+            if data.id in self._buffered:
+                return False
+            self._buffered.add(data.id)
+            self._buffer.append(data)
+            if len(self._buffer) < self.batch_size:
+                return True
+
+            batch, self._buffer = self._buffer, []
+
+        self._store(batch)
+        return True
+
+    def flush(self) -> list[protocols.OperationResponse]:
+        """Stores whatever is buffered, returning the responses of saga.after_pay"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        return self._store(batch)
+
+    def _store(self, batch: list[PayPalWebhookData]) -> list[protocols.OperationResponse]:
+        """
+        Stores batch, or puts it back in the buffer to be stored on the next flush when none of it can be stored
+        (e.g. the database is down), as PayPal does not deliver acknowledged events again.
+
+        An event that cannot be stored while the rest of the batch can goes to dead_letters instead,
+        so that it does not hold back every later flush.
+        Events get remembered by processed only once committed.
+        """
+        if not batch:
+            return []
+
+        # The unit of work is not meant to be shared, so batches are stored one at a time
+        with self._flush_lock:
+            failed: list[PayPalWebhookData] = []
+            try:
+                try:
+                    approved = self._store_webhooks(batch)
+                except Exception:
+                    # Another process may have stored some of the events since they were looked up,
+                    # failing the whole batch. Stored one at a time, those get skipped
+                    approved = {}
+                    error: Optional[Exception] = None
+                    for data in batch:
+                        try:
+                            approved.update(self._store_webhooks([data]))
+                        except Exception as exception:
+                            if not is_duplicate(self.unit_of_work, data, self.processed):
+                                failed.append(data)
+                                error = exception
+                    if error is not None and len(failed) == len(batch):
+                        raise error
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = batch
+                raise
+
+        for data in failed:
+            logger.error("PayPal webhook event %s could not be stored, and got set aside in dead_letters", data.id)
+
+        with self._lock:
+            self.dead_letters.extend(failed)
+            for data in batch:
+                if data not in failed:
+                    self.processed.add(data.id)
+                self._buffered.discard(data.id)
+
+        if self.saga is None:
+            return []
+        return [self.saga.after_pay(payment_method) for payment_method in approved.values()]
+
+    def _store_webhooks(self, batch: list[PayPalWebhookData]) -> dict[UUID, protocols.PaymentMethod]:
+        """Stores batch in a single unit of work, returning the PaymentMethods whose orders got approved"""
+        approved: dict[UUID, protocols.PaymentMethod] = {}
+        with self.unit_of_work as uow:
+            transactions = cast(protocols.TransactionRepository, uow.transactions)
+            # Events forgotten by processed, or received by another process
+            stored = transactions.existing_external_ids(PROVIDER_NAME, [data.id for data in batch])
+
+            payment_methods: dict[UUID, protocols.PaymentMethod] = {}
+            webhooks: list[tuple[protocols.PaymentMethod, PayPalWebhookData]] = []
+            for data in batch:
+                if data.id in stored:
+                    continue
+                id = payment_method_id(data)
+                if id is None:
+                    continue
+                if id not in payment_methods:
+                    try:
+                        payment_methods[id] = uow.payment_methods.get(id=id)
+                    except domain.PaymentMethod.DoesNotExist:
+                        continue
+                webhooks.append((payment_methods[id], data))
+
+            transactions.add_many(
+                [
+                    domain.Transaction(
+                        external_id=data.id,
+                        timestamp=data.create_time,
+                        raw_data=data.raw_data,
+                        provider_name=PROVIDER_NAME,
+                        payment_method_id=payment_method.id,
+                    )
+                    for payment_method, data in webhooks
+                ]
+            )
+
+            block_events: dict[UUID, list[protocols.BlockEvent]] = {}
+            for payment_method, data in webhooks:
+                status = (
+                    enums.OperationStatusEnum.COMPLETED
+                    if data.event_type == APPROVED_EVENT_TYPE
+                    else enums.OperationStatusEnum.FAILED
+                )
+                if status == enums.OperationStatusEnum.COMPLETED:
+                    approved[payment_method.id] = payment_method
+                block_events.setdefault(payment_method.id, []).extend(
+                    domain.BlockEvent(
+                        created_at=datetime.now(timezone.utc),
+                        status=block_status,
+                        payment_method_id=payment_method.id,
+                        block_name=PayPalAfterCreatingOrder.__name__,
+                    )
+                    for block_status in (enums.OperationStatusEnum.STARTED, status)
+                )
+            for id, events in block_events.items():
+                cast(protocols.BatchRepository, uow.block_events).add_many(payment_methods[id], events)
+
+            uow.commit()
+        return approved
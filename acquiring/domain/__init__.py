@@ -1,13 +1,23 @@
-from .blocks import BlockResponse, wrapped_by_block_events
+from .async_sagas import AsyncPaymentMethodSaga
+from .blocks import (
+    BlockResponse,
+    async_flush_staged_block_events,
+    flush_staged_block_events,
+    staged_block_events,
+    wrapped_by_block_events,
+)
 from .events import BlockEvent, OperationEvent
 from .payment_attempts import DraftItem, DraftPaymentAttempt, Item, Milestone, PaymentAttempt
 from .payment_methods import DraftPaymentMethod, DraftToken, PaymentMethod, Token
 from .providers import Transaction, wrapped_by_transaction
+from .resilience import CircuitBreaker, Resilience, RetryPolicy
 from .sagas import PaymentMethodSaga
 
 __all__ = [
+    "AsyncPaymentMethodSaga",
     "BlockEvent",
     "BlockResponse",
+    "CircuitBreaker",
     "DraftItem",
     "DraftPaymentAttempt",
     "DraftPaymentMethod",
@@ -17,9 +27,14 @@ __all__ = [
     "PaymentMethodSaga",
     "PaymentMethod",
     "OperationEvent",
+    "Resilience",
+    "RetryPolicy",
     "Milestone",
     "Token",
     "Transaction",
+    "async_flush_staged_block_events",
+    "flush_staged_block_events",
+    "staged_block_events",
     "wrapped_by_block_events",
     "wrapped_by_transaction",
 ]
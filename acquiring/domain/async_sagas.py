@@ -0,0 +1,553 @@
+"""
+Same as sagas.py, for blocks that await on the provider instead of blocking the thread.
+
+The decision logic guarantees do not change: every operation is verified against the same
+decision logic, and the started OperationEvent gets created before running any block.
+"""
+
+import asyncio
+import dataclasses
+import functools
+from dataclasses import dataclass
+from typing import Callable, Coroutine, Optional, Sequence
+
+import deal
+
+import acquiring.domain.decision_logic as dl
+from acquiring import domain, enums, protocols
+
+from .sagas import OperationResponse
+
+
+def operation_type(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """
+    This decorator verifies that the name of this function belongs to one of enums.OperationTypeEnums.
+
+    Raises a TypeError otherwise.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        if function.__name__.strip("_") not in enums.OperationTypeEnum:
+            raise TypeError("This function cannot be a payment type")
+        return await function(*args, **kwargs)
+
+    return wrapper
+
+
+def implements_blocks(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """
+    This decorator verifies that the class implements the blocks used in the decorated function.
+
+    Raises a TypeError otherwise.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncPaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+
+        # Some of the types have blocks, other just block. Need to check for both.
+        operation_type_name = function.__name__.strip("_")
+        if getattr(self, f"{operation_type_name}_block", None) or getattr(self, f"{operation_type_name}_blocks", None):
+            return await function(self, payment_method, *args, **kwargs)
+
+        raise TypeError("This AsyncPaymentMethodSaga does not implement blocks for this operation type")
+
+    return wrapper
+
+
+def within_single_transaction(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """
+    When the AsyncPaymentMethodSaga runs in single transaction mode, enter the unit of work once
+    for the whole operation and commit it only at the end.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncPaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        if not self.single_transaction:
+            return await function(self, payment_method, *args, **kwargs)
+
+        async with self.unit_of_work as uow:
+            result = await function(self, payment_method, *args, **kwargs)
+            await uow.commit()
+        return result
+
+    return wrapper
+
+
+def with_block_events_staged(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """See sagas.with_block_events_staged"""
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncPaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        if not self.staged_block_events:
+            return await function(self, payment_method, *args, **kwargs)
+
+        with domain.staged_block_events() as staged:
+            result = await function(self, payment_method, *args, **kwargs)
+            if staged:
+                async with self.unit_of_work as uow:
+                    await domain.async_flush_staged_block_events(uow, payment_method)
+                    await uow.commit()
+        return result
+
+    return wrapper
+
+
+def with_payment_method_refreshed_from_storage(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """
+    Refresh the payment from the database, or force an early failed OperationResponse otherwise.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncPaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        try:
+            async with self.unit_of_work as uow:
+                payment_method = await uow.payment_methods.get(id=payment_method.id)
+        except domain.PaymentMethod.DoesNotExist:
+            return OperationResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                payment_method=None,
+                error_message="PaymentMethod not found",
+                type=enums.OperationTypeEnum(function.__name__.strip("_")),  # already valid thanks to @operation_type
+            )
+        return await function(self, payment_method, *args, **kwargs)
+
+    return wrapper
+
+
+def verified_with_decision_logic(  # type:ignore[misc]
+    decision_logic_function: Callable[["protocols.PaymentMethod"], bool]
+) -> Callable[
+    [Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]],
+    Callable[..., Coroutine[None, None, "protocols.OperationResponse"]],
+]:
+    """Verify that the payment can go through this operation type"""
+
+    def decorator(  # type:ignore[misc]
+        function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+    ) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+
+        @functools.wraps(function)
+        async def wrapper(
+            self: "protocols.AsyncPaymentMethodSaga",
+            payment_method: "protocols.PaymentMethod",
+            *args: Sequence,
+            **kwargs: dict,
+        ) -> "protocols.OperationResponse":
+            if not decision_logic_function(payment_method):
+                return OperationResponse(
+                    status=enums.OperationStatusEnum.FAILED,
+                    payment_method=None,
+                    error_message="PaymentMethod cannot go through this operation",
+                    type=enums.OperationTypeEnum(
+                        function.__name__.strip("_")
+                    ),  # already valid thanks to @operation_type
+                )
+
+            return await function(self, payment_method, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def with_started_operation_event_before_running(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.OperationResponse"]]:
+    """
+    Create An OperationEvent with current operation type and status started
+    to prevent other processes from running this method concurrently.
+
+    Storage holds a single started OperationEvent per operation type (except for refunds), so when another process
+    got there first, this one fails right away, before any block runs.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncPaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        type = enums.OperationTypeEnum(function.__name__.strip("_"))  # already valid thanks to @operation_type
+        async with self.unit_of_work as uow:
+            try:
+                await uow.operation_events.add(
+                    payment_method=payment_method,
+                    type=type,
+                    status=enums.OperationStatusEnum.STARTED,
+                )
+            except domain.OperationEvent.Duplicated:
+                # Only the insert got undone, anything else in the transaction (see single_transaction) is kept
+                return OperationResponse(
+                    status=enums.OperationStatusEnum.FAILED,
+                    payment_method=None,
+                    error_message="PaymentMethod is already going through this operation",
+                    type=type,
+                )
+            await domain.async_flush_staged_block_events(uow, payment_method)
+            await uow.commit()
+        return await function(self, payment_method, *args, **kwargs)
+
+    return wrapper
+
+
+@dataclass
+class AsyncPaymentMethodSaga:
+    """
+    Same as PaymentMethodSaga, with blocks that get awaited.
+
+    Every method is a coroutine, and the unit of work must be an AsyncUnitOfWork.
+
+    With concurrent_blocks, the after pay and after confirm blocks get gathered, each one with its own copy
+    of the unit of work, since an AsyncSession cannot be shared across concurrent tasks.
+    A block that does not respond within block_timeout seconds gets cancelled and counts as failed.
+
+    With staged_block_events, block events get added along with the OperationEvents, as in PaymentMethodSaga.
+    """
+
+    unit_of_work: "protocols.AsyncUnitOfWork"
+
+    initialize_block: Optional["protocols.AsyncBlock"]  # If not provided, it will create a PO with status NOT_PERFORMED
+    process_action_block: Optional[
+        "protocols.AsyncBlock"
+    ]  # Only required when payment method requires customer actions
+
+    pay_block: "protocols.AsyncBlock"
+    after_pay_blocks: list["protocols.AsyncBlock"]  # Only required when payment method is paid asynchronously
+
+    confirm_block: Optional["protocols.AsyncBlock"]  # Only required for dual message payments
+    after_confirm_blocks: list["protocols.AsyncBlock"]  # Only required when payment method is confirmed asynchronously
+
+    single_transaction: bool = False  # Commit the unit of work once per operation, rather than once per event
+    staged_block_events: bool = False  # Add block events along with the next OperationEvent, rather than on their own
+
+    concurrent_blocks: bool = False  # Run after_pay_blocks and after_confirm_blocks at the same time
+    block_timeout: Optional[float] = None  # Seconds each concurrent block gets to respond
+
+    def __post_init__(self) -> None:
+        if self.concurrent_blocks and self.single_transaction:
+            raise ValueError("concurrent_blocks cannot be combined with single_transaction")
+
+    async def __run_block_with_timeout(
+        self, block: "protocols.AsyncBlock", payment_method: "protocols.PaymentMethod"
+    ) -> "protocols.BlockResponse":
+        try:
+            return await asyncio.wait_for(
+                block.run(
+                    unit_of_work=dataclasses.replace(self.unit_of_work),
+                    payment_method=payment_method,
+                ),
+                timeout=self.block_timeout,
+            )
+        except asyncio.TimeoutError:
+            return domain.BlockResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                error_message=f"{block.__class__.__name__} timed out after {self.block_timeout} seconds",
+            )
+
+    async def __run_blocks(
+        self, blocks: list["protocols.AsyncBlock"], payment_method: "protocols.PaymentMethod"
+    ) -> list["protocols.BlockResponse"]:
+        if not self.concurrent_blocks:
+            return [await block.run(unit_of_work=self.unit_of_work, payment_method=payment_method) for block in blocks]
+
+        return list(await asyncio.gather(*(self.__run_block_with_timeout(block, payment_method) for block in blocks)))
+
+    async def __add_operation_event(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        type: enums.OperationTypeEnum,
+        status: enums.OperationStatusEnum,
+    ) -> None:
+        async with self.unit_of_work as uow:
+            await uow.operation_events.add(payment_method=payment_method, type=type, status=status)
+            await domain.async_flush_staged_block_events(uow, payment_method)
+            await uow.commit()
+
+    @deal.safe
+    @operation_type
+    @within_single_transaction
+    @with_block_events_staged
+    @with_payment_method_refreshed_from_storage
+    @verified_with_decision_logic(dl.can_initialize)
+    @with_started_operation_event_before_running
+    async def initialize(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
+
+        # Run Operation Block if it exists
+        if self.initialize_block is None:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.NOT_PERFORMED
+            )
+            return await self.__pay(payment_method)
+
+        block_response = await self.initialize_block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
+
+        # Validate that status is one of the expected ones
+        if block_response.status not in [
+            enums.OperationStatusEnum.COMPLETED,
+            enums.OperationStatusEnum.FAILED,
+            enums.OperationStatusEnum.REQUIRES_ACTION,
+        ]:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.FAILED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.INITIALIZE,
+                error_message=f"Invalid status {block_response.status}",
+            )
+        if block_response.status == enums.OperationStatusEnum.REQUIRES_ACTION and not block_response.actions:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.FAILED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.INITIALIZE,
+                error_message="Status is require actions, but no actions were provided",
+            )
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.INITIALIZE, block_response.status)
+
+        # Return Response
+        if block_response.status == enums.OperationStatusEnum.COMPLETED:
+            return await self.__pay(payment_method)
+
+        return OperationResponse(
+            status=block_response.status,
+            actions=block_response.actions,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.INITIALIZE,
+        )
+
+    @deal.reason(TypeError, lambda self, payment_method, action_data: not self.process_action_block)
+    @operation_type
+    @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
+    @with_payment_method_refreshed_from_storage
+    @verified_with_decision_logic(dl.can_process_action)
+    @with_started_operation_event_before_running
+    async def process_action(
+        self, payment_method: "protocols.PaymentMethod", action_data: dict
+    ) -> "protocols.OperationResponse":
+
+        if self.process_action_block is None:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.PROCESS_ACTION, enums.OperationStatusEnum.NOT_PERFORMED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.NOT_PERFORMED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.PROCESS_ACTION,
+                error_message="AsyncPaymentMethodSaga does not include a block for this operation type",
+            )
+
+        # Run Operation Block
+        block_response = await self.process_action_block.run(
+            unit_of_work=self.unit_of_work, payment_method=payment_method, action_data=action_data
+        )
+
+        # Validate that status is one of the expected ones
+        if block_response.status not in [
+            enums.OperationStatusEnum.COMPLETED,
+            enums.OperationStatusEnum.FAILED,
+        ]:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.PROCESS_ACTION, enums.OperationStatusEnum.FAILED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.PROCESS_ACTION,
+                error_message=f"Invalid status {block_response.status}",
+            )
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.PROCESS_ACTION, block_response.status)
+
+        # Return Response
+        if block_response.status == enums.OperationStatusEnum.COMPLETED:
+            return await self.__pay(payment_method)
+
+        return OperationResponse(
+            status=block_response.status,
+            actions=block_response.actions,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.PROCESS_ACTION,
+        )
+
+    @deal.safe
+    @operation_type
+    @with_started_operation_event_before_running
+    async def __pay(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
+        # No need to refresh from DB
+
+        # No need to verify if payment can go through a private method
+
+        # Run Operation Block
+        block_response = await self.pay_block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.PAY, block_response.status)
+
+        # Return Response
+        return OperationResponse(
+            status=block_response.status,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.PAY,
+            error_message=block_response.error_message,
+        )
+
+    @deal.reason(TypeError, lambda self, payment_method: not self.after_pay_blocks)
+    @operation_type
+    @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
+    @with_payment_method_refreshed_from_storage
+    @verified_with_decision_logic(dl.can_after_pay)
+    @with_started_operation_event_before_running
+    async def after_pay(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
+
+        # Run Operation Blocks
+        responses = await self.__run_blocks(self.after_pay_blocks, payment_method)
+
+        status = (
+            enums.OperationStatusEnum.COMPLETED
+            if all(response.status == enums.OperationStatusEnum.COMPLETED for response in responses)
+            else enums.OperationStatusEnum.FAILED
+        )
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.AFTER_PAY, status)
+
+        # Return Response
+        return OperationResponse(
+            status=status,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.AFTER_PAY,
+        )
+
+    @deal.reason(TypeError, lambda self, payment_method: not self.confirm_block)
+    @operation_type
+    @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
+    @with_payment_method_refreshed_from_storage
+    @verified_with_decision_logic(dl.can_confirm)
+    @with_started_operation_event_before_running
+    async def confirm(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
+
+        if self.confirm_block is None:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.NOT_PERFORMED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.NOT_PERFORMED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.CONFIRM,
+                error_message="AsyncPaymentMethodSaga does not include a block for this operation type",
+            )
+
+        # Run Operation Block
+        block_response = await self.confirm_block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
+
+        # Validate that status is one of the expected ones
+        if block_response.status not in [
+            enums.OperationStatusEnum.COMPLETED,
+            enums.OperationStatusEnum.FAILED,
+            enums.OperationStatusEnum.PENDING,
+        ]:
+            await self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.FAILED
+            )
+            return OperationResponse(
+                status=enums.OperationStatusEnum.FAILED,
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.CONFIRM,
+                error_message=f"Invalid status {block_response.status}",
+            )
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.CONFIRM, block_response.status)
+
+        # Return Response
+        return OperationResponse(
+            status=block_response.status,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.CONFIRM,
+            error_message=block_response.error_message,
+        )
+
+    @deal.reason(TypeError, lambda self, payment_method: not self.after_confirm_blocks)
+    @operation_type
+    @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
+    @with_payment_method_refreshed_from_storage
+    @verified_with_decision_logic(dl.can_after_confirm)
+    @with_started_operation_event_before_running
+    async def after_confirm(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
+
+        # Run Operation Blocks
+        responses = await self.__run_blocks(self.after_confirm_blocks, payment_method)
+
+        has_completed = all(response.status == enums.OperationStatusEnum.COMPLETED for response in responses)
+
+        is_pending = any(response.status == enums.OperationStatusEnum.PENDING for response in responses)
+
+        if has_completed:
+            status = enums.OperationStatusEnum.COMPLETED
+        elif is_pending:
+            status = enums.OperationStatusEnum.PENDING
+        else:
+            status = enums.OperationStatusEnum.FAILED
+
+        # Create OperationEvent with the outcome
+        await self.__add_operation_event(payment_method, enums.OperationTypeEnum.AFTER_CONFIRM, status)
+
+        # Return Response
+        return OperationResponse(
+            status=status,
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.AFTER_CONFIRM,
+            error_message=", ".join(
+                [response.error_message for response in responses if response.error_message is not None]
+            ),
+        )
@@ -1,9 +1,12 @@
 """Blocks contains the functionality associated with the Block Layer of the domain"""
 
+import contextlib
+import contextvars
 import functools
+import inspect
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Callable, Optional, Sequence
+from datetime import datetime, timezone
+from typing import Callable, Coroutine, Iterator, Optional, Sequence, cast, overload
 
 from acquiring import domain, enums, protocols
 
@@ -20,12 +23,74 @@ class BlockResponse:
     error_message: Optional[str] = None
 
 
+_staged_block_events: contextvars.ContextVar[Optional[list["protocols.BlockEvent"]]] = contextvars.ContextVar(
+    "staged_block_events", default=None
+)
+
+
+@contextlib.contextmanager
+def staged_block_events() -> Iterator[list["protocols.BlockEvent"]]:
+    """
+    Blocks run inside this context stage their block events instead of adding them,
+    until flush_staged_block_events adds them all in a single statement.
+
+    Threads (and tasks) started inside must run in a copy of the current context to stage into the same list.
+    """
+    staged: list["protocols.BlockEvent"] = []
+    token = _staged_block_events.set(staged)
+    try:
+        yield staged
+    finally:
+        _staged_block_events.reset(token)
+
+
+def flush_staged_block_events(
+    unit_of_work: "protocols.UnitOfWork", payment_method: "protocols.PaymentMethod"
+) -> list["protocols.BlockEvent"]:
+    """Adds the block events staged so far with the unit of work already entered, leaving the commit to the caller"""
+    staged = _staged_block_events.get()
+    if not staged:
+        return []
+
+    block_events, staged[:] = staged[:], []
+    return cast(protocols.BatchRepository, unit_of_work.block_events).add_many(payment_method, block_events)
+
+
+async def async_flush_staged_block_events(
+    unit_of_work: "protocols.AsyncUnitOfWork", payment_method: "protocols.PaymentMethod"
+) -> list["protocols.BlockEvent"]:
+    """Same as flush_staged_block_events, with an AsyncUnitOfWork"""
+    staged = _staged_block_events.get()
+    if not staged:
+        return []
+
+    block_events, staged[:] = staged[:], []
+    return await cast(protocols.AsyncBatchRepository, unit_of_work.block_events).add_many(payment_method, block_events)
+
+
+@overload
+def wrapped_by_block_events(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]: ...
+
+
+@overload
 def wrapped_by_block_events(  # type:ignore[misc]
     function: Callable[..., "protocols.BlockResponse"]
-) -> Callable[..., "protocols.BlockResponse"]:
+) -> Callable[..., "protocols.BlockResponse"]: ...
+
+
+def wrapped_by_block_events(  # type:ignore[misc]
+    function: Callable[..., "protocols.BlockResponse"] | Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]
+) -> Callable[..., "protocols.BlockResponse"] | Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]:
     """
     This decorator ensures that the starting and finishing block events get created.
+
+    When decorating an async run method, the block events get added through an AsyncUnitOfWork.
+    Inside staged_block_events, they get staged instead, without entering the unit of work at all.
     """
+    if inspect.iscoroutinefunction(function):
+        return _async_wrapped_by_block_events(function)
 
     @functools.wraps(function)
     def wrapper(
@@ -38,14 +103,36 @@ def wrapped_by_block_events(  # type:ignore[misc]
         """Wrapper meant to be called when method gets decorated with this function"""
         block_name = self.__class__.__name__
 
+        staged = _staged_block_events.get()
+        if staged is not None:
+            staged.append(
+                domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
+                    status=enums.OperationStatusEnum.STARTED,
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                )
+            )
+            result = function(self, unit_of_work, payment_method, *args, **kwargs)
+            staged.append(
+                domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
+                    status=result.status,  # type:ignore[union-attr]
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                )
+            )
+            return result  # type:ignore[return-value]
+
         with unit_of_work as uow:
             uow.block_events.add(
+                payment_method=payment_method,
                 block_event=domain.BlockEvent(
-                    created_at=datetime.now(),
+                    created_at=datetime.now(timezone.utc),
                     status=enums.OperationStatusEnum.STARTED,
                     payment_method_id=payment_method.id,
                     block_name=block_name,
-                )
+                ),
             )
             uow.commit()
 
@@ -53,14 +140,81 @@ def wrapped_by_block_events(  # type:ignore[misc]
 
         with unit_of_work as uow:
             uow.block_events.add(
+                payment_method=payment_method,
                 block_event=domain.BlockEvent(
-                    created_at=datetime.now(),
+                    created_at=datetime.now(timezone.utc),
+                    status=result.status,  # type:ignore[union-attr]
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                ),
+            )
+            uow.commit()
+        return result  # type:ignore[return-value]
+
+    return wrapper
+
+
+def _async_wrapped_by_block_events(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.BlockResponse"]]:
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.AsyncBlock",
+        unit_of_work: "protocols.AsyncUnitOfWork",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.BlockResponse":
+        """Wrapper meant to be awaited when method gets decorated with this function"""
+        block_name = self.__class__.__name__
+
+        staged = _staged_block_events.get()
+        if staged is not None:
+            staged.append(
+                domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
+                    status=enums.OperationStatusEnum.STARTED,
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                )
+            )
+            result = await function(self, unit_of_work, payment_method, *args, **kwargs)
+            staged.append(
+                domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
                     status=result.status,
                     payment_method_id=payment_method.id,
                     block_name=block_name,
                 )
             )
-            uow.commit()
+            return result
+
+        async with unit_of_work as uow:
+            await uow.block_events.add(
+                payment_method=payment_method,
+                block_event=domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
+                    status=enums.OperationStatusEnum.STARTED,
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                ),
+            )
+            await uow.commit()
+
+        result = await function(self, unit_of_work, payment_method, *args, **kwargs)
+
+        async with unit_of_work as uow:
+            await uow.block_events.add(
+                payment_method=payment_method,
+                block_event=domain.BlockEvent(
+                    created_at=datetime.now(timezone.utc),
+                    status=result.status,
+                    payment_method_id=payment_method.id,
+                    block_name=block_name,
+                ),
+            )
+            await uow.commit()
         return result
 
     return wrapper
@@ -1,8 +1,175 @@
+"""
+Decision logic compiled into a lookup table.
+
+Rules in decision_rules call each other (can_refund evaluates every other rule, several times over),
+but their outcome only depends on which (type, status) OperationEvents a PaymentMethod has, and on
+whether a refund is in progress. That summary fits in a bitmask.
+
+Each mask gets evaluated against the rules only once, the first time it shows up.
+From then on, every can_* function is a single lookup.
+
+bulk_decisions evaluates the same table over OperationEvent rows straight from storage,
+for jobs that sweep many PaymentMethods without loading them.
+"""
+
+import itertools
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Mapping, TypeVar, cast
+
 import deal
 
 from acquiring import enums, protocols
+from acquiring.domain import decision_rules
+
+# One bit per (type, status) pair. Raw values from storage find the same bits, as enum members are strings
+OPERATION_EVENT_BITS: dict[tuple[str, str], int] = {
+    pair: 1 << index for index, pair in enumerate(itertools.product(enums.OperationTypeEnum, enums.OperationStatusEnum))
+}
+
+# Refunds can happen more than once. Rules compare how many have started with how many have completed.
+REFUND_IN_PROGRESS_BIT = 1 << len(OPERATION_EVENT_BITS)
+
+CAN_INITIALIZE = 1 << 0
+CAN_PROCESS_ACTION = 1 << 1
+CAN_AFTER_PAY = 1 << 2
+CAN_CONFIRM = 1 << 3
+CAN_AFTER_CONFIRM = 1 << 4
+CAN_REFUND = 1 << 5
+
+# Operation types that a decision logic function exists for
+DECISION_BITS: dict[enums.OperationTypeEnum, int] = {
+    enums.OperationTypeEnum.INITIALIZE: CAN_INITIALIZE,
+    enums.OperationTypeEnum.PROCESS_ACTION: CAN_PROCESS_ACTION,
+    enums.OperationTypeEnum.AFTER_PAY: CAN_AFTER_PAY,
+    enums.OperationTypeEnum.CONFIRM: CAN_CONFIRM,
+    enums.OperationTypeEnum.AFTER_CONFIRM: CAN_AFTER_CONFIRM,
+    enums.OperationTypeEnum.REFUND: CAN_REFUND,
+}
 
-# TODO Test these functions with hypothesis
+PaymentMethodIdT = TypeVar("PaymentMethodIdT", bound=Hashable)
+
+_decisions_by_mask: dict[int, int] = {}
+
+
+@dataclass(frozen=True)
+class OperationEventMask:
+    """Stands in for a PaymentMethod when the rules get evaluated, answering from the bitmask alone"""
+
+    mask: int
+
+    def has_operation_event(self, type: enums.OperationTypeEnum, status: enums.OperationStatusEnum) -> bool:
+        """Returns True if the bit associated with given type and status is set"""
+        return bool(self.mask & OPERATION_EVENT_BITS[(type, status)])
+
+    def count_operation_event(self, type: enums.OperationTypeEnum, status: enums.OperationStatusEnum) -> int:
+        """
+        Only the presence of an OperationEvent is recorded in the mask, except for refunds in progress.
+
+        An in progress refund counts as one more started than completed refunds, which is all the rules compare.
+        """
+        if type == enums.OperationTypeEnum.REFUND and status == enums.OperationStatusEnum.STARTED:
+            return 1 if self.mask & REFUND_IN_PROGRESS_BIT else 0
+        if type == enums.OperationTypeEnum.REFUND and status == enums.OperationStatusEnum.COMPLETED:
+            return 0
+        return int(self.has_operation_event(type=type, status=status))
+
+
+def operation_event_mask(
+    operation_event_counts: Mapping[tuple["enums.OperationTypeEnum", "enums.OperationStatusEnum"], int]
+) -> int:
+    """
+    Summarizes the OperationEvents of a PaymentMethod into the bitmask the decision logic depends on.
+
+    It takes the counts that PaymentMethod keeps up to date, so it loops over (type, status) pairs, not over events.
+    """
+    mask = 0
+    for pair, count in operation_event_counts.items():
+        if count > 0:
+            mask |= OPERATION_EVENT_BITS.get(pair, 0)
+
+    refunds_started = operation_event_counts.get((enums.OperationTypeEnum.REFUND, enums.OperationStatusEnum.STARTED), 0)
+    refunds_completed = operation_event_counts.get(
+        (enums.OperationTypeEnum.REFUND, enums.OperationStatusEnum.COMPLETED), 0
+    )
+    if refunds_started > refunds_completed:
+        mask |= REFUND_IN_PROGRESS_BIT
+    return mask
+
+
+def compile_decisions(mask: int) -> int:
+    """Evaluates every rule in decision_rules for the given mask, and combines the outcomes into CAN_* bits"""
+    # Rules only ever call has_operation_event and count_operation_event on the PaymentMethod
+    payment_method = cast("protocols.PaymentMethod", OperationEventMask(mask=mask))
+    return (
+        (CAN_INITIALIZE if decision_rules.can_initialize(payment_method) else 0)
+        | (CAN_PROCESS_ACTION if decision_rules.can_process_action(payment_method) else 0)
+        | (CAN_AFTER_PAY if decision_rules.can_after_pay(payment_method) else 0)
+        | (CAN_CONFIRM if decision_rules.can_confirm(payment_method) else 0)
+        | (CAN_AFTER_CONFIRM if decision_rules.can_after_confirm(payment_method) else 0)
+        | (CAN_REFUND if decision_rules.can_refund(payment_method) else 0)
+    )
+
+
+def decisions_by_mask(mask: int) -> int:
+    """Returns the CAN_* bits for the given mask, compiling them the first time the mask shows up"""
+    try:
+        return _decisions_by_mask[mask]
+    except KeyError:
+        _decisions_by_mask[mask] = compile_decisions(mask)
+        return _decisions_by_mask[mask]
+
+
+def decisions(payment_method: "protocols.PaymentMethod") -> int:
+    """Returns the CAN_* bits of the operation types that the payment_method can go through"""
+    return decisions_by_mask(operation_event_mask(payment_method.operation_event_counts()))
+
+
+def bulk_decisions(
+    payment_method_ids: Iterable[PaymentMethodIdT],
+    types: Iterable[str],
+    statuses: Iterable[str],
+) -> dict[PaymentMethodIdT, int]:
+    """
+    Returns the CAN_* bits of every PaymentMethod that shows up in the given OperationEvent rows.
+
+    Rows come as columns, one entry per OperationEvent, in any order. Types and statuses may be
+    enum members or their raw values, as they come from storage.
+
+    PaymentMethods without OperationEvents do not show up in the rows. They get decisions_by_mask(0).
+    """
+    masks: dict[PaymentMethodIdT, int] = {}
+    refunds_in_progress: dict[PaymentMethodIdT, int] = {}
+    for payment_method_id, type, status in zip(payment_method_ids, types, statuses, strict=True):
+        masks[payment_method_id] = masks.get(payment_method_id, 0) | OPERATION_EVENT_BITS.get((type, status), 0)
+        if type == enums.OperationTypeEnum.REFUND:
+            if status == enums.OperationStatusEnum.STARTED:
+                refunds_in_progress[payment_method_id] = refunds_in_progress.get(payment_method_id, 0) + 1
+            elif status == enums.OperationStatusEnum.COMPLETED:
+                refunds_in_progress[payment_method_id] = refunds_in_progress.get(payment_method_id, 0) - 1
+
+    for payment_method_id, in_progress in refunds_in_progress.items():
+        if in_progress > 0:
+            masks[payment_method_id] |= REFUND_IN_PROGRESS_BIT
+
+    return {payment_method_id: decisions_by_mask(mask) for payment_method_id, mask in masks.items()}
+
+
+def bulk_eligibility(
+    payment_method_ids: Iterable[PaymentMethodIdT],
+    types: Iterable[str],
+    statuses: Iterable[str],
+) -> tuple[list[PaymentMethodIdT], dict[enums.OperationTypeEnum, list[bool]]]:
+    """
+    Same as bulk_decisions, but split into one eligibility vector per operation type.
+
+    Returns the PaymentMethod ids in order of first appearance,
+    and for each operation type in DECISION_BITS, whether each of those PaymentMethods can go through it.
+    """
+    decisions_by_id = bulk_decisions(payment_method_ids, types, statuses)
+    return list(decisions_by_id), {
+        operation_type: [bool(decisions & bit) for decisions in decisions_by_id.values()]
+        for operation_type, bit in DECISION_BITS.items()
+    }
 
 
 @deal.pure
@@ -10,12 +177,7 @@ def can_initialize(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the initialize operation.
     """
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.INITIALIZE, status=enums.OperationStatusEnum.STARTED
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_INITIALIZE)
 
 
 @deal.pure
@@ -23,25 +185,7 @@ def can_process_action(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the process_action operation.
     """
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PROCESS_ACTION,
-        status=enums.OperationStatusEnum.STARTED,
-    ):
-        return False
-
-    if not (
-        payment_method.has_operation_event(
-            type=enums.OperationTypeEnum.INITIALIZE,
-            status=enums.OperationStatusEnum.STARTED,
-        )
-        and payment_method.has_operation_event(
-            type=enums.OperationTypeEnum.INITIALIZE,
-            status=enums.OperationStatusEnum.REQUIRES_ACTION,
-        )
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_PROCESS_ACTION)
 
 
 @deal.pure
@@ -49,63 +193,7 @@ def can_after_pay(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the after pay operation.
     """
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_PAY,
-        status=enums.OperationStatusEnum.STARTED,
-    ):
-        return False
-
-    if any([can_initialize(payment_method), can_process_action(payment_method)]):
-        return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.INITIALIZE,
-        status=enums.OperationStatusEnum.STARTED,
-    ):
-        if payment_method.has_operation_event(
-            type=enums.OperationTypeEnum.INITIALIZE,
-            status=enums.OperationStatusEnum.REQUIRES_ACTION,
-        ) and not payment_method.has_operation_event(
-            type=enums.OperationTypeEnum.PROCESS_ACTION,
-            status=enums.OperationStatusEnum.COMPLETED,
-        ):
-            return False
-        elif not payment_method.has_operation_event(
-            type=enums.OperationTypeEnum.INITIALIZE,
-            status=enums.OperationStatusEnum.REQUIRES_ACTION,
-        ) and not any(
-            [
-                payment_method.has_operation_event(
-                    type=enums.OperationTypeEnum.INITIALIZE,
-                    status=enums.OperationStatusEnum.COMPLETED,
-                ),
-                payment_method.has_operation_event(
-                    type=enums.OperationTypeEnum.INITIALIZE,
-                    status=enums.OperationStatusEnum.NOT_PERFORMED,
-                ),
-            ]
-        ):
-            return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PAY,
-        status=enums.OperationStatusEnum.STARTED,
-    ) and not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PAY,
-        status=enums.OperationStatusEnum.STARTED,
-    ) and not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_AFTER_PAY)
 
 
 @deal.pure
@@ -113,29 +201,7 @@ def can_confirm(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the confirm operation.
     """
-
-    if any(
-        [
-            can_initialize(payment_method),
-            can_process_action(payment_method),
-            can_after_pay(payment_method),
-        ]
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.CONFIRM,
-        status=enums.OperationStatusEnum.STARTED,
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_CONFIRM)
 
 
 @deal.pure
@@ -143,64 +209,7 @@ def can_after_confirm(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the after confirm operation.
     """
-    if any(
-        [
-            can_initialize(payment_method),
-            can_process_action(payment_method),
-            can_after_pay(payment_method),
-            can_confirm(payment_method),
-        ]
-    ):
-        return False
-
-    if not any(
-        [
-            payment_method.has_operation_event(
-                type=enums.OperationTypeEnum.INITIALIZE,
-                status=enums.OperationStatusEnum.COMPLETED,
-            ),
-            payment_method.has_operation_event(
-                type=enums.OperationTypeEnum.INITIALIZE,
-                status=enums.OperationStatusEnum.NOT_PERFORMED,
-            ),
-        ]
-    ):
-        return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.INITIALIZE,
-        status=enums.OperationStatusEnum.REQUIRES_ACTION,
-    ) and not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PROCESS_ACTION,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.CONFIRM,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_CONFIRM,
-        status=enums.OperationStatusEnum.STARTED,
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_AFTER_CONFIRM)
 
 
 @deal.pure
@@ -208,36 +217,4 @@ def can_refund(payment_method: "protocols.PaymentMethod") -> bool:
     """
     Return whether the payment_method can go through the refund operation.
     """
-    if any(
-        [
-            can_initialize(payment_method),
-            can_process_action(payment_method),
-            can_after_pay(payment_method),
-            can_confirm(payment_method),
-            can_after_confirm(payment_method),
-        ]
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_PAY,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if not payment_method.has_operation_event(
-        type=enums.OperationTypeEnum.AFTER_CONFIRM,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    if payment_method.count_operation_event(
-        type=enums.OperationTypeEnum.REFUND,
-        status=enums.OperationStatusEnum.STARTED,
-    ) > payment_method.count_operation_event(
-        type=enums.OperationTypeEnum.REFUND,
-        status=enums.OperationStatusEnum.COMPLETED,
-    ):
-        return False
-
-    return True
+    return bool(decisions(payment_method) & CAN_REFUND)
@@ -48,5 +48,13 @@ class OperationEvent:
         """String representation of the class"""
         return f"{self.__class__.__name__}:{self.type}|{self.status}"
 
+    class Duplicated(Exception):
+        """
+        This exception gets raised when the PaymentMethod has already started this operation type,
+        as a result of an Integrity error that has to do with a UNIQUE constraint
+        """
+
+        pass
+
 
 # TODO assert that all dataclasses defined in this file are immutable
@@ -3,9 +3,10 @@
 The main entity is the PaymentMethod, but some other important dataclasses are defined here.
 """
 
+from collections import Counter
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Mapping, Optional
 import deal
 
 from acquiring import enums, protocols
@@ -21,20 +22,62 @@ class PaymentMethod:
     tokens: list["protocols.Token"] = field(default_factory=list)
     operation_events: list["protocols.OperationEvent"] = field(default_factory=list)
 
+    # Number of OperationEvents per (type, status), so that decision logic does not scan operation_events on every check
+    _operation_event_counts: Counter[tuple["enums.OperationTypeEnum", "enums.OperationStatusEnum"]] = field(
+        default_factory=Counter, init=False, repr=False, compare=False
+    )
+    _indexed_operation_events: list["protocols.OperationEvent"] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _indexed_operation_events_length: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._index_operation_events()
+
     def __repr__(self) -> str:
         """String representation of the class"""
         return f"{self.__class__.__name__}:{self.id}"
 
-    @deal.pure
+    def _index_operation_events(self) -> None:
+        """
+        OperationEvents are append-only, so only those appended since the last call need to be counted.
+
+        The counts are rebuilt from scratch only when operation_events has been replaced or shrunk.
+        """
+        if (
+            self._indexed_operation_events is not self.operation_events
+            or len(self.operation_events) < self._indexed_operation_events_length
+        ):
+            self._operation_event_counts = Counter()
+            self._indexed_operation_events = self.operation_events
+            self._indexed_operation_events_length = 0
+
+        for operation_event in self.operation_events[self._indexed_operation_events_length :]:
+            self._operation_event_counts[(operation_event.type, operation_event.status)] += 1
+        self._indexed_operation_events_length = len(self.operation_events)
+
+    def operation_event_counts(
+        self,
+    ) -> Mapping[tuple["enums.OperationTypeEnum", "enums.OperationStatusEnum"], int]:
+        """Returns the number of OperationEvents associated with this PaymentMethod, per type and status"""
+        if (
+            self._indexed_operation_events is not self.operation_events
+            or len(self.operation_events) != self._indexed_operation_events_length
+        ):
+            self._index_operation_events()
+        return self._operation_event_counts
+
+    # Not pure, as counts get indexed lazily
+    @deal.safe
     def has_operation_event(self, type: "enums.OperationTypeEnum", status: "enums.OperationStatusEnum") -> bool:
         """Returns True if there is a OperationEvent associated with this PaymentMethod of given type and status"""
-        return any(operation.type == type and operation.status == status for operation in self.operation_events)
+        return self.count_operation_event(type=type, status=status) > 0
 
-    @deal.pure
+    @deal.safe
     @deal.post(lambda result: result >= 0)
     def count_operation_event(self, type: "enums.OperationTypeEnum", status: "enums.OperationStatusEnum") -> int:
         """Returns the number of OperationEvents associated with this PaymentMethod of given type and status"""
-        return sum(1 for operation in self.operation_events if operation.type == type and operation.status == status)
+        return self.operation_event_counts()[(type, status)]
 
     class DoesNotExist(Exception):
         """
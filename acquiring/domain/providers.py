@@ -1,7 +1,8 @@
 import functools
+import inspect
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Callable, Sequence
+from typing import Callable, Coroutine, Sequence, overload
 
 from acquiring import domain, protocols
 
@@ -22,11 +23,48 @@ class Transaction:
         """String representation of the class"""
         return f"{self.__class__.__name__}:{self.provider_name}|{self.external_id}"
 
+    class DoesNotExist(Exception):
+        """
+        This exception gets raised when the database representation could not be found.
 
+        Most often, you'll see this raised when a database NotFound exception is raised on a Repository class
+        """
+
+        pass
+
+    class Duplicated(Exception):
+        """
+        This exception gets raised when the provider already delivered this event,
+        as a result of an Integrity error that has to do with a UNIQUE constraint
+        """
+
+        pass
+
+
+@overload
+def wrapped_by_transaction(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]: ...
+
+
+@overload
 def wrapped_by_transaction(  # type:ignore[misc]
     function: Callable[..., "protocols.AdapterResponse"]
-) -> Callable[..., "protocols.AdapterResponse"]:
-    """This decorator ensures that a Transaction gets created after interacting with the Provider via its adapter"""
+) -> Callable[..., "protocols.AdapterResponse"]: ...
+
+
+def wrapped_by_transaction(  # type:ignore[misc]
+    function: (
+        Callable[..., "protocols.AdapterResponse"] | Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]
+    )
+) -> Callable[..., "protocols.AdapterResponse"] | Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]:
+    """
+    This decorator ensures that a Transaction gets created after interacting with the Provider via its adapter
+
+    When decorating an async adapter method, the Transaction gets added through an AsyncUnitOfWork.
+    """
+    if inspect.iscoroutinefunction(function):
+        return _async_wrapped_by_transaction(function)
 
     @functools.wraps(function)
     def wrapper(
@@ -38,6 +76,38 @@ def wrapped_by_transaction(  # type:ignore[misc]
     ) -> "protocols.AdapterResponse":
         result = function(self, unit_of_work, payment_method, *args, **kwargs)
 
+        # A transaction is created only when the Adapter Response is successful
+        if result.timestamp is not None and result.external_id is not None:  # type:ignore[union-attr]
+            transaction = domain.Transaction(
+                external_id=result.external_id,  # type:ignore[union-attr]
+                timestamp=result.timestamp,  # type:ignore[union-attr]
+                raw_data=result.raw_data,  # type:ignore[union-attr]
+                provider_name=self.provider_name,
+                payment_method_id=payment_method.id,
+            )
+            with unit_of_work as uow:
+                uow.transactions.add(transaction)
+                uow.commit()
+
+        return result  # type:ignore[return-value]
+
+    return wrapper
+
+
+def _async_wrapped_by_transaction(  # type:ignore[misc]
+    function: Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]
+) -> Callable[..., Coroutine[None, None, "protocols.AdapterResponse"]]:
+
+    @functools.wraps(function)
+    async def wrapper(
+        self: "protocols.Adapter",
+        unit_of_work: "protocols.AsyncUnitOfWork",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.AdapterResponse":
+        result = await function(self, unit_of_work, payment_method, *args, **kwargs)
+
         # A transaction is created only when the Adapter Response is successful
         if result.timestamp is not None and result.external_id is not None:
             transaction = domain.Transaction(
@@ -47,9 +117,9 @@ def wrapped_by_transaction(  # type:ignore[misc]
                 provider_name=self.provider_name,
                 payment_method_id=payment_method.id,
             )
-            with unit_of_work as uow:
-                uow.transactions.add(transaction)
-                uow.commit()
+            async with unit_of_work as uow:
+                await uow.transactions.add(transaction)
+                await uow.commit()
 
         return result
 
@@ -0,0 +1,149 @@
+"""Resilience contains the retry and circuit breaking policies used around the calls that adapters make to providers"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from acquiring import enums
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, so that workers retrying at once do not hit the provider in lockstep.
+
+    See https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    """
+
+    attempts: int = 3  # including the first one
+    base_delay: float = 0.2  # seconds
+    max_delay: float = 5  # seconds
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the given (zero based) attempt failed"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))  # nosec B311 not cryptographic
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Stops calling a provider after failure_threshold consecutive failures.
+
+    Once recovery_timeout seconds have passed, a single trial call is let through (half open).
+    The circuit closes again if it succeeds, and opens for another recovery_timeout if it fails.
+    A trial call that ends any other way (e.g. a 4xx response, or cancelled) gets released,
+    and so does one that has not ended after recovery_timeout, so that the next call becomes the trial one.
+    """
+
+    failure_threshold: int = 5
+    recovery_timeout: float = 30  # seconds
+
+    state: enums.CircuitStateEnum = field(default=enums.CircuitStateEnum.CLOSED, init=False)
+    _failures: int = field(default=0, init=False, repr=False)
+    _opened_at: float = field(default=0, init=False, repr=False)  # or when the trial call started, while half open
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def allows_request(self) -> bool:
+        with self._lock:
+            if (
+                self.state != enums.CircuitStateEnum.CLOSED
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                self.state = enums.CircuitStateEnum.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return self.state == enums.CircuitStateEnum.CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = enums.CircuitStateEnum.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == enums.CircuitStateEnum.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = enums.CircuitStateEnum.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Neither a success nor a failure, a trial call that ended this way lets the next call through instead"""
+        with self._lock:
+            if self.state == enums.CircuitStateEnum.HALF_OPEN:
+                self.state = enums.CircuitStateEnum.OPEN
+                self._opened_at = time.monotonic() - self.recovery_timeout
+
+
+@dataclass
+class Resilience:
+    """
+    Calls a provider, retrying the attempts that raise Resilience.Unavailable, under a circuit breaker.
+
+    Retrying is only safe when the provider deduplicates the request (e.g. with an idempotency key).
+    Any other exception (including cancellation) is raised right away, releasing the circuit breaker.
+    Adapters sharing a Resilience also share its circuit breaker.
+    """
+
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    circuit_breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    timeouts: dict[str, float] = field(default_factory=dict)  # seconds, by endpoint
+
+    def call(self, endpoint: str, function: Callable[[Optional[float]], T]) -> T:
+        """Calls function with the timeout of endpoint (None when missing) until it does not raise Unavailable"""
+        for attempt in range(self.retry_policy.attempts):
+            if not self.circuit_breaker.allows_request():
+                raise self.CircuitOpen(f"Circuit is open, {endpoint} was not called")
+            try:
+                result = function(self.timeouts.get(endpoint))
+            except self.Unavailable:
+                self.circuit_breaker.record_failure()
+                if attempt == self.retry_policy.attempts - 1:
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+            except BaseException:
+                self.circuit_breaker.release()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+        raise self.Unavailable(f"{endpoint} was not called")  # only when retry_policy has no attempts
+
+    async def acall(self, endpoint: str, function: Callable[[Optional[float]], Awaitable[T]]) -> T:
+        """Same as call, awaiting both function and the delays between attempts"""
+        for attempt in range(self.retry_policy.attempts):
+            if not self.circuit_breaker.allows_request():
+                raise self.CircuitOpen(f"Circuit is open, {endpoint} was not called")
+            try:
+                result = await function(self.timeouts.get(endpoint))
+            except self.Unavailable:
+                self.circuit_breaker.record_failure()
+                if attempt == self.retry_policy.attempts - 1:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+            except BaseException:
+                self.circuit_breaker.release()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+        raise self.Unavailable(f"{endpoint} was not called")
+
+    class Unavailable(Exception):
+        """
+        This exception gets raised when the provider fails in a way that is worth retrying,
+        like a timeout, a dropped connection or a 5xx response.
+        """
+
+        pass
+
+    class CircuitOpen(Unavailable):
+        """This exception gets raised, without calling the provider, while the circuit breaker is open"""
+
+        pass
@@ -1,4 +1,7 @@
+import contextvars
+import dataclasses
 import functools
+from concurrent import futures
 from dataclasses import dataclass, field
 from typing import Callable, Optional, Sequence
 
@@ -65,6 +68,65 @@ def implements_blocks(  # type:ignore[misc]
     return wrapper
 
 
+def within_single_transaction(  # type:ignore[misc]
+    function: Callable[..., "protocols.OperationResponse"]
+) -> Callable[..., "protocols.OperationResponse"]:
+    """
+    When the PaymentMethodSaga runs in single transaction mode, enter the unit of work once for the whole operation
+    (including any operation chained from it, like pay) and commit it only at the end.
+
+    Every block entered inside joins that transaction, so their commits are deferred to the final one.
+    """
+
+    @functools.wraps(function)
+    def wrapper(
+        self: "protocols.PaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        if not self.single_transaction:
+            return function(self, payment_method, *args, **kwargs)
+
+        with self.unit_of_work as uow:
+            result = function(self, payment_method, *args, **kwargs)
+            uow.commit()
+        return result
+
+    return wrapper
+
+
+def with_block_events_staged(  # type:ignore[misc]
+    function: Callable[..., "protocols.OperationResponse"]
+) -> Callable[..., "protocols.OperationResponse"]:
+    """
+    When the PaymentMethodSaga stages block events, blocks stage theirs for the whole operation
+    (including any operation chained from it), and they get added along with each OperationEvent.
+
+    Those staged after the last OperationEvent (e.g. by blocks that timed out) get added at the end.
+    """
+
+    @functools.wraps(function)
+    def wrapper(
+        self: "protocols.PaymentMethodSaga",
+        payment_method: "protocols.PaymentMethod",
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> "protocols.OperationResponse":
+        if not self.staged_block_events:
+            return function(self, payment_method, *args, **kwargs)
+
+        with domain.staged_block_events() as staged:
+            result = function(self, payment_method, *args, **kwargs)
+            if staged:
+                with self.unit_of_work as uow:
+                    domain.flush_staged_block_events(uow, payment_method)
+                    uow.commit()
+        return result
+
+    return wrapper
+
+
 def with_payment_method_refreshed_from_storage(  # type:ignore[misc]
     function: Callable[..., "protocols.OperationResponse"]
 ) -> Callable[..., "protocols.OperationResponse"]:
@@ -133,6 +195,9 @@ def with_started_operation_event_before_running(  # type:ignore[misc]
     """
     Create An OperationEvent with current operation type and status started
     to prevent other processes from running this method concurrently.
+
+    Storage holds a single started OperationEvent per operation type (except for refunds), so when another process
+    got there first, this one fails right away, before any block runs.
     """
 
     @functools.wraps(function)
@@ -142,12 +207,23 @@ def with_started_operation_event_before_running(  # type:ignore[misc]
         *args: Sequence,
         **kwargs: dict,
     ) -> "protocols.OperationResponse":
+        type = enums.OperationTypeEnum(function.__name__.strip("_"))  # already valid thanks to @operation_type
         with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum(function.__name__.strip("_")),  # already valid thanks to @operation_type
-                status=enums.OperationStatusEnum.STARTED,
-            )
+            try:
+                uow.operation_events.add(
+                    payment_method=payment_method,
+                    type=type,
+                    status=enums.OperationStatusEnum.STARTED,
+                )
+            except domain.OperationEvent.Duplicated:
+                # Only the insert got undone, anything else in the transaction (see single_transaction) is kept
+                return OperationResponse(
+                    status=enums.OperationStatusEnum.FAILED,
+                    payment_method=None,
+                    error_message="PaymentMethod is already going through this operation",
+                    type=type,
+                )
+            domain.flush_staged_block_events(uow, payment_method)
             uow.commit()
         return function(self, payment_method, *args, **kwargs)
 
@@ -161,6 +237,21 @@ class PaymentMethodSaga:
     Context class that defines what's common across all Payment Methods and their execution.
 
     What's specific to each payment method is implemented inside each one of the block(s).
+
+    By default, every OperationEvent gets committed as soon as it is created.
+    With single_transaction, each operation commits once, at the end. This trades away two things:
+    the started OperationEvent is not visible to concurrent processes until the operation finishes,
+    and the database transaction stays open while the blocks talk to the provider.
+
+    With concurrent_blocks, the after pay and after confirm blocks run at the same time, each one in its own thread
+    and with its own copy of the unit of work, since database sessions cannot be shared across threads.
+    A block that does not respond within block_timeout seconds counts as failed (its thread cannot be stopped,
+    and it keeps running in the background). Each thread closes its database connections once its block finishes.
+    That is why concurrent_blocks cannot be combined with single_transaction.
+
+    With staged_block_events, the block events of each block run are not added (and committed) on their own,
+    but in a single statement along with the next OperationEvent.
+    Block events are audit data, so a crash in the middle of an operation loses those of the blocks already run.
     """
 
     unit_of_work: "protocols.UnitOfWork"
@@ -174,8 +265,77 @@ class PaymentMethodSaga:
     confirm_block: Optional["protocols.Block"]  # Only required for dual message payments
     after_confirm_blocks: list["protocols.Block"]  # Only required when payment method is confirmed asynchronously
 
+    single_transaction: bool = False  # Commit the unit of work once per operation, rather than once per event
+    staged_block_events: bool = False  # Add block events along with the next OperationEvent, rather than on their own
+
+    concurrent_blocks: bool = False  # Run after_pay_blocks and after_confirm_blocks at the same time
+    block_timeout: Optional[float] = None  # Seconds each concurrent block gets to respond
+
+    def __post_init__(self) -> None:
+        if self.concurrent_blocks and self.single_transaction:
+            raise ValueError("concurrent_blocks cannot be combined with single_transaction")
+
+    def __run_block_in_thread(
+        self,
+        block: "protocols.Block",
+        unit_of_work: "protocols.UnitOfWork",
+        payment_method: "protocols.PaymentMethod",
+    ) -> "protocols.BlockResponse":
+        # Closing the connections of the thread once the block finishes, even when it has already timed out
+        try:
+            return block.run(unit_of_work=unit_of_work, payment_method=payment_method)
+        finally:
+            unit_of_work.close()
+
+    def __run_blocks(
+        self, blocks: list["protocols.Block"], payment_method: "protocols.PaymentMethod"
+    ) -> list["protocols.BlockResponse"]:
+        if not self.concurrent_blocks:
+            return [block.run(unit_of_work=self.unit_of_work, payment_method=payment_method) for block in blocks]
+
+        executor = futures.ThreadPoolExecutor(max_workers=len(blocks))
+        try:
+            running_blocks = [
+                executor.submit(
+                    contextvars.copy_context().run,  # so that the block stages into the same block events
+                    self.__run_block_in_thread,
+                    block,
+                    unit_of_work=dataclasses.replace(self.unit_of_work),
+                    payment_method=payment_method,
+                )
+                for block in blocks
+            ]
+            futures.wait(running_blocks, timeout=self.block_timeout)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [
+            (
+                running_block.result()
+                if running_block.done()
+                else domain.BlockResponse(
+                    status=enums.OperationStatusEnum.FAILED,
+                    error_message=f"{block.__class__.__name__} timed out after {self.block_timeout} seconds",
+                )
+            )
+            for block, running_block in zip(blocks, running_blocks)
+        ]
+
+    def __add_operation_event(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        type: enums.OperationTypeEnum,
+        status: enums.OperationStatusEnum,
+    ) -> None:
+        with self.unit_of_work as uow:
+            uow.operation_events.add(payment_method=payment_method, type=type, status=status)
+            domain.flush_staged_block_events(uow, payment_method)
+            uow.commit()
+
     @deal.safe  # TODO Implement deal.has to consider database access
     @operation_type
+    @within_single_transaction
+    @with_block_events_staged
     @with_payment_method_refreshed_from_storage
     @verified_with_decision_logic(dl.can_initialize)
     @with_started_operation_event_before_running
@@ -183,13 +343,9 @@ class PaymentMethodSaga:
 
         # Run Operation Block if it exists
         if self.initialize_block is None:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.INITIALIZE,
-                    status=enums.OperationStatusEnum.NOT_PERFORMED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.NOT_PERFORMED
+            )
             return self.__pay(payment_method)
 
         block_response = self.initialize_block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
@@ -200,13 +356,9 @@ class PaymentMethodSaga:
             enums.OperationStatusEnum.FAILED,
             enums.OperationStatusEnum.REQUIRES_ACTION,
         ]:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.INITIALIZE,  # TODO Refer to function name rather than explicit input in all cases
-                    status=enums.OperationStatusEnum.FAILED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.FAILED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.FAILED,
                 payment_method=payment_method,
@@ -214,13 +366,9 @@ class PaymentMethodSaga:
                 error_message=f"Invalid status {block_response.status}",
             )
         if block_response.status == enums.OperationStatusEnum.REQUIRES_ACTION and not block_response.actions:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.INITIALIZE,
-                    status=enums.OperationStatusEnum.FAILED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.FAILED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.FAILED,
                 payment_method=payment_method,
@@ -229,13 +377,7 @@ class PaymentMethodSaga:
             )
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.INITIALIZE,
-                status=block_response.status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.INITIALIZE, block_response.status)
 
         # Return Response
         if block_response.status == enums.OperationStatusEnum.COMPLETED:
@@ -251,6 +393,8 @@ class PaymentMethodSaga:
     @deal.reason(TypeError, lambda self, payment_method, action_data: not self.process_action_block)
     @operation_type
     @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
     @with_payment_method_refreshed_from_storage
     @verified_with_decision_logic(dl.can_process_action)
     @with_started_operation_event_before_running
@@ -259,13 +403,9 @@ class PaymentMethodSaga:
     ) -> "protocols.OperationResponse":
 
         if self.process_action_block is None:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.PROCESS_ACTION,
-                    status=enums.OperationStatusEnum.NOT_PERFORMED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.PROCESS_ACTION, enums.OperationStatusEnum.NOT_PERFORMED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.NOT_PERFORMED,
                 payment_method=payment_method,
@@ -283,13 +423,9 @@ class PaymentMethodSaga:
             enums.OperationStatusEnum.COMPLETED,
             enums.OperationStatusEnum.FAILED,
         ]:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.PROCESS_ACTION,
-                    status=enums.OperationStatusEnum.FAILED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.PROCESS_ACTION, enums.OperationStatusEnum.FAILED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.FAILED,
                 payment_method=payment_method,
@@ -298,13 +434,7 @@ class PaymentMethodSaga:
             )
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.PROCESS_ACTION,
-                status=block_response.status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.PROCESS_ACTION, block_response.status)
 
         # Return Response
         if block_response.status == enums.OperationStatusEnum.COMPLETED:
@@ -329,13 +459,7 @@ class PaymentMethodSaga:
         block_response = self.pay_block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.PAY,
-                status=block_response.status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.PAY, block_response.status)
 
         # Return Response
         return OperationResponse(
@@ -348,26 +472,22 @@ class PaymentMethodSaga:
     @deal.reason(TypeError, lambda self, payment_method: not self.after_pay_blocks)
     @operation_type
     @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
     @with_payment_method_refreshed_from_storage
     @verified_with_decision_logic(dl.can_after_pay)
     @with_started_operation_event_before_running
     def after_pay(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
 
         # Run Operation Blocks
-        responses = [
-            block.run(unit_of_work=self.unit_of_work, payment_method=payment_method) for block in self.after_pay_blocks
-        ]
+        responses = self.__run_blocks(self.after_pay_blocks, payment_method)
 
         has_completed = all([response.status == enums.OperationStatusEnum.COMPLETED for response in responses])
 
         if not has_completed:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.AFTER_PAY,
-                    status=enums.OperationStatusEnum.FAILED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.AFTER_PAY, enums.OperationStatusEnum.FAILED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.FAILED,
                 payment_method=payment_method,
@@ -377,13 +497,7 @@ class PaymentMethodSaga:
         status = enums.OperationStatusEnum.COMPLETED if has_completed else enums.OperationStatusEnum.FAILED
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.AFTER_PAY,
-                status=status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.AFTER_PAY, status)
 
         # Return Response
         return OperationResponse(
@@ -395,6 +509,8 @@ class PaymentMethodSaga:
     @deal.reason(TypeError, lambda self, payment_method, action_data: not self.confirm_block)
     @operation_type
     @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
     @with_payment_method_refreshed_from_storage
     @verified_with_decision_logic(dl.can_confirm)
     @with_started_operation_event_before_running
@@ -402,13 +518,9 @@ class PaymentMethodSaga:
 
         # Run Operation Blocks
         if self.confirm_block is None:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.CONFIRM,
-                    status=enums.OperationStatusEnum.NOT_PERFORMED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.NOT_PERFORMED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.NOT_PERFORMED,
                 payment_method=payment_method,
@@ -425,13 +537,9 @@ class PaymentMethodSaga:
             enums.OperationStatusEnum.FAILED,
             enums.OperationStatusEnum.PENDING,
         ]:
-            with self.unit_of_work as uow:
-                uow.operation_events.add(
-                    payment_method=payment_method,
-                    type=enums.OperationTypeEnum.CONFIRM,
-                    status=enums.OperationStatusEnum.FAILED,
-                )
-                uow.commit()
+            self.__add_operation_event(
+                payment_method, enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.FAILED
+            )
             return OperationResponse(
                 status=enums.OperationStatusEnum.FAILED,
                 payment_method=payment_method,
@@ -440,13 +548,7 @@ class PaymentMethodSaga:
             )
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.CONFIRM,
-                status=block_response.status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.CONFIRM, block_response.status)
 
         # Return Response
         return OperationResponse(
@@ -459,16 +561,15 @@ class PaymentMethodSaga:
     @deal.reason(TypeError, lambda self, payment_method, action_data: not self.after_confirm_blocks)
     @operation_type
     @implements_blocks
+    @within_single_transaction
+    @with_block_events_staged
     @with_payment_method_refreshed_from_storage
     @verified_with_decision_logic(dl.can_after_confirm)
     @with_started_operation_event_before_running
     def after_confirm(self, payment_method: "protocols.PaymentMethod") -> "protocols.OperationResponse":
 
         # Run Operation Blocks
-        responses = [
-            block.run(unit_of_work=self.unit_of_work, payment_method=payment_method)
-            for block in self.after_confirm_blocks
-        ]
+        responses = self.__run_blocks(self.after_confirm_blocks, payment_method)
 
         has_completed = all([response.status == enums.OperationStatusEnum.COMPLETED for response in responses])
 
@@ -483,13 +584,7 @@ class PaymentMethodSaga:
             status = enums.OperationStatusEnum.FAILED
 
         # Create OperationEvent with the outcome
-        with self.unit_of_work as uow:
-            uow.operation_events.add(
-                payment_method=payment_method,
-                type=enums.OperationTypeEnum.AFTER_CONFIRM,
-                status=status,
-            )
-            uow.commit()
+        self.__add_operation_event(payment_method, enums.OperationTypeEnum.AFTER_CONFIRM, status)
 
         # Return Response
         return OperationResponse(
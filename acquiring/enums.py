@@ -75,3 +75,11 @@ class AtemptStatusEnum(StrEnum):
     REQUIRES_CONFIRMATION = "requires_confirmation"
 
     CANCELED = "canceled"
+
+
+class CircuitStateEnum(StrEnum):
+    """States of the circuit breaker that guards the calls to a provider"""
+
+    CLOSED = "closed"  # calls go through
+    OPEN = "open"  # calls fail fast, without reaching the provider
+    HALF_OPEN = "half_open"  # a single trial call goes through
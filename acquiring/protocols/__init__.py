@@ -2,6 +2,7 @@ from typing import Optional, Protocol
 
 from .events import BlockEvent
 from .payments import (
+    AsyncBlock,
     Block,
     BlockResponse,
     DraftItem,
@@ -18,7 +19,17 @@ from .payments import (
 )
 from .primitives import ExistingPaymentAttemptId, ExistingPaymentMethodId
 from .providers import Adapter, AdapterResponse, Transaction
-from .storage import Repository, UnitOfWork
+from .storage import (
+    AsyncBatchRepository,
+    AsyncRepository,
+    AsyncUnitOfWork,
+    BatchRepository,
+    RawDataCodec,
+    RawDataStore,
+    Repository,
+    TransactionRepository,
+    UnitOfWork,
+)
 
 
 class PaymentMethodSaga(Protocol):
@@ -33,6 +44,12 @@ class PaymentMethodSaga(Protocol):
     confirm_block: Optional["Block"]
     after_confirm_blocks: list["Block"]
 
+    single_transaction: bool
+    staged_block_events: bool
+
+    concurrent_blocks: bool
+    block_timeout: Optional[float]
+
     def initialize(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
 
     def process_action(self, payment_method: "PaymentMethod", action_data: dict) -> "OperationResponse": ...
@@ -46,9 +63,46 @@ class PaymentMethodSaga(Protocol):
     def after_confirm(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
 
 
+class AsyncPaymentMethodSaga(Protocol):
+    unit_of_work: "AsyncUnitOfWork"
+
+    initialize_block: Optional["AsyncBlock"]
+    process_action_block: Optional["AsyncBlock"]
+
+    pay_block: "AsyncBlock"
+    after_pay_blocks: list["AsyncBlock"]
+
+    confirm_block: Optional["AsyncBlock"]
+    after_confirm_blocks: list["AsyncBlock"]
+
+    single_transaction: bool
+    staged_block_events: bool
+
+    concurrent_blocks: bool
+    block_timeout: Optional[float]
+
+    async def initialize(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
+
+    async def process_action(self, payment_method: "PaymentMethod", action_data: dict) -> "OperationResponse": ...
+
+    async def __pay(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
+
+    async def after_pay(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
+
+    async def confirm(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
+
+    async def after_confirm(self, payment_method: "PaymentMethod") -> "OperationResponse": ...
+
+
 __all__ = [
     "Adapter",
     "AdapterResponse",
+    "AsyncBlock",
+    "AsyncBatchRepository",
+    "AsyncPaymentMethodSaga",
+    "AsyncRepository",
+    "AsyncUnitOfWork",
+    "BatchRepository",
     "Block",
     "BlockEvent",
     "BlockResponse",
@@ -65,8 +119,11 @@ __all__ = [
     "PaymentMethod",
     "OperationEvent",
     "Milestone",
+    "RawDataCodec",
+    "RawDataStore",
     "Repository",
     "Token",
     "Transaction",
+    "TransactionRepository",
     "UnitOfWork",
 ]
@@ -7,13 +7,13 @@ https://typing.readthedocs.io/en/latest/spec/protocol.html#protocols
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Protocol, Sequence
+from typing import Mapping, Optional, Protocol, Sequence
 from uuid import UUID
 
 from acquiring import enums
 
 from . import primitives
-from .storage import UnitOfWork
+from .storage import AsyncUnitOfWork, UnitOfWork
 
 
 @dataclass(frozen=True, match_args=False)
@@ -106,6 +106,10 @@ class PaymentMethod(Protocol):
         status: enums.OperationStatusEnum,
     ) -> int: ...
 
+    def operation_event_counts(
+        self: "PaymentMethod",
+    ) -> Mapping[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum], int]: ...
+
 
 class DraftPaymentMethod(Protocol):
     payment_attempt_id: primitives.ExistingPaymentAttemptId
@@ -137,3 +141,10 @@ class Block(Protocol):
     def run(
         self, unit_of_work: UnitOfWork, payment_method: PaymentMethod, *args: Sequence, **kwargs: dict
     ) -> BlockResponse: ...
+
+
+class AsyncBlock(Protocol):
+
+    async def run(
+        self, unit_of_work: AsyncUnitOfWork, payment_method: PaymentMethod, *args: Sequence, **kwargs: dict
+    ) -> BlockResponse: ...
@@ -14,6 +14,7 @@ class AdapterResponse(Generic[Status], Protocol):
     timestamp: Optional[datetime]
     raw_data: str
     status: Status
+    data: dict  # raw_data, already parsed
 
 
 @dataclass
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from types import TracebackType
-from typing import Optional, Protocol, Self, runtime_checkable
+from typing import Optional, Protocol, Self, Sequence, runtime_checkable
 from uuid import UUID
 
 
@@ -12,6 +12,19 @@ class Repository(Protocol):
     def get(self, id: UUID): ...  # type: ignore[no-untyped-def]
 
 
+@runtime_checkable
+class BatchRepository(Repository, Protocol):
+    """Repository that can also insert many rows in a single query"""
+
+    def add_many(self, *args, **kwargs): ...  # type:ignore[no-untyped-def]
+
+
+@runtime_checkable
+class TransactionRepository(BatchRepository, Protocol):
+
+    def existing_external_ids(self, provider_name: str, external_ids: Sequence[str]) -> set[str]: ...
+
+
 @dataclass(match_args=False)
 class UnitOfWork(Protocol):
     payment_attempt_repository_class: type[Repository]
@@ -50,6 +63,9 @@ class UnitOfWork(Protocol):
 
         Database modules that do not support transactions should implement this method with void functionality.
 
+        When the unit of work is entered again before exiting (nested blocks), the nested blocks join
+        the transaction of the outermost one, and committing is deferred until the outermost block commits.
+
         See https://peps.python.org/pep-0249/#commit
         """
         pass
@@ -68,3 +84,90 @@ class UnitOfWork(Protocol):
         See https://peps.python.org/pep-0249/#rollback
         """
         pass
+
+    def close(self) -> None:
+        """
+        Releases the database connections that the current thread holds.
+
+        Threads that use a unit of work and then finish (see PaymentMethodSaga concurrent_blocks)
+        call it once they are done, so that their connections do not outlive them.
+        """
+        pass
+
+
+@runtime_checkable
+class AsyncRepository(Protocol):
+
+    async def add(self, *args, **kwargs): ...  # type:ignore[no-untyped-def]
+
+    async def get(self, id: UUID): ...  # type: ignore[no-untyped-def]
+
+
+@runtime_checkable
+class AsyncBatchRepository(AsyncRepository, Protocol):
+    """Same as BatchRepository, for storage accessed without blocking the event loop"""
+
+    async def add_many(self, *args, **kwargs): ...  # type:ignore[no-untyped-def]
+
+
+@dataclass(match_args=False)
+class AsyncUnitOfWork(Protocol):
+    """Same as UnitOfWork, for storage accessed without blocking the event loop"""
+
+    payment_attempt_repository_class: type[AsyncRepository]
+    payment_attempts: AsyncRepository = field(init=False, repr=False)
+
+    milestone_repository_class: type[AsyncRepository]
+    milestones: AsyncRepository = field(init=False, repr=False)
+
+    payment_method_repository_class: type[AsyncRepository]
+    payment_methods: AsyncRepository = field(init=False, repr=False)
+
+    operation_event_repository_class: type[AsyncRepository]
+    operation_events: AsyncRepository = field(init=False, repr=False)
+
+    block_event_repository_class: type[AsyncRepository]
+    block_events: AsyncRepository = field(init=False, repr=False)
+
+    transaction_repository_class: type[AsyncRepository]
+    transactions: AsyncRepository = field(init=False, repr=False)
+
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[Exception]],
+        exc_value: Optional[type[Exception]],
+        exc_tb: Optional[TracebackType],
+    ) -> None: ...
+
+    async def commit(self) -> None:
+        """See UnitOfWork.commit"""
+        pass
+
+    async def rollback(self) -> None:
+        """See UnitOfWork.rollback"""
+        pass
+
+
+class RawDataCodec(Protocol):
+    """Turns the raw data of a Transaction into the bytes that get stored, and back"""
+
+    @property
+    def name(self) -> str:
+        """Stored alongside the bytes, so that they can be decoded after the codec changes"""
+        ...
+
+    def encode(self, raw_data: str) -> bytes: ...
+
+    def decode(self, data: bytes) -> str: ...
+
+
+class RawDataStore(Protocol):
+    """Keeps the encoded raw data too large to be stored in the transactions table"""
+
+    def put(self, key: str, data: bytes) -> None: ...
+
+    def get(self, key: str) -> bytes: ...
+
+    def delete(self, key: str) -> None: ...
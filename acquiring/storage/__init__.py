@@ -1,5 +1,7 @@
 from acquiring import utils
 
+from . import codecs, ids
+
 # TODO models must be exposed, rather than having to access storage.***.models
 
 if utils.is_django_installed():
@@ -8,4 +10,4 @@ if utils.is_django_installed():
 elif utils.is_sqlalchemy_installed():
     from .sqlalchemy import models  # type:ignore[no-redef]
 
-__all__ = ["models"]
+__all__ = ["codecs", "ids", "models"]
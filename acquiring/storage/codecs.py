@@ -0,0 +1,131 @@
+"""
+Codecs used to store the raw data of Transactions, shared by every storage backend.
+
+Raw data gets compressed before it is stored, and the encoded bytes larger than max_inline_size
+spill over into a RawDataStore, with only a reference to them left in the transactions table.
+"""
+
+import gzip
+import pathlib
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from acquiring import protocols, utils
+
+if utils.is_zstandard_installed():
+    import zstandard
+
+
+@dataclass(frozen=True)
+class PlainCodec:
+    name: str = field(default="plain", init=False)
+
+    def encode(self, raw_data: str) -> bytes:
+        return raw_data.encode()
+
+    def decode(self, data: bytes) -> str:
+        return data.decode()
+
+
+@dataclass(frozen=True)
+class GzipCodec:
+    level: int = 6
+    name: str = field(default="gzip", init=False)
+
+    def encode(self, raw_data: str) -> bytes:
+        # mtime is fixed so that the same raw data always gets encoded into the same bytes
+        return gzip.compress(raw_data.encode(), compresslevel=self.level, mtime=0)
+
+    def decode(self, data: bytes) -> str:
+        return gzip.decompress(data).decode()
+
+
+@dataclass(frozen=True)
+class ZstdCodec:
+    """Requires zstandard to be installed"""
+
+    level: int = 3
+    name: str = field(default="zstd", init=False)
+
+    def encode(self, raw_data: str) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(raw_data.encode())
+
+    def decode(self, data: bytes) -> str:
+        return zstandard.ZstdDecompressor().decompress(data).decode()
+
+
+CODECS: dict[str, protocols.RawDataCodec] = {"plain": PlainCodec(), "gzip": GzipCodec()}
+if utils.is_zstandard_installed():
+    CODECS["zstd"] = ZstdCodec()
+
+
+@dataclass(frozen=True)
+class FileSystemRawDataStore:
+    directory: pathlib.Path
+
+    def put(self, key: str, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / key).write_bytes(data)
+
+    def get(self, key: str) -> bytes:
+        return (self.directory / key).read_bytes()
+
+    def delete(self, key: str) -> None:
+        (self.directory / key).unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class EncodedRawData:
+    """What gets stored in the transactions table, either the encoded bytes or the key they spilled over to"""
+
+    codec: str
+    data: Optional[bytes] = None
+    reference: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RawDataPolicy:
+    """
+    Encodes raw data with codec, spilling it over into store when it grows beyond max_inline_size bytes.
+
+    Without a store, everything stays in the transactions table.
+    Decoding uses the codec that the raw data was encoded with, which may not be the current one.
+
+    Raw data spills over into store as it gets encoded, before the transaction storing its reference commits,
+    so that a committed reference never points to missing raw data.
+    Repositories discard it again when the transaction does not commit.
+    Django has no hook on rollback, so Django repositories discard it once DjangoUnitOfWork ends its transaction.
+    """
+
+    codec: protocols.RawDataCodec = field(default_factory=GzipCodec)
+    max_inline_size: int = 64 * 1024  # bytes, once encoded
+    store: Optional[protocols.RawDataStore] = None
+
+    def encode(self, raw_data: str) -> EncodedRawData:
+        data = self.codec.encode(raw_data)
+        if self.store is None or len(data) <= self.max_inline_size:
+            return EncodedRawData(codec=self.codec.name, data=data)
+
+        reference = uuid.uuid4().hex
+        self.store.put(reference, data)
+        return EncodedRawData(codec=self.codec.name, reference=reference)
+
+    def discard(self, encoded_raw_data: EncodedRawData) -> None:
+        """Deletes the raw data that spilled over into store, if any"""
+        if encoded_raw_data.reference is not None and self.store is not None:
+            self.store.delete(encoded_raw_data.reference)
+
+    def decode(self, encoded_raw_data: EncodedRawData) -> str:
+        if encoded_raw_data.reference is not None:
+            if self.store is None:
+                raise ValueError(f"Raw data spilled over to {encoded_raw_data.reference}, but there is no store")
+            data = self.store.get(encoded_raw_data.reference)
+        else:
+            data = encoded_raw_data.data or b""
+
+        codec = self.codec if encoded_raw_data.codec == self.codec.name else CODECS[encoded_raw_data.codec]
+        return codec.decode(data)
+
+
+default_policy = RawDataPolicy()
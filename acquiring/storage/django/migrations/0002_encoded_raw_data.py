@@ -0,0 +1,47 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+from acquiring.storage import codecs
+
+
+def decode_raw_data(apps, schema_editor):
+    """Moves the encoded raw data back into raw_data, before it stops being nullable"""
+    Transaction = apps.get_model("acquiring", "Transaction")
+    if Transaction.objects.filter(raw_data_reference__isnull=False).exists():
+        raise RuntimeError("Raw data that spilled over must be moved back into the transactions table first")
+
+    for transaction in Transaction.objects.filter(raw_data_codec__isnull=False):
+        transaction.raw_data = codecs.CODECS[transaction.raw_data_codec].decode(bytes(transaction.encoded_raw_data))
+        transaction.save(update_fields=["raw_data"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="encoded_raw_data",
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="raw_data_codec",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="raw_data_reference",
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="raw_data",
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, decode_raw_data),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:00
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+REASON = "duplicate transaction"
+
+
+def archive_duplicate_transactions(apps, schema_editor):
+    """
+    Providers may have delivered the same event more than once before it had to be unique,
+    so only the earliest transaction stored for every event is kept.
+    The rest are provider records too, so they get moved into ArchivedRecord instead of being deleted.
+    """
+    Transaction = apps.get_model("acquiring", "Transaction")
+    ArchivedRecord = apps.get_model("acquiring", "ArchivedRecord")
+    earliest_ids = Transaction.objects.values("provider_name", "external_id").annotate(earliest_id=models.Min("id"))
+    duplicates = Transaction.objects.exclude(id__in=earliest_ids.values("earliest_id"))
+
+    archived_records = [
+        ArchivedRecord(
+            table_name=Transaction._meta.db_table,
+            record_id=str(duplicate.id),
+            reason=REASON,
+            data={
+                field.attname: None if field.value_from_object(duplicate) is None else field.value_to_string(duplicate)
+                for field in Transaction._meta.concrete_fields
+            },
+        )
+        for duplicate in duplicates
+    ]
+    if not archived_records:
+        return
+
+    ArchivedRecord.objects.bulk_create(archived_records)
+    Transaction.objects.filter(id__in=[record.record_id for record in archived_records]).delete()
+    logger.warning(
+        "Moved duplicate transactions %s into %s",
+        [record.record_id for record in archived_records],
+        ArchivedRecord._meta.db_table,
+    )
+
+
+def restore_duplicate_transactions(apps, schema_editor):
+    Transaction = apps.get_model("acquiring", "Transaction")
+    ArchivedRecord = apps.get_model("acquiring", "ArchivedRecord")
+    archived_records = ArchivedRecord.objects.filter(table_name=Transaction._meta.db_table, reason=REASON)
+
+    Transaction.objects.bulk_create(
+        Transaction(
+            **{
+                field.attname: (
+                    None if record.data[field.attname] is None else field.to_python(record.data[field.attname])
+                )
+                for field in Transaction._meta.concrete_fields
+            }
+        )
+        for record in archived_records
+    )
+    archived_records.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0002_encoded_raw_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedRecord",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                ("table_name", models.TextField()),
+                ("record_id", models.TextField()),
+                ("reason", models.TextField()),
+                ("data", models.JSONField()),
+            ],
+        ),
+        migrations.RunPython(archive_duplicate_transactions, restore_duplicate_transactions),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.UniqueConstraint(
+                fields=("provider_name", "external_id"), name="acquiring_transaction_provider_external_id"
+            ),
+        ),
+    ]
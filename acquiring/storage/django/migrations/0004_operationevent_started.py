@@ -0,0 +1,82 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:00
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+REASON = "duplicate started operation event"
+
+
+def archive_duplicate_started_operation_events(apps, schema_editor):
+    """
+    Concurrent processes may have started the same operation before it had to be unique,
+    so only the earliest started event of every operation is kept.
+    The rest get moved into ArchivedRecord instead of being deleted.
+    """
+    OperationEvent = apps.get_model("acquiring", "OperationEvent")
+    ArchivedRecord = apps.get_model("acquiring", "ArchivedRecord")
+    started = OperationEvent.objects.filter(status="started").exclude(type="refund")
+    earliest_ids = started.values("payment_method_id", "type").annotate(earliest_id=models.Min("id"))
+    duplicates = started.exclude(id__in=earliest_ids.values("earliest_id"))
+
+    archived_records = [
+        ArchivedRecord(
+            table_name=OperationEvent._meta.db_table,
+            record_id=str(duplicate.id),
+            reason=REASON,
+            data={
+                field.attname: None if field.value_from_object(duplicate) is None else field.value_to_string(duplicate)
+                for field in OperationEvent._meta.concrete_fields
+            },
+        )
+        for duplicate in duplicates
+    ]
+    if not archived_records:
+        return
+
+    ArchivedRecord.objects.bulk_create(archived_records)
+    OperationEvent.objects.filter(id__in=[record.record_id for record in archived_records]).delete()
+    logger.warning(
+        "Moved duplicate started operation events %s into %s",
+        [record.record_id for record in archived_records],
+        ArchivedRecord._meta.db_table,
+    )
+
+
+def restore_duplicate_started_operation_events(apps, schema_editor):
+    OperationEvent = apps.get_model("acquiring", "OperationEvent")
+    ArchivedRecord = apps.get_model("acquiring", "ArchivedRecord")
+    archived_records = ArchivedRecord.objects.filter(table_name=OperationEvent._meta.db_table, reason=REASON)
+    rows = [
+        {
+            field.attname: None if record.data[field.attname] is None else field.to_python(record.data[field.attname])
+            for field in OperationEvent._meta.concrete_fields
+        }
+        for record in archived_records
+    ]
+
+    OperationEvent.objects.bulk_create(OperationEvent(**row) for row in rows)
+    for row in rows:  # created_at is auto_now_add, so bulk_create did not keep it
+        OperationEvent.objects.filter(id=row["id"]).update(created_at=row["created_at"])
+    archived_records.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0003_transaction_provider_external_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(archive_duplicate_started_operation_events, restore_duplicate_started_operation_events),
+        migrations.AddConstraint(
+            model_name="operationevent",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "started"), models.Q(("type", "refund"), _negated=True)),
+                fields=("payment_method", "type"),
+                name="acquiring_operationevent_started",
+            ),
+        ),
+    ]
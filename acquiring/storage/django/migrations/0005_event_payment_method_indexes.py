@@ -0,0 +1,63 @@
+# Generated by Django 5.0.14 on 2026-10-17 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0004_operationevent_started"),
+    ]
+
+    operations = [
+        # Created first, so that lookups by PaymentMethod keep an index while the previous ones get dropped
+        migrations.AddIndex(
+            model_name="blockevent",
+            index=models.Index(
+                fields=["payment_method", "block_name", "status", "created_at"],
+                name="acquiring_blockevent_pm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="operationevent",
+            index=models.Index(
+                fields=["payment_method", "type", "status", "created_at"],
+                name="acquiring_operationevent_pm",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="blockevent",
+            name="payment_method",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="acquiring.paymentmethod",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="operationevent",
+            name="payment_method",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="operation_events",
+                to="acquiring.paymentmethod",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="operationevent",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("started", "Started"),
+                    ("failed", "Failed"),
+                    ("completed", "Completed"),
+                    ("requires_action", "Requires Action"),
+                    ("pending", "Pending"),
+                    ("not_performed", "Not Performed"),
+                ],
+                max_length=15,
+            ),
+        ),
+    ]
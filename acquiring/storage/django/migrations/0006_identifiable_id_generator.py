@@ -0,0 +1,44 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:37
+
+import acquiring.storage.django.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0005_event_payment_method_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="item",
+            name="id",
+            field=models.UUIDField(
+                default=acquiring.storage.django.models.new_id,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="paymentattempt",
+            name="id",
+            field=models.UUIDField(
+                default=acquiring.storage.django.models.new_id,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="paymentmethod",
+            name="id",
+            field=models.UUIDField(
+                default=acquiring.storage.django.models.new_id,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
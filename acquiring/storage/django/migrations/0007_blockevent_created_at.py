@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("acquiring", "0006_identifiable_id_generator"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="blockevent",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
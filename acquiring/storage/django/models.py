@@ -1,20 +1,28 @@
-from uuid import uuid4
+from uuid import UUID
 
 import django.db.models
+import django.utils.timezone
+from django.conf import settings
 from django.core import validators as django_validators
 
 from acquiring import domain, protocols
+from acquiring.storage import codecs, ids
 
 CURRENCY_CODE_MAX_LENGTH = 3
 
 
+def new_id() -> UUID:
+    """Id of new rows, made by the generator named in the ACQUIRING_ID_GENERATOR setting (see ids.py)"""
+    return ids.generator(getattr(settings, "ACQUIRING_ID_GENERATOR", ids.DEFAULT_GENERATOR))()
+
+
 class Identifiable(django.db.models.Model):
     """Mixin for models that can be identified"""
 
     created_at = django.db.models.DateTimeField(auto_now_add=True)
 
     # https://docs.djangoproject.com/en/5.0/ref/models/fields/#uuidfield
-    id = django.db.models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    id = django.db.models.UUIDField(primary_key=True, default=new_id, editable=False)
 
     class Meta:
         abstract = True
@@ -224,13 +232,32 @@ class OperationEvent(django.db.models.Model):
     created_at = django.db.models.DateTimeField(auto_now_add=True)
 
     type = django.db.models.CharField(max_length=16, choices=OperationEventTypeChoices.choices)
-    status = django.db.models.CharField(max_length=15, choices=StatusChoices.choices, db_index=True)
+    status = django.db.models.CharField(max_length=15, choices=StatusChoices.choices)
     payment_method = django.db.models.ForeignKey(
         PaymentMethod,
         on_delete=django.db.models.CASCADE,
         related_name="operation_events",
+        db_index=False,  # see Meta.indexes
     )
 
+    class Meta:
+        # Concurrent processes cannot both start the same operation, the one that inserts second fails.
+        # Refunds are left out, as a PaymentMethod can be refunded more than once
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=["payment_method", "type"],
+                condition=django.db.models.Q(status="started") & ~django.db.models.Q(type="refund"),
+                name="acquiring_operationevent_started",
+            ),
+        ]
+        # OperationEvents are always looked up by PaymentMethod, then by type and status
+        indexes = [
+            django.db.models.Index(
+                fields=["payment_method", "type", "status", "created_at"],
+                name="acquiring_operationevent_pm",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"[type={self.type}, status={self.status}]"
 
@@ -244,11 +271,25 @@ class OperationEvent(django.db.models.Model):
 
 
 class BlockEvent(django.db.models.Model):
-    created_at = django.db.models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, which would overwrite when BlockEventRepository.add_many got the block events staged
+    created_at = django.db.models.DateTimeField(default=django.utils.timezone.now, editable=False)
     status = django.db.models.CharField(max_length=15, choices=StatusChoices.choices)
-    payment_method = django.db.models.ForeignKey(PaymentMethod, on_delete=django.db.models.CASCADE)
+    payment_method = django.db.models.ForeignKey(
+        PaymentMethod,
+        on_delete=django.db.models.CASCADE,
+        db_index=False,  # see Meta.indexes
+    )
     block_name = django.db.models.CharField(max_length=20)
 
+    class Meta:
+        # BlockEvents are always looked up by PaymentMethod, then by block and status
+        indexes = [
+            django.db.models.Index(
+                fields=["payment_method", "block_name", "status", "created_at"],
+                name="acquiring_blockevent_pm",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"[{self.block_name}|status={self.status}]"
 
@@ -268,7 +309,12 @@ class Transaction(django.db.models.Model):
     # Filled with Provided data on request, not auto added
     timestamp = django.db.models.DateTimeField(auto_now_add=False)
 
-    raw_data = django.db.models.JSONField()
+    # Raw data is encoded with the RawDataPolicy of the repository (see codecs.py) into encoded_raw_data,
+    # or into raw_data_reference once it spills over. Only rows stored before that have raw_data.
+    raw_data = django.db.models.JSONField(null=True)
+    raw_data_codec = django.db.models.TextField(null=True)
+    encoded_raw_data = django.db.models.BinaryField(null=True)
+    raw_data_reference = django.db.models.TextField(null=True)
 
     provider_name = django.db.models.TextField()
 
@@ -278,14 +324,50 @@ class Transaction(django.db.models.Model):
         related_name="transaction",
     )
 
+    class Meta:
+        # Providers deliver the same event more than once, and it must only be stored once
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=["provider_name", "external_id"],
+                name="acquiring_transaction_provider_external_id",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"[provider={self.provider_name}|payment_method={self.payment_method_id}|{self.external_id}]"
 
-    def to_domain(self) -> "protocols.Transaction":
+    def to_domain(self, raw_data_policy: codecs.RawDataPolicy = codecs.default_policy) -> "protocols.Transaction":
         return domain.Transaction(
             external_id=self.external_id,
             timestamp=self.timestamp,
-            raw_data=self.raw_data,
+            raw_data=(
+                self.raw_data
+                if self.raw_data_codec is None
+                else raw_data_policy.decode(
+                    codecs.EncodedRawData(
+                        codec=self.raw_data_codec,
+                        # Some database backends return a memoryview
+                        data=bytes(self.encoded_raw_data) if self.encoded_raw_data is not None else None,
+                        reference=self.raw_data_reference,
+                    )
+                )
+            ),
             provider_name=self.provider_name,
             payment_method_id=self.payment_method_id,
         )
+
+
+class ArchivedRecord(django.db.models.Model):
+    """
+    A row that a migration took out of its table (e.g. a duplicate, before something became unique),
+    kept with every column as Field.value_to_string serialized it, so that reversing the migration puts it back.
+    """
+
+    archived_at = django.db.models.DateTimeField(auto_now_add=True)
+    table_name = django.db.models.TextField()
+    record_id = django.db.models.TextField()
+    reason = django.db.models.TextField()
+    data = django.db.models.JSONField()
+
+    def __str__(self) -> str:
+        return f"[{self.table_name}|{self.record_id}|{self.reason}]"
@@ -1,11 +1,78 @@
+import threading
+from datetime import datetime
+from typing import Optional, Sequence
 from uuid import UUID
 
 import deal
+import django.db
+import django.utils.timezone
+from django.conf import settings
 
 from acquiring import domain, enums, protocols
+from acquiring.storage import codecs
 from acquiring.storage.django import models
 
 
+def _aware(value: datetime) -> datetime:
+    """Domain datetimes may be naive (e.g. datetime.now()), meaning local time rather than settings.TIME_ZONE"""
+    if not settings.USE_TZ or django.utils.timezone.is_aware(value):
+        return value
+    return value.astimezone()
+
+
+_spilled_raw_data = threading.local()  # Django connections are per thread, see discard_raw_data_unless_committed
+
+
+def _uncommitted_raw_data() -> dict[str, tuple[codecs.RawDataPolicy, codecs.EncodedRawData]]:
+    return _spilled_raw_data.__dict__.setdefault("uncommitted", {})
+
+
+def discard_raw_data_unless_committed(
+    raw_data_policy: codecs.RawDataPolicy,
+    encoded_raw_data: codecs.EncodedRawData,
+) -> None:
+    """
+    Raw data that spilled over into the store of raw_data_policy gets discarded
+    if the transaction it was stored in does not commit (see RawDataPolicy).
+
+    Django has no hook on rollback, so spilled raw data is kept track of until its transaction commits,
+    and whatever is left once no transaction is open gets discarded by discard_uncommitted_raw_data.
+    """
+    if encoded_raw_data.reference is None:
+        return
+
+    uncommitted = _uncommitted_raw_data()
+    uncommitted[encoded_raw_data.reference] = (raw_data_policy, encoded_raw_data)
+    # Rolling back (or back to a savepoint) drops the hook, outside atomic blocks it runs right away
+    django.db.transaction.on_commit(lambda: uncommitted.pop(encoded_raw_data.reference, None))
+
+
+def uncommitted_raw_data() -> frozenset[str]:
+    """References of the spilled raw data that has not committed yet, see DjangoUnitOfWork.savepoint"""
+    return frozenset(_uncommitted_raw_data())
+
+
+def discard_uncommitted_raw_data(since: Optional[frozenset[str]] = None) -> None:
+    """
+    Called by DjangoUnitOfWork once its transaction ends, see discard_raw_data_unless_committed.
+
+    Given since (as returned by uncommitted_raw_data), only what spilled over afterwards gets discarded,
+    which is what rolling back to a savepoint needs.
+    """
+    if since is None and django.db.transaction.get_connection().in_atomic_block:
+        return  # An outer atomic block may still commit it
+
+    uncommitted = _uncommitted_raw_data()
+    for reference in [reference for reference in uncommitted if since is None or reference not in since]:
+        raw_data_policy, encoded_raw_data = uncommitted.pop(reference)
+        raw_data_policy.discard(encoded_raw_data)
+
+
+def _ordered_operation_events(lookup: str) -> django.db.models.Prefetch:
+    """OperationEvents come in the order they were created rather than in the order of whichever index gets used"""
+    return django.db.models.Prefetch(lookup, queryset=models.OperationEvent.objects.order_by("created_at"))
+
+
 class PaymentAttemptRepository:
 
     def add(self, data: "protocols.DraftPaymentAttempt") -> "protocols.PaymentAttempt": ...  # type: ignore[empty-body]
@@ -16,7 +83,10 @@ class PaymentAttemptRepository:
     )
     def get(self, id: UUID) -> "protocols.PaymentAttempt":
         try:
-            payment_attempt = models.PaymentAttempt.objects.prefetch_related("payment_methods").get(id=id)
+            payment_attempt = models.PaymentAttempt.objects.prefetch_related(
+                "payment_methods",
+                _ordered_operation_events("payment_methods__operation_events"),
+            ).get(id=id)
             return payment_attempt.to_domain()
         except models.PaymentAttempt.DoesNotExist:
             raise domain.PaymentAttempt.DoesNotExist
@@ -38,7 +108,9 @@ class PaymentMethodRepository:
     )
     def get(self, id: UUID) -> "protocols.PaymentMethod":
         try:
-            payment_method = models.PaymentMethod.objects.prefetch_related("operation_events", "tokens").get(id=id)
+            payment_method = models.PaymentMethod.objects.prefetch_related(
+                _ordered_operation_events("operation_events"), "tokens"
+            ).get(id=id)
             return payment_method.to_domain()
         except models.PaymentMethod.DoesNotExist:
             raise domain.PaymentMethod.DoesNotExist
@@ -46,7 +118,10 @@ class PaymentMethodRepository:
 
 class OperationEventRepository:
 
-    @deal.safe
+    @deal.reason(
+        domain.OperationEvent.Duplicated,
+        lambda _, payment_method, type, status: status == enums.OperationStatusEnum.STARTED,
+    )
     def add(
         self,
         payment_method: "protocols.PaymentMethod",
@@ -58,11 +133,38 @@ class OperationEventRepository:
             type=type,
             status=status,
         )
-        db_operation_event.save()
+        try:
+            with django.db.transaction.atomic():  # so that a duplicate does not break the transaction it is part of
+                db_operation_event.save()
+        except django.db.IntegrityError:
+            if status != enums.OperationStatusEnum.STARTED:
+                raise
+            raise domain.OperationEvent.Duplicated  # another process started this operation
         operation_event = db_operation_event.to_domain()
         payment_method.operation_events.append(operation_event)
         return operation_event
 
+    @deal.safe
+    def add_many(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        types_and_statuses: Sequence[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]],
+    ) -> list["protocols.OperationEvent"]:
+        """Same as add, but inserting every OperationEvent in a single query"""
+        db_operation_events = models.OperationEvent.objects.bulk_create(
+            [
+                models.OperationEvent(
+                    payment_method_id=payment_method.id,
+                    type=type,
+                    status=status,
+                )
+                for type, status in types_and_statuses
+            ]
+        )
+        operation_events = [db_operation_event.to_domain() for db_operation_event in db_operation_events]
+        payment_method.operation_events.extend(operation_events)
+        return operation_events
+
     def get(self, id: UUID) -> "protocols.OperationEvent": ...  # type: ignore[empty-body]
 
 
@@ -104,6 +206,31 @@ class BlockEventRepository:
         db_block_event.save()
         return db_block_event.to_domain()
 
+    @deal.reason(
+        ValueError,
+        lambda self, payment_method, block_events: any(
+            block_event.payment_method_id != payment_method.id for block_event in block_events
+        ),
+    )
+    def add_many(
+        self, payment_method: "protocols.PaymentMethod", block_events: Sequence["protocols.BlockEvent"]
+    ) -> list["protocols.BlockEvent"]:
+        """Same as add, but inserting every BlockEvent in a single query"""
+        if any(block_event.payment_method_id != payment_method.id for block_event in block_events):
+            raise ValueError("BlockEvent is not associated with provided PaymentMethod")
+        db_block_events = models.BlockEvent.objects.bulk_create(
+            [
+                models.BlockEvent(
+                    created_at=_aware(block_event.created_at),
+                    status=block_event.status,
+                    payment_method_id=payment_method.id,
+                    block_name=block_event.block_name,
+                )
+                for block_event in block_events
+            ]
+        )
+        return [db_block_event.to_domain() for db_block_event in db_block_events]
+
     def get(self, id: UUID) -> "protocols.BlockEvent": ...  # type: ignore[empty-body]
 
 
@@ -111,22 +238,81 @@ class BlockEventRepository:
 # TODO Test when payment method id does not correspond to any existing payment method
 class TransactionRepository:
 
-    @deal.safe
+    raw_data_policy: codecs.RawDataPolicy = codecs.default_policy  # Override in a subclass to plug another one
+
+    @deal.raises(domain.Transaction.Duplicated, django.db.DatabaseError)
     def add(
         self,
         transaction: "protocols.Transaction",
     ) -> "protocols.Transaction":
+        encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
         db_transaction = models.Transaction(
             external_id=transaction.external_id,
             timestamp=transaction.timestamp,
-            raw_data=transaction.raw_data,
+            raw_data_codec=encoded_raw_data.codec,
+            encoded_raw_data=encoded_raw_data.data,
+            raw_data_reference=encoded_raw_data.reference,
             provider_name=transaction.provider_name,
             payment_method_id=transaction.payment_method_id,
         )
-        db_transaction.save()
-        return db_transaction.to_domain()
+        try:
+            with django.db.transaction.atomic():  # so that a duplicate does not break the transaction it is part of
+                db_transaction.save()
+        except django.db.DatabaseError as error:
+            self.raw_data_policy.discard(encoded_raw_data)
+            if isinstance(error, django.db.IntegrityError) and self.existing_external_ids(
+                transaction.provider_name, [transaction.external_id]
+            ):
+                raise domain.Transaction.Duplicated  # the provider delivered this event again
+            raise
+        discard_raw_data_unless_committed(self.raw_data_policy, encoded_raw_data)
+        return transaction  # no need to decode what just got encoded
+
+    def add_many(self, transactions: Sequence["protocols.Transaction"]) -> list["protocols.Transaction"]:
+        """Same as add, but inserting every Transaction in a single query"""
+        encoded_raw_data_list = []
+        db_transactions = []
+        for transaction in transactions:
+            encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
+            encoded_raw_data_list.append(encoded_raw_data)
+            db_transactions.append(
+                models.Transaction(
+                    external_id=transaction.external_id,
+                    timestamp=transaction.timestamp,
+                    raw_data_codec=encoded_raw_data.codec,
+                    encoded_raw_data=encoded_raw_data.data,
+                    raw_data_reference=encoded_raw_data.reference,
+                    provider_name=transaction.provider_name,
+                    payment_method_id=transaction.payment_method_id,
+                )
+            )
+        try:
+            models.Transaction.objects.bulk_create(db_transactions)
+        except django.db.DatabaseError:
+            for encoded_raw_data in encoded_raw_data_list:
+                self.raw_data_policy.discard(encoded_raw_data)
+            raise
+        for encoded_raw_data in encoded_raw_data_list:
+            discard_raw_data_unless_committed(self.raw_data_policy, encoded_raw_data)
+        return list(transactions)
+
+    def existing_external_ids(self, provider_name: str, external_ids: Sequence[str]) -> set[str]:
+        """Those of external_ids already stored for provider_name, in a single query"""
+        return set(
+            models.Transaction.objects.filter(provider_name=provider_name, external_id__in=external_ids).values_list(
+                "external_id", flat=True
+            )
+        )
 
-    def get(self, id: UUID) -> "protocols.Transaction": ...  # type: ignore[empty-body]
+    @deal.reason(
+        domain.Transaction.DoesNotExist,
+        lambda _, id: models.Transaction.objects.filter(id=id).count() == 0,
+    )
+    def get(self, id: UUID) -> "protocols.Transaction":
+        try:
+            return models.Transaction.objects.get(id=id).to_domain(self.raw_data_policy)
+        except models.Transaction.DoesNotExist:
+            raise domain.Transaction.DoesNotExist
 
 
 class TokenRepository:
@@ -1,11 +1,14 @@
 from dataclasses import dataclass, field
 from types import TracebackType
-from typing import Self
+from typing import Optional, Self
 
+import django.db
 import django.db.transaction
 
 from acquiring import protocols
 
+from .repositories import discard_uncommitted_raw_data, uncommitted_raw_data
+
 
 @dataclass
 class DjangoUnitOfWork:
@@ -16,22 +19,27 @@ class DjangoUnitOfWork:
     """
 
     payment_attempt_repository_class: type[protocols.Repository]
-    payment_attempts: protocols.Repository = field(init=False, repr=False)
+    _payment_attempts: protocols.Repository = field(init=False, repr=False)
 
     milestone_repository_class: type[protocols.Repository]
-    milestones: protocols.Repository = field(init=False, repr=False)
+    _milestones: protocols.Repository = field(init=False, repr=False)
 
     payment_method_repository_class: type[protocols.Repository]
-    payment_methods: protocols.Repository = field(init=False, repr=False)
+    _payment_methods: protocols.Repository = field(init=False, repr=False)
 
     operation_event_repository_class: type[protocols.Repository]
-    operation_events: protocols.Repository = field(init=False, repr=False)
+    _operation_events: protocols.Repository = field(init=False, repr=False)
 
     block_event_repository_class: type[protocols.Repository]
-    block_events: protocols.Repository = field(init=False, repr=False)
+    _block_events: protocols.Repository = field(init=False, repr=False)
 
     transaction_repository_class: type[protocols.Repository]
-    transactions: protocols.Repository = field(init=False, repr=False)
+    _transactions: protocols.Repository = field(init=False, repr=False)
+
+    depth: int = field(default=0, init=False, repr=False)
+    transaction: Optional[django.db.transaction.Atomic] = field(default=None, init=False, repr=False)
+    _needs_resume: bool = field(default=False, init=False, repr=False)  # see commit
+    savepoints: dict[str, frozenset[str]] = field(default_factory=dict, init=False, repr=False)  # see savepoint
 
     def __enter__(self) -> Self:
         """
@@ -42,18 +50,62 @@ class DjangoUnitOfWork:
         https://github.com/django/django/blob/main/django/db/transaction.py#L182
 
         I trust that that code is better than anything I could build myself.
+
+        Entering an already entered unit of work joins the transaction of the outermost block.
         """
+        self.depth += 1
+        if self.depth > 1:
+            self._resume_if_needed()
+            return self
+
+        self._payment_attempts = self.payment_attempt_repository_class()
+        self._milestones = self.milestone_repository_class()
+        self._payment_methods = self.payment_method_repository_class()
+        self._operation_events = self.operation_event_repository_class()
+        self._block_events = self.block_event_repository_class()
+        self._transactions = self.transaction_repository_class()
+
+        self._begin()
+        return self
+
+    def _begin(self) -> None:
         self.transaction = django.db.transaction.atomic()
         self.transaction.__enter__()
 
-        self.payment_attempts = self.payment_attempt_repository_class()
-        self.milestones = self.milestone_repository_class()
-        self.payment_methods = self.payment_method_repository_class()
-        self.operation_events = self.operation_event_repository_class()
-        self.block_events = self.block_event_repository_class()
-        self.transactions = self.transaction_repository_class()
-
-        return self
+    def _resume_if_needed(self) -> None:
+        if self._needs_resume:
+            self._needs_resume = False
+            self._begin()
+
+    @property
+    def payment_attempts(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._payment_attempts
+
+    @property
+    def milestones(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._milestones
+
+    @property
+    def payment_methods(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._payment_methods
+
+    @property
+    def operation_events(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._operation_events
+
+    @property
+    def block_events(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._block_events
+
+    @property
+    def transactions(self) -> protocols.Repository:
+        self._resume_if_needed()
+        return self._transactions
 
     def __exit__(
         self,
@@ -64,15 +116,71 @@ class DjangoUnitOfWork:
         """
         See django.db.transaction Atomic.__exit__ here
         https://github.com/django/django/blob/main/django/db/transaction.py#L224
+
+        Only the outermost block finishes the transaction, nested blocks leave it open.
+        Nothing is left to finish when nothing was done since the last commit.
         """
-        return self.transaction.__exit__(exc_type, exc_value, exc_tb)
+        self.depth -= 1
+        if self.depth > 0:
+            return None
+
+        self._needs_resume = False
+        self.savepoints.clear()
+        transaction, self.transaction = self.transaction, None
+        if transaction is None:
+            return None
+        try:
+            return transaction.__exit__(exc_type, exc_value, exc_tb)
+        finally:
+            discard_uncommitted_raw_data()
 
     def commit(self) -> None:
         """
-        In Django, savepoints can be implemented by exiting the transaction and initiating a new one.
+        Commits the transaction of the outermost block, keeping the repositories for the next one.
+
+        The next transaction only begins when a repository, a savepoint or a nested block is used after committing,
+        so committing right before leaving the block costs no further queries.
+        Inside nested blocks, committing is deferred to the outermost block.
         """
-        self.transaction.__exit__(None, None, None)
-        self.__enter__()
+        if self.depth > 1 or self.transaction is None:
+            return
+
+        self.savepoints.clear()
+        transaction, self.transaction = self.transaction, None
+        try:
+            transaction.__exit__(None, None, None)
+        finally:
+            discard_uncommitted_raw_data()
+        self._needs_resume = True
 
     def rollback(self) -> None:
+        if self.transaction is None:
+            return  # Nothing was done since the last commit
         django.db.transaction.set_rollback(True)
+
+    def close(self) -> None:
+        """Django opens a connection per thread, which only gets closed at the end of a request otherwise"""
+        django.db.connections.close_all()
+
+    def savepoint(self) -> str:
+        """
+        Marks a point of the transaction that rollback_to_savepoint can go back to,
+        without rolling back what was done before it.
+
+        See https://docs.djangoproject.com/en/5.0/topics/db/transactions/#savepoints
+
+        Rolling back to a savepoint does not drop the on_commit hooks registered after it,
+        so the raw data spilled over since then gets discarded by the unit of work itself.
+        """
+        self._resume_if_needed()
+        savepoint = django.db.transaction.savepoint()
+        self.savepoints[savepoint] = uncommitted_raw_data()
+        return savepoint
+
+    def rollback_to_savepoint(self, savepoint: str) -> None:
+        django.db.transaction.savepoint_rollback(savepoint)
+        discard_uncommitted_raw_data(since=self.savepoints[savepoint])
+
+    def release_savepoint(self, savepoint: str) -> None:
+        django.db.transaction.savepoint_commit(savepoint)
+        self.savepoints.pop(savepoint, None)
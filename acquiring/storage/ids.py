@@ -0,0 +1,59 @@
+"""
+Generators of the UUIDs that rows get as primary keys, shared by every storage backend.
+
+Random uuid4 ids land anywhere in the primary key index, so tables that keep growing pay for it
+with page splits and cache misses on every insert. uuid7 ids start with a timestamp instead,
+so new rows get appended to the right-hand edge of the index.
+
+Backends pick the generator by name, from ACQUIRING_ID_GENERATOR
+(a Django setting, or an environment variable with SQLAlchemy), see generator.
+"""
+
+import functools
+import importlib
+import os
+import threading
+import time
+import uuid
+from typing import Callable
+
+DEFAULT_GENERATOR = "uuid4"
+
+_uuid7_lock = threading.Lock()
+_last_uuid7_timestamp = 0  # milliseconds, shifted to make room for the counter
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time ordered UUID, version 7 of RFC 9562.
+
+    48 bits of Unix time in milliseconds, then a 12 bit counter (rand_a), then 62 random bits.
+    The counter keeps the ids made by a process within the same millisecond increasing,
+    borrowing from the next millisecond when it overflows.
+
+    See https://www.rfc-editor.org/rfc/rfc9562#name-uuid-version-7
+    """
+    global _last_uuid7_timestamp
+    with _uuid7_lock:
+        _last_uuid7_timestamp = max((time.time_ns() // 1_000_000) << 12, _last_uuid7_timestamp + 1)
+        timestamp = _last_uuid7_timestamp
+
+    random_bits = int.from_bytes(os.urandom(8)) & (1 << 62) - 1
+    return uuid.UUID(
+        int=(timestamp >> 12) << 80 | 0x7 << 76 | (timestamp & 0xFFF) << 64 | 0b10 << 62 | random_bits,
+    )
+
+
+GENERATORS: dict[str, Callable[[], uuid.UUID]] = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+@functools.lru_cache
+def generator(name: str) -> Callable[[], uuid.UUID]:
+    """Generator registered in GENERATORS under name, or the callable found at the dotted path name"""
+    if name in GENERATORS:
+        return GENERATORS[name]
+
+    module_name, _, attribute = name.rpartition(".")
+    if not module_name:
+        raise ValueError(f"Unknown id generator {name!r}, expected one of {sorted(GENERATORS)} or a dotted path")
+    return getattr(importlib.import_module(module_name), attribute)
@@ -1,4 +1,14 @@
-from . import models
+from . import engine, models
+from .async_repositories import (
+    AsyncBlockEventRepository,
+    AsyncMilestoneRepository,
+    AsyncOperationEventRepository,
+    AsyncPaymentAttemptRepository,
+    AsyncPaymentMethodRepository,
+    AsyncTransactionRepository,
+)
+from .async_unit_of_work import AsyncSqlAlchemyUnitOfWork
+from .engine import EngineSettings
 from .repositories import (
     BlockEventRepository,
     MilestoneRepository,
@@ -10,7 +20,16 @@ from .repositories import (
 from .unit_of_work import SqlAlchemyUnitOfWork
 
 __all__ = [
+    "engine",
     "models",
+    "AsyncBlockEventRepository",
+    "AsyncMilestoneRepository",
+    "AsyncOperationEventRepository",
+    "AsyncPaymentAttemptRepository",
+    "AsyncPaymentMethodRepository",
+    "AsyncSqlAlchemyUnitOfWork",
+    "AsyncTransactionRepository",
+    "EngineSettings",
     "BlockEventRepository",
     "PaymentAttemptRepository",
     "PaymentMethodRepository",
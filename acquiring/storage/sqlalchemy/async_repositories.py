@@ -0,0 +1,336 @@
+"""
+Same repositories as in repositories.py, for AsyncSqlAlchemyUnitOfWork.
+
+Relationships cannot be lazy loaded through an AsyncSession,
+so everything that to_domain reads gets loaded eagerly.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence
+from uuid import UUID
+
+import deal
+import sqlalchemy
+from sqlalchemy import orm
+from sqlalchemy.ext import asyncio
+
+from acquiring import domain, enums, protocols
+from acquiring.storage import codecs
+
+from . import models
+from .repositories import discard_raw_data_unless_committed, insert_unless_duplicated
+
+
+@dataclass
+class AsyncPaymentAttemptRepository:
+
+    session: asyncio.AsyncSession
+
+    async def add(self, data: "protocols.DraftPaymentAttempt") -> "protocols.PaymentAttempt":  # type:ignore[empty-body]
+        ...
+
+    @deal.raises(domain.PaymentAttempt.DoesNotExist)
+    async def get(self, id: UUID) -> "protocols.PaymentAttempt":
+        result = await self.session.execute(
+            sqlalchemy.select(models.PaymentAttempt)
+            .options(
+                orm.selectinload(models.PaymentAttempt.payment_methods).selectinload(
+                    models.PaymentMethod.operation_events
+                ),
+            )
+            .filter(models.PaymentAttempt.id == id)
+        )
+        try:
+            return result.scalars().one().to_domain()
+        except orm.exc.NoResultFound:
+            raise domain.PaymentAttempt.DoesNotExist
+
+
+@dataclass
+class AsyncMilestoneRepository:
+
+    session: asyncio.AsyncSession
+
+    @deal.safe
+    async def add(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        type: enums.AtemptStatusEnum,
+    ) -> "protocols.Milestone":
+        db_milestone = models.Milestone(
+            payment_method_id=payment_method.id,
+            payment_attempt_id=payment_method.payment_attempt_id,
+            type=type,
+        )
+        self.session.add(db_milestone)
+        await self.session.flush()
+        return db_milestone.to_domain()
+
+    async def get(self, id: UUID) -> "protocols.Milestone": ...  # type:ignore[empty-body]
+
+
+@dataclass
+class AsyncPaymentMethodRepository:
+
+    session: asyncio.AsyncSession
+
+    @deal.safe
+    async def add(self, data: "protocols.DraftPaymentMethod") -> "protocols.PaymentMethod":
+        db_payment_method = models.PaymentMethod(
+            payment_attempt_id=data.payment_attempt_id,
+            operation_events=[],  # A new PaymentMethod has none, no need to query for them
+        )
+        self.session.add(db_payment_method)
+        await self.session.flush()
+        return db_payment_method.to_domain()
+
+    @deal.raises(domain.PaymentMethod.DoesNotExist)
+    async def get(self, id: UUID) -> "protocols.PaymentMethod":
+        result = await self.session.execute(
+            sqlalchemy.select(models.PaymentMethod)
+            .options(
+                orm.selectinload(models.PaymentMethod.operation_events),
+            )
+            .filter_by(id=id)
+        )
+        try:
+            return result.scalars().one().to_domain()
+        except orm.exc.NoResultFound:
+            raise domain.PaymentMethod.DoesNotExist
+
+
+@dataclass
+class AsyncOperationEventRepository:
+
+    session: asyncio.AsyncSession
+
+    @deal.reason(
+        domain.OperationEvent.Duplicated,
+        lambda _, payment_method, type, status: status == enums.OperationStatusEnum.STARTED,
+    )
+    async def add(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        type: enums.OperationTypeEnum,
+        status: enums.OperationStatusEnum,
+    ) -> "protocols.OperationEvent":
+        operation_event = domain.OperationEvent(
+            created_at=models.now(),
+            type=type,
+            status=status,
+            payment_method_id=payment_method.id,
+        )
+        await self.session.flush()  # see add_many
+        result = await self.session.execute(
+            insert_unless_duplicated(
+                self.session.get_bind().dialect,
+                models.OperationEvent.__table__,
+                ["payment_method_id", "type"],
+                index_where=sqlalchemy.text(models.STARTED_OPERATION_EVENTS),
+            ),
+            {
+                "id": models.u(),
+                "created_at": operation_event.created_at,
+                "type": operation_event.type,
+                "status": operation_event.status,
+                "payment_method_id": operation_event.payment_method_id,
+            },
+        )
+        if result.rowcount == 0:
+            raise domain.OperationEvent.Duplicated  # another process started this operation
+        payment_method.operation_events.append(operation_event)
+        return operation_event
+
+    @deal.safe
+    async def add_many(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        types_and_statuses: Sequence[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]],
+    ) -> list["protocols.OperationEvent"]:
+        """Same as add, but inserting every OperationEvent in a single executemany statement"""
+        operation_events: list["protocols.OperationEvent"] = [
+            domain.OperationEvent(
+                created_at=models.now(),
+                type=type,
+                status=status,
+                payment_method_id=payment_method.id,
+            )
+            for type, status in types_and_statuses
+        ]
+        if operation_events:
+            await self.session.flush()  # Core inserts do not autoflush the rows they refer to
+            await self.session.execute(
+                sqlalchemy.insert(models.OperationEvent.__table__),
+                [
+                    {
+                        "id": models.u(),
+                        "created_at": operation_event.created_at,
+                        "type": operation_event.type,
+                        "status": operation_event.status,
+                        "payment_method_id": operation_event.payment_method_id,
+                    }
+                    for operation_event in operation_events
+                ],
+            )
+        payment_method.operation_events.extend(operation_events)
+        return operation_events
+
+    async def get(self, id: UUID) -> "protocols.OperationEvent": ...  # type: ignore[empty-body]
+
+
+@dataclass
+class AsyncBlockEventRepository:
+
+    session: asyncio.AsyncSession
+
+    @deal.reason(
+        ValueError,
+        lambda self, payment_method, block_event: block_event.payment_method_id != payment_method.id,
+    )
+    async def add(
+        self, payment_method: "protocols.PaymentMethod", block_event: "protocols.BlockEvent"
+    ) -> "protocols.BlockEvent":
+        if block_event.payment_method_id != payment_method.id:
+            raise ValueError("BlockEvent is not associated with provided PaymentMethod")
+        db_block_event = models.BlockEvent(
+            status=block_event.status,
+            payment_method_id=payment_method.id,
+            block_name=block_event.block_name,
+        )
+        self.session.add(db_block_event)
+        return db_block_event.to_domain()
+
+    @deal.reason(
+        ValueError,
+        lambda self, payment_method, block_events: any(
+            block_event.payment_method_id != payment_method.id for block_event in block_events
+        ),
+    )
+    async def add_many(
+        self, payment_method: "protocols.PaymentMethod", block_events: Sequence["protocols.BlockEvent"]
+    ) -> list["protocols.BlockEvent"]:
+        """Same as add, but inserting every BlockEvent in a single executemany statement"""
+        if any(block_event.payment_method_id != payment_method.id for block_event in block_events):
+            raise ValueError("BlockEvent is not associated with provided PaymentMethod")
+        added_block_events: list["protocols.BlockEvent"] = [
+            domain.BlockEvent(
+                created_at=models.utc(block_event.created_at),  # when it got staged, rather than stored
+                status=block_event.status,
+                payment_method_id=payment_method.id,
+                block_name=block_event.block_name,
+            )
+            for block_event in block_events
+        ]
+        if added_block_events:
+            await self.session.flush()  # see OperationEventRepository.add_many
+            await self.session.execute(
+                sqlalchemy.insert(models.BlockEvent.__table__),
+                [
+                    {
+                        "id": models.u(),
+                        "created_at": block_event.created_at,
+                        "status": block_event.status,
+                        "block_name": block_event.block_name,
+                        "payment_method_id": block_event.payment_method_id,
+                    }
+                    for block_event in added_block_events
+                ],
+            )
+        return added_block_events
+
+    async def get(self, id: UUID) -> "protocols.BlockEvent": ...  # type: ignore[empty-body]
+
+
+@dataclass
+class AsyncTransactionRepository:
+
+    session: asyncio.AsyncSession
+    raw_data_policy: codecs.RawDataPolicy = codecs.default_policy  # See TransactionRepository
+
+    @property
+    def _sync_session(self) -> orm.Session:
+        """Session events only get dispatched by the Session that AsyncSession proxies"""
+        session = self.session() if isinstance(self.session, asyncio.async_scoped_session) else self.session
+        return session.sync_session
+
+    @deal.raises(domain.Transaction.Duplicated, sqlalchemy.exc.DatabaseError)
+    async def add(
+        self,
+        transaction: "protocols.Transaction",
+    ) -> "protocols.Transaction":
+        encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
+        try:
+            await self.session.flush()  # the PaymentMethod of transaction may be pending
+            result = await self.session.execute(
+                insert_unless_duplicated(
+                    self.session.get_bind().dialect,
+                    models.Transaction.__table__,
+                    ["provider_name", "external_id"],
+                ),
+                {
+                    "id": models.u(),
+                    "external_id": transaction.external_id,
+                    "timestamp": transaction.timestamp,
+                    "raw_data_codec": encoded_raw_data.codec,
+                    "encoded_raw_data": encoded_raw_data.data,
+                    "raw_data_reference": encoded_raw_data.reference,
+                    "provider_name": transaction.provider_name,
+                    "payment_method_id": transaction.payment_method_id,
+                },
+            )
+        except sqlalchemy.exc.DatabaseError:
+            self.raw_data_policy.discard(encoded_raw_data)
+            raise
+        if result.rowcount == 0:
+            self.raw_data_policy.discard(encoded_raw_data)
+            raise domain.Transaction.Duplicated  # the provider delivered this event again
+        discard_raw_data_unless_committed(self._sync_session, self.raw_data_policy, encoded_raw_data)
+        return transaction  # no need to decode what just got encoded
+
+    async def add_many(self, transactions: Sequence["protocols.Transaction"]) -> list["protocols.Transaction"]:
+        """Same as add, but inserting every Transaction in a single executemany statement"""
+        rows = []
+        for transaction in transactions:
+            encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
+            discard_raw_data_unless_committed(self._sync_session, self.raw_data_policy, encoded_raw_data)
+            rows.append(
+                {
+                    "id": models.u(),
+                    "external_id": transaction.external_id,
+                    "timestamp": transaction.timestamp,
+                    "raw_data_codec": encoded_raw_data.codec,
+                    "encoded_raw_data": encoded_raw_data.data,
+                    "raw_data_reference": encoded_raw_data.reference,
+                    "provider_name": transaction.provider_name,
+                    "payment_method_id": transaction.payment_method_id,
+                }
+            )
+        if rows:
+            await self.session.flush()  # see OperationEventRepository.add_many
+            await self.session.execute(sqlalchemy.insert(models.Transaction.__table__), rows)
+        return list(transactions)
+
+    async def existing_external_ids(self, provider_name: str, external_ids: Sequence[str]) -> set[str]:
+        """Those of external_ids already stored for provider_name, in a single query"""
+        return set(
+            await self.session.scalars(
+                sqlalchemy.select(models.Transaction.external_id).where(
+                    models.Transaction.provider_name == provider_name,
+                    models.Transaction.external_id.in_(external_ids),
+                )
+            )
+        )
+
+    @deal.raises(domain.Transaction.DoesNotExist)
+    async def get(self, id: UUID) -> "protocols.Transaction":
+        result = await self.session.execute(
+            sqlalchemy.select(models.Transaction)
+            .options(
+                orm.undefer(models.Transaction.encoded_raw_data),
+            )
+            .filter_by(id=id)
+        )
+        try:
+            return result.scalars().one().to_domain(self.raw_data_policy)
+        except orm.exc.NoResultFound:
+            raise domain.Transaction.DoesNotExist
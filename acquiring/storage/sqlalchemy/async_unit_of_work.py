@@ -0,0 +1,111 @@
+import contextvars
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Optional, Self, cast
+
+from sqlalchemy import orm
+from sqlalchemy.ext import asyncio
+
+from acquiring import protocols
+
+from . import engine
+
+
+@dataclass
+class AsyncSqlAlchemyUnitOfWork:
+    """
+    Unit of Work async context manager for SQLAlchemy, built on AsyncSession.
+
+    Behaves like SqlAlchemyUnitOfWork, without blocking the event loop while waiting for the database.
+
+    Every task gets its own AsyncSession and nesting depth, kept in a ContextVar, so tasks sharing the unit of work
+    (e.g. through the same AsyncPaymentMethodSaga) never join each other's transaction.
+    Tasks created inside an entered block inherit its context, and join it as nested blocks.
+
+    See Unit of Work pattern here: https://martinfowler.com/eaaCatalog/unitOfWork.html
+    """
+
+    payment_attempt_repository_class: type[protocols.AsyncRepository]
+    payment_attempts: protocols.AsyncRepository = field(init=False, repr=False)
+
+    milestone_repository_class: type[protocols.AsyncRepository]
+    milestones: protocols.AsyncRepository = field(init=False, repr=False)
+
+    payment_method_repository_class: type[protocols.AsyncRepository]
+    payment_methods: protocols.AsyncRepository = field(init=False, repr=False)
+
+    operation_event_repository_class: type[protocols.AsyncRepository]
+    operation_events: protocols.AsyncRepository = field(init=False, repr=False)
+
+    block_event_repository_class: type[protocols.AsyncRepository]
+    block_events: protocols.AsyncRepository = field(init=False, repr=False)
+
+    transaction_repository_class: type[protocols.AsyncRepository]
+    transactions: protocols.AsyncRepository = field(init=False, repr=False)
+
+    session_factory: Optional[orm.sessionmaker] = None  # Defaults to sessions bound to the shared async engine
+    session: asyncio.async_scoped_session = field(init=False, repr=False)
+
+    # Key of the session of the current task, and how many blocks deep it is
+    _scope: contextvars.ContextVar[Optional[tuple[object, int]]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._scope = contextvars.ContextVar(f"{self.__class__.__name__}.scope", default=None)
+        self.session = asyncio.async_scoped_session(self._new_session, scopefunc=self._scope_key)
+
+        self.payment_attempts = self.payment_attempt_repository_class(session=self.session)  # type: ignore[call-arg]
+        self.milestones = self.milestone_repository_class(session=self.session)  # type:ignore[call-arg]
+        self.payment_methods = self.payment_method_repository_class(session=self.session)  # type: ignore[call-arg]
+        self.operation_events = self.operation_event_repository_class(session=self.session)  # type: ignore[call-arg]
+        self.block_events = self.block_event_repository_class(session=self.session)  # type: ignore[call-arg]
+        self.transactions = self.transaction_repository_class(session=self.session)  # type: ignore[call-arg]
+
+    def _new_session(self) -> asyncio.AsyncSession:
+        session_factory = self.session_factory or engine.get_async_session_factory()
+        return session_factory()
+
+    def _scope_key(self) -> Optional[object]:
+        scope = self._scope.get()
+        return scope[0] if scope is not None else None
+
+    @property
+    def depth(self) -> int:
+        """How many blocks deep the current task is into the unit of work"""
+        scope = self._scope.get()
+        return scope[1] if scope is not None else 0
+
+    async def __aenter__(self) -> Self:
+        # Entering an already entered unit of work joins the session of the outermost block of the same task
+        scope = self._scope.get()
+        self._scope.set((object(), 1) if scope is None else (scope[0], scope[1] + 1))
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[type[BaseException]],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        key, depth = cast(tuple[object, int], self._scope.get())
+        if depth > 1:
+            self._scope.set((key, depth - 1))
+            return
+
+        # Autocommit disabled, see PEP 249 - Python Database API Specification v2.0
+        try:
+            if exc_type is not None:
+                await self.rollback()
+        finally:
+            await self.session.remove()
+            self._scope.set(None)
+
+    async def commit(self) -> None:
+        # Inside nested blocks, committing is deferred to the outermost block
+        if self.depth > 1:
+            await self.session.flush()
+            return
+
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
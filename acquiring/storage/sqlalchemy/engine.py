@@ -0,0 +1,164 @@
+"""
+A single SQLAlchemy engine per process, created the first time it is needed.
+
+Importing the package does not touch the database. Pool settings come from EngineSettings,
+either passed in code through configure, or read from environment variables.
+
+The same goes for the async engine, which needs a URL with an async driver (e.g. postgresql+asyncpg).
+"""
+
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import sqlalchemy
+from dotenv import load_dotenv
+from sqlalchemy import orm
+from sqlalchemy.ext import asyncio
+
+load_dotenv()  # take environment variables from .env.
+
+
+def _get_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value is not None else None
+
+
+def _get_bool(name: str) -> Optional[bool]:
+    value = os.environ.get(name)
+    return value.lower() in ("1", "true", "yes") if value is not None else None
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    """
+    Arguments passed to sqlalchemy.create_engine.
+
+    Settings left as None are not passed at all, and SQLAlchemy defaults apply.
+    Some pools do not accept every setting (SQLite file databases use NullPool, which has no size).
+
+    See https://docs.sqlalchemy.org/en/20/core/pooling.html
+    """
+
+    url: Optional[str] = None
+    async_url: Optional[str] = None
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_pre_ping: Optional[bool] = None
+    pool_recycle: Optional[int] = None  # seconds
+    query_cache_size: Optional[int] = None  # statement cache
+
+    @classmethod
+    def from_environment(cls) -> "EngineSettings":
+        """Reads the settings from SQLALCHEMY_* environment variables"""
+        return cls(
+            url=os.environ.get("SQLALCHEMY_DATABASE_URL"),
+            async_url=os.environ.get("SQLALCHEMY_ASYNC_DATABASE_URL"),
+            pool_size=_get_int("SQLALCHEMY_POOL_SIZE"),
+            max_overflow=_get_int("SQLALCHEMY_MAX_OVERFLOW"),
+            pool_pre_ping=_get_bool("SQLALCHEMY_POOL_PRE_PING"),
+            pool_recycle=_get_int("SQLALCHEMY_POOL_RECYCLE"),
+            query_cache_size=_get_int("SQLALCHEMY_QUERY_CACHE_SIZE"),
+        )
+
+
+_lock = threading.Lock()
+_settings: Optional[EngineSettings] = None
+_engine: Optional[sqlalchemy.engine.Engine] = None
+_session_factory: Optional[orm.sessionmaker] = None
+_pid: Optional[int] = None
+
+_async_engine: Optional[asyncio.AsyncEngine] = None
+_async_session_factory: Optional[orm.sessionmaker] = None
+_async_pid: Optional[int] = None
+
+
+def configure(settings: EngineSettings) -> None:
+    """
+    Sets the settings of the shared engine.
+
+    Meant to be called once at startup. If the engine already exists, it gets disposed,
+    and the next call to get_engine creates it again with the new settings.
+    """
+    global _settings, _engine, _session_factory, _async_engine, _async_session_factory
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        if _async_engine is not None:
+            # Disposing an AsyncEngine needs an event loop. Dropping the pool is enough here
+            _async_engine.sync_engine.dispose(close=False)
+        _settings = settings
+        _engine = None
+        _session_factory = None
+        _async_engine = None
+        _async_session_factory = None
+
+
+def _engine_arguments() -> dict:
+    global _settings
+    if _settings is None:
+        _settings = EngineSettings.from_environment()
+    return {name: value for name, value in asdict(_settings).items() if value is not None}
+
+
+def get_engine() -> sqlalchemy.engine.Engine:
+    """
+    Returns the engine shared by the whole process, creating it the first time.
+
+    Connections in the pool must not be shared with a forked process.
+    A child process that inherited the engine drops them (without closing them, as they belong to the parent)
+    and opens its own.
+    See https://docs.sqlalchemy.org/en/20/core/pooling.html#using-connection-pools-with-multiprocessing-or-os-fork
+    """
+    global _engine, _pid
+    with _lock:
+        if _engine is None:
+            arguments = _engine_arguments()
+            arguments.pop("async_url", None)
+            _engine = sqlalchemy.create_engine(arguments.pop("url", None), **arguments)
+            _pid = os.getpid()
+        elif _pid != os.getpid():
+            _engine.dispose(close=False)
+            _pid = os.getpid()
+        return _engine
+
+
+def get_session_factory() -> orm.sessionmaker:
+    """Returns a sessionmaker bound to the shared engine"""
+    global _session_factory
+    engine = get_engine()
+    with _lock:
+        if _session_factory is None or _session_factory.kw["bind"] is not engine:
+            _session_factory = orm.sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        return _session_factory
+
+
+def get_async_engine() -> asyncio.AsyncEngine:
+    """Same as get_engine, for the engine behind AsyncSqlAlchemyUnitOfWork"""
+    global _async_engine, _async_pid
+    with _lock:
+        if _async_engine is None:
+            arguments = _engine_arguments()
+            arguments.pop("url", None)
+            _async_engine = asyncio.create_async_engine(arguments.pop("async_url", None), **arguments)
+            _async_pid = os.getpid()
+        elif _async_pid != os.getpid():
+            _async_engine.sync_engine.dispose(close=False)
+            _async_pid = os.getpid()
+        return _async_engine
+
+
+def get_async_session_factory() -> orm.sessionmaker:
+    """Returns a sessionmaker of AsyncSessions bound to the shared async engine"""
+    global _async_session_factory
+    async_engine = get_async_engine()
+    with _lock:
+        if _async_session_factory is None or _async_session_factory.kw["bind"] is not async_engine:
+            _async_session_factory = orm.sessionmaker(
+                bind=async_engine,
+                class_=asyncio.AsyncSession,
+                autoflush=False,
+                expire_on_commit=False,  # Expired attributes would need to be lazy loaded, which is not possible
+            )
+        return _async_session_factory
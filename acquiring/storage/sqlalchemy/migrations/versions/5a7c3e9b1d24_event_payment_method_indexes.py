@@ -0,0 +1,39 @@
+"""Event payment method indexes
+
+Revision ID: 5a7c3e9b1d24
+Revises: d8e2b5c61f3a
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '5a7c3e9b1d24'
+down_revision: Union[str, None] = 'd8e2b5c61f3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Created first, so that lookups by payment method never go without an index
+    op.create_index(
+        'ix_acquiring_paymentoperations_payment_method',
+        'acquiring_paymentoperations',
+        ['payment_method_id', 'type', 'status', 'created_at'],
+    )
+    op.create_index(
+        'ix_acquiring_blockevents_payment_method',
+        'acquiring_blockevents',
+        ['payment_method_id', 'block_name', 'status', 'created_at'],
+    )
+    op.drop_index('ix_acquiring_paymentoperations_status', table_name='acquiring_paymentoperations')
+    op.drop_index('ix_acquiring_blockevents_status', table_name='acquiring_blockevents')
+
+
+def downgrade() -> None:
+    op.create_index('ix_acquiring_blockevents_status', 'acquiring_blockevents', ['status'])
+    op.create_index('ix_acquiring_paymentoperations_status', 'acquiring_paymentoperations', ['status'])
+    op.drop_index('ix_acquiring_blockevents_payment_method', table_name='acquiring_blockevents')
+    op.drop_index('ix_acquiring_paymentoperations_payment_method', table_name='acquiring_paymentoperations')
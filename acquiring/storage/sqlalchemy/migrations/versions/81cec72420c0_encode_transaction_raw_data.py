@@ -0,0 +1,60 @@
+"""Encode transaction raw data
+
+Revision ID: 81cec72420c0
+Revises: 87b793f35b89
+Create Date: 2026-10-17 04:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from acquiring.storage import codecs
+
+
+revision: str = '81cec72420c0'
+down_revision: Union[str, None] = '87b793f35b89'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('acquiring_transactions') as batch_op:
+        batch_op.add_column(sa.Column('raw_data_codec', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('encoded_raw_data', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('raw_data_reference', sa.String(), nullable=True))
+        batch_op.alter_column('raw_data', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    transactions = sa.table(
+        'acquiring_transactions',
+        sa.column('id', sa.String()),
+        sa.column('raw_data', sa.String()),
+        sa.column('raw_data_codec', sa.String()),
+        sa.column('encoded_raw_data', sa.LargeBinary()),
+        sa.column('raw_data_reference', sa.String()),
+    )
+    if connection.execute(
+        sa.select(sa.func.count()).select_from(transactions).where(transactions.c.raw_data_reference.isnot(None))
+    ).scalar():
+        raise RuntimeError("Raw data that spilled over must be moved back into the transactions table first")
+
+    rows = connection.execute(
+        sa.select(transactions.c.id, transactions.c.raw_data_codec, transactions.c.encoded_raw_data)
+        .where(transactions.c.raw_data_codec.isnot(None))
+    ).fetchall()
+    for id, codec, encoded_raw_data in rows:
+        connection.execute(
+            transactions.update()
+            .where(transactions.c.id == id)
+            .values(raw_data=codecs.CODECS[codec].decode(encoded_raw_data))
+        )
+
+    with op.batch_alter_table('acquiring_transactions') as batch_op:
+        batch_op.alter_column('raw_data', existing_type=sa.String(), nullable=False)
+        batch_op.drop_column('raw_data_reference')
+        batch_op.drop_column('encoded_raw_data')
+        batch_op.drop_column('raw_data_codec')
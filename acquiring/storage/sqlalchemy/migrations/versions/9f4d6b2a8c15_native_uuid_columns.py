@@ -0,0 +1,199 @@
+"""Native uuid columns
+
+Revision ID: 9f4d6b2a8c15
+Revises: 5a7c3e9b1d24
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import uuid
+from typing import Callable, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '9f4d6b2a8c15'
+down_revision: Union[str, None] = '5a7c3e9b1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+# Parents before children
+UUID_COLUMNS = {
+    'acquiring_paymentattempts': ['id'],
+    'acquiring_paymentmethods': ['id', 'payment_attempt_id'],
+    'acquiring_paymentoperations': ['id', 'payment_method_id'],
+    'acquiring_blockevents': ['id', 'payment_method_id'],
+    'acquiring_paymentmilestones': ['id', 'payment_method_id', 'payment_attempt_id'],
+    'acquiring_transactions': ['id', 'payment_method_id'],
+}
+
+# Partial indexes do not survive the tables being recreated on SQLite, see d8e2b5c61f3a
+STARTED_OPERATION_EVENTS = "status = 'started' AND type != 'refund'"
+
+
+def to_bytes(value: Optional[Union[str, bytes]]) -> Optional[bytes]:
+    return uuid.UUID(value).bytes if isinstance(value, str) else value
+
+
+def to_string(value: Optional[Union[str, bytes]]) -> Optional[str]:
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
+
+
+def convert_in_batches(connection: sa.engine.Connection, convert: Callable) -> None:
+    """Rewrites every uuid column, BATCH_SIZE rows at a time, walking each table by rowid"""
+    connection.execute(sa.text('PRAGMA defer_foreign_keys = ON'))  # parents get converted before their children
+    for table_name, column_names in UUID_COLUMNS.items():
+        table = sa.table(table_name, sa.column('rowid'), *[sa.column(name) for name in column_names])
+        update = (
+            table.update()
+            .where(table.c.rowid == sa.bindparam('_rowid'))
+            .values({name: sa.bindparam(f'_{name}') for name in column_names})
+        )
+        last_rowid = 0
+        while True:
+            rows = connection.execute(
+                sa.select(table.c.rowid, *[table.c[name] for name in column_names])
+                .where(table.c.rowid > last_rowid)
+                .order_by(table.c.rowid)
+                .limit(BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            connection.execute(
+                update,
+                [
+                    {'_rowid': row[0], **{f'_{name}': convert(value) for name, value in zip(column_names, row[1:])}}
+                    for row in rows
+                ],
+            )
+            last_rowid = rows[-1][0]
+
+
+def alter_column_types(type_: sa.types.TypeEngine, existing_type: sa.types.TypeEngine) -> None:
+    op.drop_index('uq_acquiring_paymentoperations_started', table_name='acquiring_paymentoperations')
+    for table_name, column_names in UUID_COLUMNS.items():
+        with op.batch_alter_table(table_name, recreate='always') as batch_op:
+            for name in column_names:
+                batch_op.alter_column(name, type_=type_, existing_type=existing_type, existing_nullable=False)
+    op.create_index(
+        'uq_acquiring_paymentoperations_started',
+        'acquiring_paymentoperations',
+        ['payment_method_id', 'type'],
+        unique=True,
+        sqlite_where=sa.text(STARTED_OPERATION_EVENTS),
+    )
+
+
+def postgresql_table(table_name: str, column_names: list[str], old_type: sa.types.TypeEngine) -> sa.sql.TableClause:
+    return sa.table(
+        table_name,
+        *[sa.column(name, old_type) for name in column_names],
+        *[sa.column(f'{name}_new') for name in column_names],
+    )
+
+
+def copy_in_batches(
+    connection: sa.engine.Connection,
+    type_: sa.types.TypeEngine,
+    old_type: sa.types.TypeEngine,
+) -> None:
+    """Fills in every new column, BATCH_SIZE rows at a time, walking each table by its primary key"""
+    for table_name, column_names in UUID_COLUMNS.items():
+        table = postgresql_table(table_name, column_names, old_type)
+        values = {f'{name}_new': sa.cast(table.c[name], type_) for name in column_names}
+        last_id = None
+        while True:
+            select = sa.select(table.c.id).order_by(table.c.id).limit(BATCH_SIZE)
+            if last_id is not None:
+                select = select.where(table.c.id > last_id)
+            ids = connection.execute(select).scalars().all()
+            if not ids:
+                break
+            update = table.update().where(table.c.id <= ids[-1]).values(values)
+            if last_id is not None:
+                update = update.where(table.c.id > last_id)
+            connection.execute(update)
+            last_id = ids[-1]
+
+
+def alter_postgresql_column_types(type_: sa.types.TypeEngine, old_type: sa.types.TypeEngine) -> None:
+    """
+    Rather than PostgreSQL rewriting each table while holding an exclusive lock on it,
+    every column gets copied into a new one outside of the migration's transaction, one batch at a time,
+    so that only swapping them holds the tables locked.
+    """
+    with op.get_context().autocommit_block():
+        for table_name, column_names in UUID_COLUMNS.items():
+            for name in column_names:
+                op.add_column(table_name, sa.Column(f'{name}_new', type_))
+        copy_in_batches(op.get_bind(), type_, old_type)
+
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    foreign_keys = [
+        (table_name, foreign_key)
+        for table_name in UUID_COLUMNS
+        for foreign_key in inspector.get_foreign_keys(table_name)
+    ]
+    primary_keys = {table_name: inspector.get_pk_constraint(table_name)['name'] for table_name in UUID_COLUMNS}
+    # Dropping the old columns drops their indexes too, which get recreated as they were defined
+    index_definitions = {
+        table_name: [
+            connection.execute(
+                sa.text('SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND indexname = :name'),
+                {'name': index['name']},
+            ).scalar_one()
+            for index in inspector.get_indexes(table_name)
+            if set(index['column_names']) & set(column_names)
+        ]
+        for table_name, column_names in UUID_COLUMNS.items()
+    }
+
+    for table_name, foreign_key in foreign_keys:
+        op.drop_constraint(foreign_key['name'], table_name, type_='foreignkey')
+    for table_name, column_names in UUID_COLUMNS.items():
+        table = postgresql_table(table_name, column_names, old_type)
+        # Rows stored since their batch got copied
+        connection.execute(
+            table.update()
+            .where(table.c.id_new.is_(None))
+            .values({f'{name}_new': sa.cast(table.c[name], type_) for name in column_names})
+        )
+        for name in column_names:
+            op.drop_column(table_name, name)
+            op.alter_column(table_name, f'{name}_new', new_column_name=name, nullable=False)
+        op.create_primary_key(primary_keys[table_name], table_name, ['id'])
+        for index_definition in index_definitions[table_name]:
+            op.execute(index_definition)
+    for table_name, foreign_key in foreign_keys:
+        op.create_foreign_key(
+            foreign_key['name'],
+            table_name,
+            foreign_key['referred_table'],
+            foreign_key['constrained_columns'],
+            foreign_key['referred_columns'],
+        )
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql':
+        alter_postgresql_column_types(postgresql.UUID(as_uuid=False), old_type=sa.String())
+        return
+
+    # SQLite keeps whatever gets stored, so the data gets converted first, then the declared types
+    convert_in_batches(connection, to_bytes)
+    alter_column_types(sa.LargeBinary(16), existing_type=sa.String())
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql':
+        alter_postgresql_column_types(sa.String(), old_type=postgresql.UUID(as_uuid=False))
+        return
+
+    convert_in_batches(connection, to_string)
+    alter_column_types(sa.String(), existing_type=sa.LargeBinary(16))
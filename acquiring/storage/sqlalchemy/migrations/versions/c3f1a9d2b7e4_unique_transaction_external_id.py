@@ -0,0 +1,127 @@
+"""Unique transaction external id
+
+Revision ID: c3f1a9d2b7e4
+Revises: 81cec72420c0
+Create Date: 2026-10-17 06:00:00.000000
+
+"""
+import base64
+import logging
+from datetime import datetime, timezone
+from typing import Any, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = 'c3f1a9d2b7e4'
+down_revision: Union[str, None] = '81cec72420c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+REASON = 'duplicate transaction'
+
+archived_records = sa.table(
+    'acquiring_archivedrecords',
+    sa.column('id', sa.Integer()),
+    sa.column('archived_at', sa.TIMESTAMP(timezone=True)),
+    sa.column('table_name', sa.String()),
+    sa.column('record_id', sa.String()),
+    sa.column('reason', sa.String()),
+    sa.column('data', sa.JSON()),
+)
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def from_json(column: sa.Column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, sa.LargeBinary):
+        return base64.b64decode(value)
+    if isinstance(column.type, sa.DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def archive_duplicate_transactions() -> None:
+    """
+    Providers may have delivered the same event more than once before it had to be unique,
+    so only the earliest transaction stored for every event is kept.
+    The rest are provider records too, so they get moved into acquiring_archivedrecords instead of being deleted.
+    """
+    connection = op.get_bind()
+    transactions = sa.Table('acquiring_transactions', sa.MetaData(), autoload_with=connection)
+    duplicates = connection.execute(
+        sa.select(transactions.c.provider_name, transactions.c.external_id)
+        .group_by(transactions.c.provider_name, transactions.c.external_id)
+        .having(sa.func.count() > 1)
+    ).fetchall()
+    for provider_name, external_id in duplicates:
+        rows = connection.execute(
+            sa.select(transactions)
+            .where(transactions.c.provider_name == provider_name, transactions.c.external_id == external_id)
+            .order_by(transactions.c.timestamp, transactions.c.id)
+        ).fetchall()
+        ids = [row.id for row in rows[1:]]
+        connection.execute(
+            archived_records.insert(),
+            [
+                {
+                    'archived_at': datetime.now(timezone.utc),
+                    'table_name': transactions.name,
+                    'record_id': str(row.id),
+                    'reason': REASON,
+                    'data': {name: to_json(value) for name, value in row._mapping.items()},
+                }
+                for row in rows[1:]
+            ],
+        )
+        connection.execute(transactions.delete().where(transactions.c.id.in_(ids)))
+        logger.warning('Moved duplicate transactions %s into %s', ids, archived_records.name)
+
+
+def restore_duplicate_transactions() -> None:
+    connection = op.get_bind()
+    transactions = sa.Table('acquiring_transactions', sa.MetaData(), autoload_with=connection)
+    archived = (archived_records.c.table_name == transactions.name) & (archived_records.c.reason == REASON)
+    rows = [
+        {column.name: from_json(column, data[column.name]) for column in transactions.columns}
+        for (data,) in connection.execute(sa.select(archived_records.c.data).where(archived))
+    ]
+    if rows:
+        connection.execute(transactions.insert(), rows)
+    connection.execute(archived_records.delete().where(archived))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'acquiring_archivedrecords',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('archived_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('record_id', sa.String(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    archive_duplicate_transactions()
+    with op.batch_alter_table('acquiring_transactions') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_acquiring_transactions_external_id', ['provider_name', 'external_id']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('acquiring_transactions') as batch_op:
+        batch_op.drop_constraint('uq_acquiring_transactions_external_id', type_='unique')
+    restore_duplicate_transactions()
+    op.drop_table('acquiring_archivedrecords')
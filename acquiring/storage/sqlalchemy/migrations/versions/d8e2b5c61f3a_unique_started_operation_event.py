@@ -0,0 +1,134 @@
+"""Unique started operation event
+
+Revision ID: d8e2b5c61f3a
+Revises: c3f1a9d2b7e4
+Create Date: 2026-10-17 07:00:00.000000
+
+"""
+import base64
+import logging
+from datetime import datetime, timezone
+from typing import Any, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = 'd8e2b5c61f3a'
+down_revision: Union[str, None] = 'c3f1a9d2b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STARTED_OPERATION_EVENTS = "status = 'started' AND type != 'refund'"
+PARTIAL_INDEX_DIALECTS = ('sqlite', 'postgresql')
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+REASON = 'duplicate started operation event'
+
+archived_records = sa.table(
+    'acquiring_archivedrecords',
+    sa.column('id', sa.Integer()),
+    sa.column('archived_at', sa.TIMESTAMP(timezone=True)),
+    sa.column('table_name', sa.String()),
+    sa.column('record_id', sa.String()),
+    sa.column('reason', sa.String()),
+    sa.column('data', sa.JSON()),
+)
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def from_json(column: sa.Column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, sa.LargeBinary):
+        return base64.b64decode(value)
+    if isinstance(column.type, sa.DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def archive_duplicate_started_operation_events() -> None:
+    """
+    Concurrent processes may have started the same operation before it had to be unique,
+    so only the earliest started event of every operation is kept.
+    The rest get moved into acquiring_archivedrecords instead of being deleted.
+    """
+    connection = op.get_bind()
+    operation_events = sa.Table('acquiring_paymentoperations', sa.MetaData(), autoload_with=connection)
+    started = sa.text(STARTED_OPERATION_EVENTS)
+    duplicates = connection.execute(
+        sa.select(operation_events.c.payment_method_id, operation_events.c.type)
+        .where(started)
+        .group_by(operation_events.c.payment_method_id, operation_events.c.type)
+        .having(sa.func.count() > 1)
+    ).fetchall()
+    for payment_method_id, type in duplicates:
+        rows = connection.execute(
+            sa.select(operation_events)
+            .where(
+                started,
+                operation_events.c.payment_method_id == payment_method_id,
+                operation_events.c.type == type,
+            )
+            .order_by(operation_events.c.created_at, operation_events.c.id)
+        ).fetchall()
+        ids = [row.id for row in rows[1:]]
+        connection.execute(
+            archived_records.insert(),
+            [
+                {
+                    'archived_at': datetime.now(timezone.utc),
+                    'table_name': operation_events.name,
+                    'record_id': str(row.id),
+                    'reason': REASON,
+                    'data': {name: to_json(value) for name, value in row._mapping.items()},
+                }
+                for row in rows[1:]
+            ],
+        )
+        connection.execute(operation_events.delete().where(operation_events.c.id.in_(ids)))
+        logger.warning('Moved duplicate started operation events %s into %s', ids, archived_records.name)
+
+
+def restore_duplicate_started_operation_events() -> None:
+    connection = op.get_bind()
+    operation_events = sa.Table('acquiring_paymentoperations', sa.MetaData(), autoload_with=connection)
+    archived = (archived_records.c.table_name == operation_events.name) & (archived_records.c.reason == REASON)
+    rows = [
+        {column.name: from_json(column, data[column.name]) for column in operation_events.columns}
+        for (data,) in connection.execute(sa.select(archived_records.c.data).where(archived))
+    ]
+    if rows:
+        connection.execute(operation_events.insert(), rows)
+    connection.execute(archived_records.delete().where(archived))
+
+
+def upgrade() -> None:
+    # Any other dialect would ignore the condition, and allow a single event per payment method and type
+    dialect_name = op.get_context().dialect.name
+    if dialect_name not in PARTIAL_INDEX_DIALECTS:
+        raise NotImplementedError(
+            f'acquiring_paymentoperations needs a partial unique index, which {dialect_name} does not support'
+        )
+    archive_duplicate_started_operation_events()
+    op.create_index(
+        'uq_acquiring_paymentoperations_started',
+        'acquiring_paymentoperations',
+        ['payment_method_id', 'type'],
+        unique=True,
+        sqlite_where=sa.text(STARTED_OPERATION_EVENTS),
+        postgresql_where=sa.text(STARTED_OPERATION_EVENTS),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_acquiring_paymentoperations_started', table_name='acquiring_paymentoperations')
+    restore_duplicate_started_operation_events()
@@ -1,39 +1,79 @@
 import os
 import uuid
 from datetime import datetime, timezone
-from typing import Type
+from typing import Optional, Type, Union
 
 import sqlalchemy
-from dotenv import load_dotenv
 from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.declarative import declarative_base
 
 from acquiring import domain, protocols
+from acquiring.storage import codecs, ids
 
-load_dotenv()  # take environment variables from .env.
+Model: Type = declarative_base()  # TODO Remove Type hint (by using sqlalchemy stubs?)
 
+# Condition of the partial unique index on OperationEvents, see OperationEvent
+STARTED_OPERATION_EVENTS = "status = 'started' AND type != 'refund'"
+PARTIAL_INDEX_DIALECTS = ("sqlite", "postgresql")
 
-SQLALCHEMY_DATABASE_URL = os.environ.get("SQLALCHEMY_DATABASE_URL")
 
-engine = sqlalchemy.create_engine(SQLALCHEMY_DATABASE_URL)
-session = orm.sessionmaker(autocommit=False, autoflush=False, bind=engine)()
-Model: Type = declarative_base()  # TODO Remove Type hint (by using sqlalchemy stubs?)
+class Uuid(sqlalchemy.types.TypeDecorator):
+    """
+    UUID column, native on PostgreSQL and 16 bytes (BLOB) anywhere else, read back as uuid.UUID.
+
+    SQLAlchemy only ships its own Uuid type since 2.0.
+    Strings are accepted when binding, as ids used to be stored as such.
+
+    See https://docs.sqlalchemy.org/en/20/core/type_basics.html#sqlalchemy.types.Uuid
+    """
+
+    impl = sqlalchemy.types.LargeBinary
+    cache_ok = True
 
+    def load_dialect_impl(self, dialect: sqlalchemy.engine.Dialect) -> sqlalchemy.types.TypeEngine:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(sqlalchemy.types.LargeBinary(16))
 
-def u() -> str:
-    """Turn UUID to string for Identifiable to pass an uuid value to id"""
-    return str(uuid.uuid4())
+    def process_bind_param(
+        self, value: Optional[Union[uuid.UUID, str]], dialect: sqlalchemy.engine.Dialect
+    ) -> Optional[Union[uuid.UUID, bytes]]:
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(value)
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(
+        self, value: Optional[Union[uuid.UUID, bytes]], dialect: sqlalchemy.engine.Dialect
+    ) -> Optional[uuid.UUID]:
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(bytes=value)
+
+
+def u() -> uuid.UUID:
+    """Id of new rows, made by the generator named in the ACQUIRING_ID_GENERATOR environment variable (see ids.py)"""
+    return ids.generator(os.environ.get("ACQUIRING_ID_GENERATOR", ids.DEFAULT_GENERATOR))()
 
 
 def now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def utc(value: datetime) -> datetime:
+    """
+    Domain datetimes may be naive (e.g. datetime.now()), meaning local time.
+    SQLite keeps no offset, so they get stored in UTC like now().
+    """
+    return value.astimezone(timezone.utc)
+
+
 class Identifiable:
     """Mixin for models that can be identified"""
 
-    # https://docs.sqlalchemy.org/en/20/core/type_basics.html#sqlalchemy.types.Uuid
-    id = sqlalchemy.Column(sqlalchemy.String, primary_key=True, default=u)
+    id = sqlalchemy.Column(Uuid, primary_key=True, default=u)
 
     # https://docs.sqlalchemy.org/en/20/core/type_basics.html#sqlalchemy.types.TIMESTAMP
     created_at = sqlalchemy.Column(
@@ -59,12 +99,15 @@ class PaymentAttempt(Identifiable, Model):
 class PaymentMethod(Identifiable, Model):
     __tablename__ = "acquiring_paymentmethods"
 
-    payment_attempt_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentattempts.id"), nullable=False
-    )
+    payment_attempt_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentattempts.id"), nullable=False)
     payment_attempt = orm.relationship("PaymentAttempt", back_populates="payment_methods", cascade="all, delete")
 
-    operation_events = orm.relationship("OperationEvent", back_populates="payment_method", cascade="all, delete")
+    operation_events = orm.relationship(
+        "OperationEvent",
+        back_populates="payment_method",
+        cascade="all, delete",
+        order_by="OperationEvent.created_at",  # rather than in the order of whichever index gets used
+    )
     block_events = orm.relationship("BlockEvent", back_populates="payment_method", cascade="all, delete")
     transactions = orm.relationship("Transaction", back_populates="payment_method", cascade="all, delete")
 
@@ -83,7 +126,7 @@ class Milestone(Model):
 
     # The high amount of instances expected for this model justifies the use of UUID instead of Integer
     # It is not identifiable, though, and the id doesn't get passed to the domain dataclass.
-    id = sqlalchemy.Column(sqlalchemy.String, primary_key=True, default=u)
+    id = sqlalchemy.Column(Uuid, primary_key=True, default=u)
 
     created_at = sqlalchemy.Column(
         sqlalchemy.TIMESTAMP(timezone=True), default=now, server_onupdate=None, nullable=False
@@ -93,14 +136,10 @@ class Milestone(Model):
     # Reason: I've worked with enums on the database itself and they are nightmare.
     type = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
-    payment_method_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
-    )
+    payment_method_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False)
     payment_method = orm.relationship("PaymentMethod", cascade="all, delete")
 
-    payment_attempt_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentattempts.id"), nullable=False
-    )
+    payment_attempt_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentattempts.id"), nullable=False)
     payment_attempt = orm.relationship("PaymentAttempt", cascade="all, delete")
 
     def __str__(self) -> str:
@@ -111,7 +150,7 @@ class Milestone(Model):
             created_at=self.created_at,
             type=self.type,
             payment_attempt_id=self.payment_attempt_id,
-            payment_method_id=self.payment_method.id,
+            payment_method_id=self.payment_method_id,
         )
 
 
@@ -120,7 +159,7 @@ class OperationEvent(Model):
 
     # The high amount of instances expected for this model justifies the use of UUID instead of Integer
     # It is not identifiable, though, and the id doesn't get passed to the domain dataclass.
-    id = sqlalchemy.Column(sqlalchemy.String, primary_key=True, default=u)
+    id = sqlalchemy.Column(Uuid, primary_key=True, default=u)
 
     created_at = sqlalchemy.Column(
         sqlalchemy.TIMESTAMP(timezone=True), default=now, server_onupdate=None, nullable=False
@@ -131,12 +170,25 @@ class OperationEvent(Model):
     type = sqlalchemy.Column(sqlalchemy.String, nullable=False)
     status = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
-    payment_method_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
-    )
+    payment_method_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False)
     payment_method = orm.relationship("PaymentMethod", back_populates="operation_events", cascade="all, delete")
 
-    __table_args__ = (sqlalchemy.Index("ix_acquiring_paymentoperations_status", "status"),)
+    __table_args__ = (
+        # OperationEvents are always looked up by PaymentMethod, then by type and status
+        sqlalchemy.Index(
+            "ix_acquiring_paymentoperations_payment_method", "payment_method_id", "type", "status", "created_at"
+        ),
+        # Concurrent processes cannot both start the same operation, the one that inserts second fails.
+        # Refunds are left out, as a PaymentMethod can be refunded more than once
+        sqlalchemy.Index(
+            "uq_acquiring_paymentoperations_started",
+            "payment_method_id",
+            "type",
+            unique=True,
+            sqlite_where=sqlalchemy.text(STARTED_OPERATION_EVENTS),
+            postgresql_where=sqlalchemy.text(STARTED_OPERATION_EVENTS),
+        ),
+    )
 
     def __str__(self) -> str:
         return f"[type={self.type}, status={self.status}]"
@@ -150,12 +202,28 @@ class OperationEvent(Model):
         )
 
 
+@sqlalchemy.event.listens_for(OperationEvent.__table__, "before_create")
+def _require_partial_indexes(
+    target: sqlalchemy.Table, connection: sqlalchemy.engine.Connection, **kwargs: object
+) -> None:
+    """
+    Any other dialect would ignore the condition of uq_acquiring_paymentoperations_started,
+    and allow a single OperationEvent per PaymentMethod and type.
+
+    Index.ddl_if, which would skip the index instead, only exists since SQLAlchemy 2.0
+    """
+    if connection.dialect.name not in PARTIAL_INDEX_DIALECTS:
+        raise NotImplementedError(
+            f"{target.name} needs a partial unique index, which {connection.dialect.name} does not support"
+        )
+
+
 class BlockEvent(Model):
     __tablename__ = "acquiring_blockevents"
 
     # The high amount of instances expected for this model justifies the use of UUID instead of Integer
     # It is not identifiable, though, and the id doesn't get passed to the domain dataclass.
-    id = sqlalchemy.Column(sqlalchemy.String, primary_key=True, default=u)
+    id = sqlalchemy.Column(Uuid, primary_key=True, default=u)
 
     created_at = sqlalchemy.Column(
         sqlalchemy.TIMESTAMP(timezone=True), default=now, server_onupdate=None, nullable=False
@@ -167,12 +235,15 @@ class BlockEvent(Model):
 
     block_name = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
-    payment_method_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
-    )
+    payment_method_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False)
     payment_method = orm.relationship("PaymentMethod", back_populates="block_events", cascade="all, delete")
 
-    __table_args__ = (sqlalchemy.Index("ix_acquiring_blockevents_status", "status"),)
+    # BlockEvents are always looked up by PaymentMethod, then by block and status
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_acquiring_blockevents_payment_method", "payment_method_id", "block_name", "status", "created_at"
+        ),
+    )
 
     def __str__(self) -> str:
         return f"[{self.block_name}|status={self.status}]"
@@ -191,7 +262,7 @@ class Transaction(Model):
 
     # The high amount of instances expected for this model justifies the use of UUID instead of Integer
     # It is not identifiable, though, and the id doesn't get passed to the domain dataclass.
-    id = sqlalchemy.Column(sqlalchemy.String, primary_key=True, default=u)
+    id = sqlalchemy.Column(Uuid, primary_key=True, default=u)
 
     external_id = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
@@ -199,23 +270,62 @@ class Transaction(Model):
         sqlalchemy.TIMESTAMP(timezone=True), default=now, server_onupdate=None, nullable=False
     )
 
-    raw_data = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    # Raw data is encoded with the RawDataPolicy of the repository (see codecs.py) into encoded_raw_data,
+    # or into raw_data_reference once it spills over. Only rows stored before that have raw_data.
+    raw_data = sqlalchemy.Column(sqlalchemy.String, nullable=True)
+    raw_data_codec = sqlalchemy.Column(sqlalchemy.String, nullable=True)
+    encoded_raw_data = orm.deferred(sqlalchemy.Column(sqlalchemy.LargeBinary, nullable=True))  # loaded on access
+    raw_data_reference = sqlalchemy.Column(sqlalchemy.String, nullable=True)
 
     provider_name = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
-    payment_method_id = sqlalchemy.Column(
-        sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
-    )
+    payment_method_id = sqlalchemy.Column(Uuid, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False)
     payment_method = orm.relationship("PaymentMethod", back_populates="transactions", cascade="all, delete")
 
+    # Providers deliver the same event more than once, and it must only be stored once
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint("provider_name", "external_id", name="uq_acquiring_transactions_external_id"),
+    )
+
     def __str__(self) -> str:
         return f"[provider={self.provider_name}|payment_method={self.payment_method_id}|{self.external_id}]"
 
-    def to_domain(self) -> "protocols.Transaction":
+    def to_domain(self, raw_data_policy: codecs.RawDataPolicy = codecs.default_policy) -> "protocols.Transaction":
         return domain.Transaction(
             external_id=self.external_id,
             timestamp=self.timestamp,
-            raw_data=self.raw_data,
+            raw_data=(
+                self.raw_data
+                if self.raw_data_codec is None
+                else raw_data_policy.decode(
+                    codecs.EncodedRawData(
+                        codec=self.raw_data_codec,
+                        data=self.encoded_raw_data,
+                        reference=self.raw_data_reference,
+                    )
+                )
+            ),
             provider_name=self.provider_name,
             payment_method_id=self.payment_method_id,
         )
+
+
+class ArchivedRecord(Model):
+    """
+    A row that a migration took out of its table (e.g. a duplicate, before something became unique),
+    kept with every column made JSON serializable, so that reversing the migration puts it back.
+    """
+
+    __tablename__ = "acquiring_archivedrecords"
+
+    # Only migrations add instances of this model, which justifies the use of Integer instead of UUID
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
+
+    archived_at = sqlalchemy.Column(sqlalchemy.TIMESTAMP(timezone=True), default=now, nullable=False)
+    table_name = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    record_id = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    reason = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    data = sqlalchemy.Column(sqlalchemy.JSON, nullable=False)
+
+    def __str__(self) -> str:
+        return f"[{self.table_name}|{self.record_id}|{self.reason}]"
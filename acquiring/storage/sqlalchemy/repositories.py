@@ -1,13 +1,65 @@
 from dataclasses import dataclass
+from typing import Optional, Sequence
 from uuid import UUID
 
 import deal
+import sqlalchemy
 from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql, sqlite
 
 from acquiring import domain, enums, protocols
+from acquiring.storage import codecs
 
 from . import models
 
+SPILLED_RAW_DATA = "acquiring_spilled_raw_data"  # key of session.info, see discard_raw_data_unless_committed
+
+
+def discard_raw_data_unless_committed(
+    session: orm.Session,
+    raw_data_policy: codecs.RawDataPolicy,
+    encoded_raw_data: codecs.EncodedRawData,
+) -> None:
+    """
+    Raw data that spilled over into the store of raw_data_policy gets discarded
+    if the outermost transaction of session ends without committing (see RawDataPolicy).
+    """
+    if encoded_raw_data.reference is None:
+        return
+
+    if not sqlalchemy.event.contains(session, "after_transaction_end", _discard_spilled_raw_data):
+        sqlalchemy.event.listen(session, "after_commit", _keep_spilled_raw_data)
+        sqlalchemy.event.listen(session, "after_transaction_end", _discard_spilled_raw_data)
+    session.info.setdefault(SPILLED_RAW_DATA, []).append((raw_data_policy, encoded_raw_data))
+
+
+def insert_unless_duplicated(
+    dialect: sqlalchemy.engine.Dialect,
+    table: sqlalchemy.Table,
+    index_elements: list[str],
+    index_where: Optional[sqlalchemy.sql.ClauseElement] = None,
+) -> sqlalchemy.sql.Insert:
+    """
+    INSERT that inserts nothing when the unique index on index_elements already holds the row,
+    instead of failing the transaction it is part of. Savepoints would do too, but pysqlite mishandles them.
+
+    Only SQLite and PostgreSQL are supported, see models.PARTIAL_INDEX_DIALECTS.
+    """
+    insert = postgresql.insert if dialect.name == "postgresql" else sqlite.insert
+    return insert(table).on_conflict_do_nothing(index_elements=index_elements, index_where=index_where)
+
+
+def _keep_spilled_raw_data(session: orm.Session) -> None:
+    # Releasing a savepoint commits nothing yet
+    if session.get_nested_transaction() is None:
+        session.info.pop(SPILLED_RAW_DATA, None)
+
+
+def _discard_spilled_raw_data(session: orm.Session, transaction: orm.SessionTransaction) -> None:
+    if transaction.parent is None:
+        for raw_data_policy, encoded_raw_data in session.info.pop(SPILLED_RAW_DATA, []):
+            raw_data_policy.discard(encoded_raw_data)
+
 
 @dataclass
 class PaymentAttemptRepository:
@@ -24,7 +76,11 @@ class PaymentAttemptRepository:
         try:
             return (
                 self.session.query(models.PaymentAttempt)
-                .outerjoin(models.PaymentMethod, models.PaymentMethod.payment_attempt_id == models.PaymentAttempt.id)
+                .options(
+                    orm.selectinload(models.PaymentAttempt.payment_methods).selectinload(
+                        models.PaymentMethod.operation_events
+                    ),
+                )
                 .filter(models.PaymentAttempt.id == id)
                 .one()
                 .to_domain()
@@ -65,6 +121,7 @@ class PaymentMethodRepository:
     def add(self, data: "protocols.DraftPaymentMethod") -> "protocols.PaymentMethod":
         db_payment_method = models.PaymentMethod(
             payment_attempt_id=data.payment_attempt_id,
+            operation_events=[],  # A new PaymentMethod has none, no need to query for them
         )
         self.session.add(db_payment_method)
         self.session.flush()
@@ -79,7 +136,7 @@ class PaymentMethodRepository:
             return (
                 self.session.query(models.PaymentMethod)
                 .options(
-                    orm.joinedload("payment_attempt"),
+                    orm.selectinload(models.PaymentMethod.operation_events),
                 )
                 .filter_by(id=id)
                 .one()
@@ -94,24 +151,77 @@ class OperationEventRepository:
 
     session: orm.Session
 
-    @deal.safe
+    @deal.reason(
+        domain.OperationEvent.Duplicated,
+        lambda _, payment_method, type, status: status == enums.OperationStatusEnum.STARTED,
+    )
     def add(
         self,
         payment_method: "protocols.PaymentMethod",
         type: enums.OperationTypeEnum,
         status: enums.OperationStatusEnum,
     ) -> "protocols.OperationEvent":
-        db_operation_event = models.OperationEvent(
-            payment_method_id=payment_method.id,
+        operation_event = domain.OperationEvent(
+            created_at=models.now(),
             type=type,
             status=status,
+            payment_method_id=payment_method.id,
         )
-        self.session.add(db_operation_event)
-        self.session.flush()
-        operation_event = db_operation_event.to_domain()
+        self.session.flush()  # see add_many
+        result = self.session.execute(
+            insert_unless_duplicated(
+                self.session.get_bind().dialect,
+                models.OperationEvent.__table__,
+                ["payment_method_id", "type"],
+                index_where=sqlalchemy.text(models.STARTED_OPERATION_EVENTS),
+            ),
+            {
+                "id": models.u(),
+                "created_at": operation_event.created_at,
+                "type": operation_event.type,
+                "status": operation_event.status,
+                "payment_method_id": operation_event.payment_method_id,
+            },
+        )
+        if result.rowcount == 0:
+            raise domain.OperationEvent.Duplicated  # another process started this operation
         payment_method.operation_events.append(operation_event)
         return operation_event
 
+    @deal.safe
+    def add_many(
+        self,
+        payment_method: "protocols.PaymentMethod",
+        types_and_statuses: Sequence[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]],
+    ) -> list["protocols.OperationEvent"]:
+        """Same as add, but inserting every OperationEvent in a single executemany statement"""
+        operation_events: list["protocols.OperationEvent"] = [
+            domain.OperationEvent(
+                created_at=models.now(),
+                type=type,
+                status=status,
+                payment_method_id=payment_method.id,
+            )
+            for type, status in types_and_statuses
+        ]
+        if operation_events:
+            self.session.flush()  # Core inserts do not autoflush the rows they refer to
+            self.session.execute(
+                sqlalchemy.insert(models.OperationEvent.__table__),
+                [
+                    {
+                        "id": models.u(),
+                        "created_at": operation_event.created_at,
+                        "type": operation_event.type,
+                        "status": operation_event.status,
+                        "payment_method_id": operation_event.payment_method_id,
+                    }
+                    for operation_event in operation_events
+                ],
+            )
+        payment_method.operation_events.extend(operation_events)
+        return operation_events
+
     def get(self, id: UUID) -> "protocols.OperationEvent": ...  # type: ignore[empty-body]
 
 
@@ -137,6 +247,44 @@ class BlockEventRepository:
         self.session.add(db_block_event)
         return db_block_event.to_domain()
 
+    @deal.reason(
+        ValueError,
+        lambda self, payment_method, block_events: any(
+            block_event.payment_method_id != payment_method.id for block_event in block_events
+        ),
+    )
+    def add_many(
+        self, payment_method: "protocols.PaymentMethod", block_events: Sequence["protocols.BlockEvent"]
+    ) -> list["protocols.BlockEvent"]:
+        """Same as add, but inserting every BlockEvent in a single executemany statement"""
+        if any(block_event.payment_method_id != payment_method.id for block_event in block_events):
+            raise ValueError("BlockEvent is not associated with provided PaymentMethod")
+        added_block_events: list["protocols.BlockEvent"] = [
+            domain.BlockEvent(
+                created_at=models.utc(block_event.created_at),  # when it got staged, rather than stored
+                status=block_event.status,
+                payment_method_id=payment_method.id,
+                block_name=block_event.block_name,
+            )
+            for block_event in block_events
+        ]
+        if added_block_events:
+            self.session.flush()  # see OperationEventRepository.add_many
+            self.session.execute(
+                sqlalchemy.insert(models.BlockEvent.__table__),
+                [
+                    {
+                        "id": models.u(),
+                        "created_at": block_event.created_at,
+                        "status": block_event.status,
+                        "block_name": block_event.block_name,
+                        "payment_method_id": block_event.payment_method_id,
+                    }
+                    for block_event in added_block_events
+                ],
+            )
+        return added_block_events
+
     def get(self, id: UUID) -> "protocols.BlockEvent": ...  # type: ignore[empty-body]
 
 
@@ -144,20 +292,90 @@ class BlockEventRepository:
 class TransactionRepository:
 
     session: orm.Session
+    raw_data_policy: codecs.RawDataPolicy = codecs.default_policy  # Override in a dataclass subclass to plug yours
 
-    @deal.safe
+    @deal.raises(domain.Transaction.Duplicated, sqlalchemy.exc.DatabaseError)
     def add(
         self,
         transaction: "protocols.Transaction",
     ) -> "protocols.Transaction":
-        db_transaction = models.Transaction(
-            external_id=transaction.external_id,
-            timestamp=transaction.timestamp,
-            raw_data=transaction.raw_data,
-            provider_name=transaction.provider_name,
-            payment_method_id=transaction.payment_method_id,
+        encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
+        try:
+            self.session.flush()  # the PaymentMethod of transaction may be pending
+            result = self.session.execute(
+                insert_unless_duplicated(
+                    self.session.get_bind().dialect,
+                    models.Transaction.__table__,
+                    ["provider_name", "external_id"],
+                ),
+                {
+                    "id": models.u(),
+                    "external_id": transaction.external_id,
+                    "timestamp": transaction.timestamp,
+                    "raw_data_codec": encoded_raw_data.codec,
+                    "encoded_raw_data": encoded_raw_data.data,
+                    "raw_data_reference": encoded_raw_data.reference,
+                    "provider_name": transaction.provider_name,
+                    "payment_method_id": transaction.payment_method_id,
+                },
+            )
+        except sqlalchemy.exc.DatabaseError:
+            self.raw_data_policy.discard(encoded_raw_data)
+            raise
+        if result.rowcount == 0:
+            self.raw_data_policy.discard(encoded_raw_data)
+            raise domain.Transaction.Duplicated  # the provider delivered this event again
+        discard_raw_data_unless_committed(self.session, self.raw_data_policy, encoded_raw_data)
+        return transaction  # no need to decode what just got encoded
+
+    def add_many(self, transactions: Sequence["protocols.Transaction"]) -> list["protocols.Transaction"]:
+        """Same as add, but inserting every Transaction in a single executemany statement"""
+        rows = []
+        for transaction in transactions:
+            encoded_raw_data = self.raw_data_policy.encode(transaction.raw_data)
+            discard_raw_data_unless_committed(self.session, self.raw_data_policy, encoded_raw_data)
+            rows.append(
+                {
+                    "id": models.u(),
+                    "external_id": transaction.external_id,
+                    "timestamp": transaction.timestamp,
+                    "raw_data_codec": encoded_raw_data.codec,
+                    "encoded_raw_data": encoded_raw_data.data,
+                    "raw_data_reference": encoded_raw_data.reference,
+                    "provider_name": transaction.provider_name,
+                    "payment_method_id": transaction.payment_method_id,
+                }
+            )
+        if rows:
+            self.session.flush()  # see OperationEventRepository.add_many
+            self.session.execute(sqlalchemy.insert(models.Transaction.__table__), rows)
+        return list(transactions)
+
+    def existing_external_ids(self, provider_name: str, external_ids: Sequence[str]) -> set[str]:
+        """Those of external_ids already stored for provider_name, in a single query"""
+        return set(
+            self.session.scalars(
+                sqlalchemy.select(models.Transaction.external_id).where(
+                    models.Transaction.provider_name == provider_name,
+                    models.Transaction.external_id.in_(external_ids),
+                )
+            )
         )
-        self.session.add(db_transaction)
-        return db_transaction.to_domain()
 
-    def get(self, id: UUID) -> "protocols.BlockEvent": ...  # type: ignore[empty-body]
+    @deal.reason(
+        domain.Transaction.DoesNotExist,
+        lambda self, id: self.session.query(models.Transaction).filter_by(id=id).count() == 0,
+    )
+    def get(self, id: UUID) -> "protocols.Transaction":
+        try:
+            return (
+                self.session.query(models.Transaction)
+                .options(
+                    orm.undefer(models.Transaction.encoded_raw_data),
+                )
+                .filter_by(id=id)
+                .one()
+                .to_domain(self.raw_data_policy)
+            )
+        except orm.exc.NoResultFound:
+            raise domain.Transaction.DoesNotExist
@@ -1,13 +1,14 @@
-import os
+import uuid
 from dataclasses import dataclass, field
 from types import TracebackType
 from typing import Optional, Self
 
-import sqlalchemy
 from sqlalchemy import orm
 
 from acquiring import protocols
 
+from . import engine
+
 
 @dataclass
 class SqlAlchemyUnitOfWork:
@@ -35,13 +36,20 @@ class SqlAlchemyUnitOfWork:
     transaction_repository_class: type[protocols.Repository]
     transactions: protocols.Repository = field(init=False, repr=False)
 
-    session_factory: orm.sessionmaker = orm.sessionmaker(
-        bind=sqlalchemy.create_engine(os.environ.get("SQLALCHEMY_DATABASE_URL"))
-    )
+    session_factory: Optional[orm.sessionmaker] = None  # Defaults to sessions bound to the shared engine
     session: orm.Session = field(init=False, repr=False)
 
+    depth: int = field(default=0, init=False, repr=False)
+    savepoints: dict[str, orm.SessionTransaction] = field(default_factory=dict, init=False, repr=False)
+
     def __enter__(self) -> Self:
-        self.session = self.session_factory()
+        # Entering an already entered unit of work joins the session of the outermost block
+        self.depth += 1
+        if self.depth > 1:
+            return self
+
+        session_factory = self.session_factory or engine.get_session_factory()
+        self.session = session_factory()
 
         self.payment_attempts = self.payment_attempt_repository_class(session=self.session)  # type: ignore[call-arg]
         self.milestones = self.milestone_repository_class(session=self.session)  # type:ignore[call-arg]
@@ -58,13 +66,41 @@ class SqlAlchemyUnitOfWork:
         exc_value: Optional[type[BaseException]],
         exc_tb: Optional[TracebackType],
     ) -> None:
+        self.depth -= 1
+        if self.depth > 0:
+            return
+
         # Autocommit disabled, see PEP 249 - Python Database API Specification v2.0
         if exc_type is not None:
             self.rollback()
+        self.savepoints.clear()
         self.session.close()
 
     def commit(self) -> None:
+        # Inside nested blocks, committing is deferred to the outermost block
+        if self.depth > 1:
+            self.session.flush()
+            return
+
         self.session.commit()
+        self.savepoints.clear()
 
     def rollback(self) -> None:
         self.session.rollback()
+        self.savepoints.clear()
+
+    def close(self) -> None:
+        """Sessions give their connection back to the pool as the outermost block exits, so nothing is left open"""
+        pass
+
+    def savepoint(self) -> str:
+        """See DjangoUnitOfWork.savepoint"""
+        savepoint = uuid.uuid4().hex
+        self.savepoints[savepoint] = self.session.begin_nested()
+        return savepoint
+
+    def rollback_to_savepoint(self, savepoint: str) -> None:
+        self.savepoints.pop(savepoint).rollback()
+
+    def release_savepoint(self, savepoint: str) -> None:
+        self.savepoints.pop(savepoint).commit()
@@ -1,6 +1,8 @@
-"""Set of functions used to control which ORM loads"""
+"""Set of functions used to control which ORM (and which optional dependencies) loads"""
 
 import importlib.util
+import json
+from typing import Callable
 
 
 def is_django_installed() -> bool:
@@ -11,3 +13,31 @@ def is_django_installed() -> bool:
 def is_sqlalchemy_installed() -> bool:
     """True only when sqlalchemy is installed"""
     return bool(importlib.util.find_spec("sqlalchemy"))
+
+
+def is_httpx_installed() -> bool:
+    """True only when httpx is installed"""
+    return bool(importlib.util.find_spec("httpx"))
+
+
+def is_zstandard_installed() -> bool:
+    """True only when zstandard is installed"""
+    return bool(importlib.util.find_spec("zstandard"))
+
+
+def is_orjson_installed() -> bool:
+    """True only when orjson is installed"""
+    return bool(importlib.util.find_spec("orjson"))
+
+
+if is_orjson_installed():
+    import orjson
+
+    _loads: Callable[[str | bytes], dict] = orjson.loads
+else:
+    _loads = json.loads
+
+
+def json_loads(data: str | bytes) -> dict:
+    """Parses a JSON object, with orjson when installed, with the standard json module otherwise"""
+    return _loads(data)
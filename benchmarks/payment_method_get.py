@@ -0,0 +1,162 @@
+"""
+Benchmark of PaymentMethodRepository.get on SQLAlchemy, with and without the event payment method indexes.
+
+Fills a database with payment methods, each one with as many OperationEvents and BlockEvents as asked for,
+then times getting random payment methods, once with the status only indexes that events used to have,
+and once with the composite ones that start with payment_method_id.
+
+Tens of millions of events take a while to insert, so the database is kept between runs
+(pass --fill again to start from scratch):
+
+    python -m benchmarks.payment_method_get --url sqlite:///benchmark.sqlite3 --fill \\
+        --payment-methods 2000000 --events-per-payment-method 10
+"""
+
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import product
+
+import sqlalchemy
+from sqlalchemy import orm
+
+from acquiring import enums, utils
+
+if utils.is_django_installed():
+    # acquiring.storage loads the Django models too, whenever Django is installed
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "acquiring.settings")
+    django.setup()
+
+from acquiring.storage.sqlalchemy import models, repositories
+
+CHUNK_SIZE = 10_000
+
+# name, table, columns
+STATUS_INDEXES = [
+    ("ix_acquiring_paymentoperations_status", "acquiring_paymentoperations", ["status"]),
+    ("ix_acquiring_blockevents_status", "acquiring_blockevents", ["status"]),
+]
+PAYMENT_METHOD_INDEXES = [
+    (
+        "ix_acquiring_paymentoperations_payment_method",
+        "acquiring_paymentoperations",
+        ["payment_method_id", "type", "status", "created_at"],
+    ),
+    (
+        "ix_acquiring_blockevents_payment_method",
+        "acquiring_blockevents",
+        ["payment_method_id", "block_name", "status", "created_at"],
+    ),
+]
+
+
+def fill(engine: sqlalchemy.engine.Engine, payment_methods: int, events_per_payment_method: int) -> list[str]:
+    models.Model.metadata.drop_all(engine)
+    models.Model.metadata.create_all(engine)
+
+    # Finished operations only, so that the unique index on started OperationEvents does not get in the way
+    types_and_statuses = list(
+        product(
+            [type for type in enums.OperationTypeEnum if type != enums.OperationTypeEnum.REFUND],
+            [status for status in enums.OperationStatusEnum if status != enums.OperationStatusEnum.STARTED],
+        )
+    )
+    created_at = datetime.now(timezone.utc)
+    payment_method_ids = []
+
+    with engine.begin() as connection:
+        payment_attempt_id = str(uuid.uuid4())
+        connection.execute(
+            sqlalchemy.insert(models.PaymentAttempt.__table__), [{"id": payment_attempt_id, "created_at": created_at}]
+        )
+
+        for start in range(0, payment_methods, CHUNK_SIZE):
+            ids = [str(uuid.uuid4()) for _ in range(min(CHUNK_SIZE, payment_methods - start))]
+            payment_method_ids.extend(ids)
+            connection.execute(
+                sqlalchemy.insert(models.PaymentMethod.__table__),
+                [{"id": id, "created_at": created_at, "payment_attempt_id": payment_attempt_id} for id in ids],
+            )
+
+            events = [
+                (id, created_at + timedelta(microseconds=index), *random.choice(types_and_statuses))  # nosec B311
+                for id in ids
+                for index in range(events_per_payment_method)
+            ]
+            connection.execute(
+                sqlalchemy.insert(models.OperationEvent.__table__),
+                [
+                    {"id": str(uuid.uuid4()), "payment_method_id": id, "created_at": at, "type": type, "status": status}
+                    for id, at, type, status in events
+                ],
+            )
+            connection.execute(
+                sqlalchemy.insert(models.BlockEvent.__table__),
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "payment_method_id": id,
+                        "created_at": at,
+                        "block_name": type,
+                        "status": status,
+                    }
+                    for id, at, type, status in events
+                ],
+            )
+            print(f"{start + len(ids)} payment methods filled", end="\r")
+    print()
+    return payment_method_ids
+
+
+def use_indexes(engine: sqlalchemy.engine.Engine, indexes: list[tuple[str, str, list[str]]]) -> None:
+    """Leaves only the given indexes on the event tables"""
+    with engine.begin() as connection:
+        for name, _, _ in STATUS_INDEXES + PAYMENT_METHOD_INDEXES:
+            connection.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS {name}"))
+        for name, table, columns in indexes:
+            connection.execute(sqlalchemy.text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+        if engine.dialect.name == "sqlite":
+            connection.execute(sqlalchemy.text("ANALYZE"))
+
+
+def time_gets(engine: sqlalchemy.engine.Engine, payment_method_ids: list[str], gets: int) -> float:
+    """Average seconds that PaymentMethodRepository.get takes"""
+    sample = random.sample(payment_method_ids, min(gets, len(payment_method_ids)))
+    with orm.Session(engine) as session:
+        repository = repositories.PaymentMethodRepository(session=session)
+        start = time.perf_counter()
+        for id in sample:
+            repository.get(id=id)  # type:ignore[arg-type]
+            session.expunge_all()
+        return (time.perf_counter() - start) / len(sample)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///benchmark.sqlite3")
+    parser.add_argument("--fill", action="store_true", help="drop and fill the database")
+    parser.add_argument("--payment-methods", type=int, default=100_000)
+    parser.add_argument("--events-per-payment-method", type=int, default=10)
+    parser.add_argument("--gets", type=int, default=1_000)
+    arguments = parser.parse_args()
+
+    engine = sqlalchemy.create_engine(arguments.url)
+    if arguments.fill:
+        payment_method_ids = fill(engine, arguments.payment_methods, arguments.events_per_payment_method)
+    else:
+        with engine.connect() as connection:
+            payment_method_ids = list(connection.execute(sqlalchemy.select(models.PaymentMethod.id)).scalars())
+
+    for label, indexes in (("status", STATUS_INDEXES), ("payment_method_id, ...", PAYMENT_METHOD_INDEXES)):
+        use_indexes(engine, indexes)
+        average = time_gets(engine, payment_method_ids, arguments.gets)
+        print(f"Indexed by {label}: {average * 1000:.3f} ms per get")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import os
+import threading
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from types import TracebackType
-from typing import Callable, Generator, Optional, Self
+from typing import Callable, Generator, Optional, Self, Sequence
 from unittest import mock
 import pytest
 
@@ -181,6 +182,17 @@ def fake_operation_event_repository_class() -> (
                 type: enums.OperationTypeEnum,
                 status: enums.OperationStatusEnum,
             ) -> protocols.OperationEvent:
+                # Same as the unique index on started OperationEvents in storage
+                if (
+                    status == enums.OperationStatusEnum.STARTED
+                    and type != enums.OperationTypeEnum.REFUND
+                    and any(
+                        unit.payment_method_id == payment_method.id and unit.type == type and unit.status == status
+                        for unit in self.units
+                    )
+                ):
+                    raise domain.OperationEvent.Duplicated
+
                 operation_event = domain.OperationEvent(
                     created_at=datetime.now(),
                     type=type,
@@ -191,6 +203,13 @@ def fake_operation_event_repository_class() -> (
                 self.units.add(operation_event)
                 return operation_event
 
+            def add_many(
+                self,
+                payment_method: protocols.PaymentMethod,
+                types_and_statuses: Sequence[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]],
+            ) -> list[protocols.OperationEvent]:
+                return [self.add(payment_method, type, status) for type, status in types_and_statuses]
+
             def get(  # type:ignore[empty-body]
                 self, id: uuid.UUID
             ) -> protocols.OperationEvent: ...
@@ -226,6 +245,16 @@ def fake_transaction_repository_class() -> (
                 self.units.add(transaction)
                 return transaction
 
+            def add_many(self, transactions: Sequence[protocols.Transaction]) -> list[protocols.Transaction]:
+                return [self.add(transaction) for transaction in transactions]
+
+            def existing_external_ids(self, provider_name: str, external_ids: Sequence[str]) -> set[str]:
+                return {
+                    unit.external_id
+                    for unit in self.units
+                    if unit.provider_name == provider_name and unit.external_id in external_ids
+                }
+
             def get(  # type:ignore[empty-body]
                 self,
                 id: uuid.UUID,
@@ -252,7 +281,11 @@ def fake_block_event_repository_class() -> (
                 """
                 self.units = block_events.copy() if block_events is not None else set()
 
-            def add(self, block_event: protocols.BlockEvent) -> protocols.BlockEvent:
+            def add(
+                self,
+                block_event: protocols.BlockEvent,
+                payment_method: Optional[protocols.PaymentMethod] = None,
+            ) -> protocols.BlockEvent:
                 block_event = domain.BlockEvent(
                     created_at=datetime.now(),
                     status=block_event.status,
@@ -262,6 +295,11 @@ def fake_block_event_repository_class() -> (
                 self.units.add(block_event)
                 return block_event
 
+            def add_many(
+                self, payment_method: protocols.PaymentMethod, block_events: Sequence[protocols.BlockEvent]
+            ) -> list[protocols.BlockEvent]:
+                return [self.add(block_event) for block_event in block_events]
+
             def get(  # type:ignore[empty-body]
                 self, id: uuid.UUID
             ) -> protocols.BlockEvent: ...
@@ -299,8 +337,16 @@ def fake_unit_of_work() -> type[test_protocols.FakeUnitOfWork]:
         block_event_units: set[protocols.BlockEvent] = field(default_factory=set)
 
         transaction_units: set[protocols.Transaction] = field(default_factory=set)
+        closing_threads: list[int] = field(default_factory=list)  # shared with copies, as units are
+
+        depth: int = field(default=0, init=False, repr=False)
+        commit_count: int = field(default=0, init=False, repr=False)
 
         def __enter__(self) -> Self:
+            self.depth += 1
+            if self.depth > 1:
+                return self
+
             self.payment_attempts = self.payment_attempt_repository_class()
 
             self.milestones = self.milestone_repository_class()
@@ -324,10 +370,14 @@ def fake_unit_of_work() -> type[test_protocols.FakeUnitOfWork]:
             exc_value: Optional[type[Exception]],
             exc_tb: Optional[TracebackType],
         ) -> None:
-            pass
+            self.depth -= 1
 
         def commit(self) -> None:
             """Refreshes the units with those inside the repository"""
+            if self.depth > 1:
+                return
+
+            self.commit_count += 1
             self.payment_method_units = self.payment_methods.units  # type:ignore[attr-defined]
 
             self.operation_event_units.update(unit for unit in self.operation_events.units)
@@ -339,4 +389,112 @@ def fake_unit_of_work() -> type[test_protocols.FakeUnitOfWork]:
         def rollback(self) -> None:
             pass
 
+        def close(self) -> None:
+            self.closing_threads.append(threading.get_ident())
+
     return FakeUnitOfWork
+
+
+@pytest.fixture(scope="module")
+def fake_async_unit_of_work() -> type[test_protocols.FakeAsyncUnitOfWork]:
+
+    @dataclass
+    class AwaitableFakeRepository:
+        """Exposes the methods of a fake repository as coroutines, and the rest of its attributes as they are"""
+
+        repository: protocols.Repository
+
+        async def add(self, *args: Sequence, **kwargs: dict) -> object:
+            return self.repository.add(*args, **kwargs)
+
+        async def get(self, id: uuid.UUID) -> object:
+            return self.repository.get(id=id)
+
+        def __getattr__(self, name: str) -> object:
+            attribute = getattr(self.repository, name)
+            if not callable(attribute):
+                return attribute
+
+            async def method(*args: Sequence, **kwargs: dict) -> object:
+                return attribute(*args, **kwargs)
+
+            return method
+
+    @dataclass
+    class FakeAsyncUnitOfWork:
+        payment_attempt_repository_class: type[protocols.Repository]
+        payment_attempts: protocols.AsyncRepository = field(init=False, repr=False)
+
+        milestone_repository_class: type[protocols.Repository]
+        milestones: protocols.AsyncRepository = field(init=False, repr=False)
+
+        payment_method_repository_class: type[protocols.Repository]
+        payment_methods: protocols.AsyncRepository = field(init=False, repr=False)
+
+        operation_event_repository_class: type[test_protocols.FakeRepository]
+        operation_events: protocols.AsyncRepository = field(init=False, repr=False)
+
+        block_event_repository_class: type[test_protocols.FakeRepository]
+        block_events: protocols.AsyncRepository = field(init=False, repr=False)
+
+        transaction_repository_class: type[test_protocols.FakeRepository]
+        transactions: protocols.AsyncRepository = field(init=False, repr=False)
+
+        payment_method_units: list[protocols.PaymentMethod] = field(default_factory=list)
+        operation_event_units: set[protocols.OperationEvent] = field(default_factory=set)
+        block_event_units: set[protocols.BlockEvent] = field(default_factory=set)
+
+        transaction_units: set[protocols.Transaction] = field(default_factory=set)
+
+        depth: int = field(default=0, init=False, repr=False)
+        commit_count: int = field(default=0, init=False, repr=False)
+
+        async def __aenter__(self) -> Self:
+            self.depth += 1
+            if self.depth > 1:
+                return self
+
+            self.payment_attempts = AwaitableFakeRepository(self.payment_attempt_repository_class())
+
+            self.milestones = AwaitableFakeRepository(self.milestone_repository_class())
+
+            self.payment_methods = AwaitableFakeRepository(self.payment_method_repository_class())
+            self.payment_method_units = self.payment_methods.units  # type:ignore[assignment]
+
+            self.operation_events = AwaitableFakeRepository(self.operation_event_repository_class())
+            self.operation_event_units.update(unit for unit in self.operation_events.units)  # type:ignore[attr-defined]
+
+            self.block_events = AwaitableFakeRepository(self.block_event_repository_class())
+            self.block_event_units.update(unit for unit in self.block_events.units)  # type:ignore[attr-defined]
+
+            self.transactions = AwaitableFakeRepository(self.transaction_repository_class())
+            self.transaction_units.update(unit for unit in self.transactions.units)  # type:ignore[attr-defined]
+            return self
+
+        async def __aexit__(
+            self,
+            exc_type: Optional[type[Exception]],
+            exc_value: Optional[type[Exception]],
+            exc_tb: Optional[TracebackType],
+        ) -> None:
+            self.depth -= 1
+
+        async def commit(self) -> None:
+            """Refreshes the units with those inside the repository"""
+            if self.depth > 1:
+                return
+
+            self.commit_count += 1
+            self.payment_method_units = self.payment_methods.units  # type:ignore[attr-defined]
+
+            self.operation_event_units.update(unit for unit in self.operation_events.units)  # type:ignore[attr-defined]
+
+            self.block_event_units.update(unit for unit in self.block_events.units)  # type:ignore[attr-defined]
+
+            self.transaction_units.update(unit for unit in self.transactions.units)  # type:ignore[attr-defined]
+
+        async def rollback(self) -> None:
+            pass
+
+    # Built from the same fake repository classes as FakeUnitOfWork, which are not async themselves
+    return FakeAsyncUnitOfWork  # type:ignore[return-value]
@@ -179,3 +179,77 @@ def test_givenACorrectPaymentMethod_whenRunningPayPalAfterCreatingOrder_thenItCo
         )
         in transactions
     )
+
+
+def test_givenARedeliveryStoredMeanwhile_whenRunningPayPalAfterCreatingOrder_thenItIsTreatedAsAlreadyProcessed(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+
+    class RacedTransactionRepository(fake_transaction_repository_class(set())):  # type:ignore[misc]
+        """Another delivery of the same event gets stored between checking for it and adding it"""
+
+        def add(self, transaction: protocols.Transaction) -> protocols.Transaction:
+            raise domain.Transaction.Duplicated
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(payment_method.operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=RacedTransactionRepository,
+    )
+
+    response = paypal.blocks.PayPalAfterCreatingOrder().run(
+        unit_of_work,
+        payment_method,
+        webhook_data=paypal.domain.PayPalWebhookData(
+            id="WH-684457241H310260F-0FC94184GF055315P",
+            event_version="1.0",
+            create_time=datetime.now(timezone.utc),
+            resource_type="checkout-order",
+            resource_version="2.0",
+            event_type="CHECKOUT.ORDER.APPROVED",
+            summary=fake.sentence(),
+            raw_data="{}",
+        ),
+    )
+
+    assert response == domain.BlockResponse(
+        status=enums.OperationStatusEnum.COMPLETED,
+        actions=[],
+        error_message=None,
+    )
+    assert sorted(block_event.status for block_event in unit_of_work.block_event_units) == [
+        enums.OperationStatusEnum.COMPLETED,
+        enums.OperationStatusEnum.STARTED,
+    ]
@@ -0,0 +1,17 @@
+from typing import Generator
+
+import pytest
+
+from acquiring.contrib import paypal
+
+
+@pytest.fixture(autouse=True)
+def clear_paypal_caches() -> Generator:
+    """Access tokens, webhooks and processed events are cached per process, tests must not see those of other tests"""
+    paypal.tokens.token_cache.clear()
+    paypal.webhook_ids.webhook_registry.clear()
+    paypal.webhooks.processed_events.clear()
+    yield
+    paypal.tokens.token_cache.clear()
+    paypal.webhook_ids.webhook_registry.clear()
+    paypal.webhooks.processed_events.clear()
@@ -1,11 +1,22 @@
+import dataclasses
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
 import pytest
+import requests
 import responses
+from responses import matchers
 
+from acquiring import domain, protocols
 from acquiring.contrib import paypal
+from tests import protocols as test_protocols
 
 
 @responses.activate
-def test_givenInvalidCredentials_whenInstantiatingTheAdapter_thenAnUnauthorizedResponseIsReturned() -> None:
+def test_givenInvalidCredentials_whenWarmingUpTheAdapter_thenAnUnauthorizedResponseIsReturned() -> None:
     responses.add(
         responses.POST,
         f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
@@ -14,18 +25,19 @@ def test_givenInvalidCredentials_whenInstantiatingTheAdapter_thenAnUnauthorizedR
         content_type="application/json",
     )
 
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+    )
     with pytest.raises(paypal.adapter.UnauthorizedError):
-        paypal.adapter.PayPalAdapter(
-            base_url="https://api-m.sandbox.paypal.com/",
-            client_id="TEST_CLIENT_ID",
-            client_secret="TEST_CLIENT_SECRET",
-            callback_url="https://www.example.com",
-            webhook_id="LONG_ID",
-        )
+        adapter.warm_up()
 
 
 @responses.activate
-def test_givenValidCredentials_whenInstantiatingTheAdapter_thenAccessTokenIsRetrievedFromPayPal() -> None:
+def test_givenValidCredentials_whenUsingTheAdapter_thenAccessTokenIsRetrievedFromPayPal() -> None:
     token = "long-token"
     responses.add(
         responses.POST,
@@ -61,3 +73,563 @@ def test_givenABaseUrlThatDoesNotEndInSlash_whenInstantiatingTheAdapter_thenABad
             callback_url="https://www.example.com",
             webhook_id="LONG_ID",
         )
+
+
+@responses.activate
+def test_givenAnAdapter_whenCallingPayPalFromManyThreads_thenEveryThreadSharesTheSamePoolOfConnections() -> None:
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+        pool_maxsize=4,
+        connect_timeout=1,
+        read_timeout=5,
+    )
+    adapter.warm_up()
+
+    sessions: list[requests.Session] = []
+    threads = [threading.Thread(target=lambda: sessions.append(adapter.session)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert adapter.session is adapter.session
+    assert len({id(session) for session in sessions + [adapter.session]}) == 3
+    assert all(session.get_adapter(adapter.base_url) is adapter.http_adapter for session in sessions)
+    assert adapter.http_adapter._pool_maxsize == 4  # type:ignore[attr-defined]
+
+    assert responses.calls[0].request.req_kwargs["timeout"] == (1, 5)  # type:ignore[attr-defined]
+
+
+@responses.activate
+def test_givenManyAdaptersWithTheSameCredentials_whenWarmingThemUp_thenPayPalGetsAuthenticatedAndSubscribedOnce() -> (
+    None
+):
+    access_token_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    webhook_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.CREATE_WEBHOOK}",
+        json={"id": "LONG_ID"},
+        status=201,
+        content_type="application/json",
+    )
+
+    adapters = [
+        paypal.adapter.PayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+        )
+        for _ in range(3)
+    ]
+    assert access_token_response.call_count == 0
+    assert webhook_response.call_count == 0
+
+    for adapter in adapters:
+        adapter.warm_up()
+
+    assert access_token_response.call_count == 1
+    assert webhook_response.call_count == 1
+    assert all(adapter.access_token == "long-token" for adapter in adapters)
+    assert all(adapter.webhook_id == "LONG_ID" for adapter in adapters)
+
+
+@responses.activate
+def test_givenAnAccessTokenAboutToExpire_whenUsingIt_thenANewOneGetsFetchedInTheBackground() -> None:
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "old-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "new-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+    )
+    adapter.warm_up()
+
+    # Age the token until it is inside the refresh margin, without expiring it
+    key = ("TEST_CLIENT_ID", "https://api-m.sandbox.paypal.com/")
+    token = paypal.tokens.token_cache._tokens[key]
+    paypal.tokens.token_cache._tokens[key] = dataclasses.replace(
+        token, obtained_at=token.obtained_at - token.expires_in * (1 - paypal.tokens.REFRESH_MARGIN / 2)
+    )
+
+    # The current token is still valid, so it gets returned right away
+    assert adapter.access_token == "old-token"
+
+    deadline = time.monotonic() + 5
+    while adapter.access_token == "old-token" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert adapter.access_token == "new-token"
+
+
+@responses.activate
+def test_givenARevokedAccessToken_whenCreatingAnOrder_thenRequestIsRetriedOnceWithANewAccessToken(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    for access_token in ["revoked-token", "new-token"]:
+        responses.add(
+            responses.POST,
+            f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+            json={"scope": "", "access_token": access_token, "expires_in": 31668},
+            status=201,
+            content_type="application/json",
+        )
+    unauthorized_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"error": "invalid_token"},
+        status=401,
+        match=[matchers.header_matcher({"Authorization": "Bearer revoked-token"})],
+    )
+    order_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"id": "ORDER_ID", "status": "CREATED", "intent": "CAPTURE"},
+        status=201,
+        match=[matchers.header_matcher({"Authorization": "Bearer new-token"})],
+    )
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+    )
+    response = adapter.create_order(
+        unit_of_work=unit_of_work,
+        payment_method=payment_method,
+        request_id=uuid.uuid4(),
+        order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+    )
+
+    assert response.external_id == "ORDER_ID"
+    assert response.data == {"id": "ORDER_ID", "status": "CREATED", "intent": "CAPTURE"}
+    assert unauthorized_response.call_count == 1
+    assert order_response.call_count == 1
+    assert adapter.access_token == "new-token"
+
+
+def test_givenUnreachablePayPal_whenInstantiatingTheAdapter_thenNoRequestIsMade() -> None:
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as requests_mock:
+        adapter = paypal.adapter.PayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+        )
+        assert repr(adapter) == "PayPalAdapter:base_url=https://api-m.sandbox.paypal.com/|client_id=TEST_CLIENT_ID"
+
+        assert len(requests_mock.calls) == 0
+
+
+def test_givenAWebhookBeingSubscribed_whenGettingTheWebhookOfAnotherCallbackUrl_thenItDoesNotWaitForIt() -> None:
+    registry = paypal.webhook_ids.WebhookRegistry()
+    subscribing = threading.Event()
+    release = threading.Event()
+
+    def slow_subscribe() -> str:
+        subscribing.set()
+        release.wait(timeout=5)
+        return "SLOW_WEBHOOK_ID"
+
+    slow = threading.Thread(target=lambda: registry.get(("ID", "URL", "slow"), slow_subscribe))
+    slow.start()
+    subscribing.wait(timeout=5)
+
+    webhook_ids = []
+    fast = threading.Thread(target=lambda: webhook_ids.append(registry.get(("ID", "URL", "fast"), lambda: "FAST_ID")))
+    fast.start()
+    fast.join(timeout=1)
+    finished_while_subscribing = not fast.is_alive()
+
+    release.set()
+    slow.join()
+    fast.join()
+
+    assert finished_while_subscribing
+    assert webhook_ids == ["FAST_ID"]
+    assert registry.get(("ID", "URL", "slow"), lambda: "ANOTHER_WEBHOOK_ID") == "SLOW_WEBHOOK_ID"
+
+
+@responses.activate
+def test_givenAWebhookRegisteredAtDeployTime_whenUsingAdaptersWithItsId_thenPayPalIsNotSubscribedAgain() -> None:
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    webhook_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.CREATE_WEBHOOK}",
+        json={"id": "DEPLOYED_WEBHOOK_ID"},
+        status=201,
+        content_type="application/json",
+    )
+
+    webhook_id = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+    ).register_webhook()
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id=webhook_id,
+    )
+    adapter.warm_up()
+
+    assert webhook_id == "DEPLOYED_WEBHOOK_ID"
+    assert adapter.webhook_id == "DEPLOYED_WEBHOOK_ID"
+    assert webhook_response.call_count == 1
+
+
+@responses.activate
+def test_givenPayPalFailingTransiently_whenCreatingAnOrder_thenRequestIsRetriedWithTheSamePayPalRequestId(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    request_id = uuid.uuid4()
+    unavailable_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        body=requests.exceptions.ConnectionError("Connection reset by peer"),
+    )
+    service_unavailable_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"name": "SERVICE_UNAVAILABLE"},
+        status=503,
+    )
+    order_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"id": "ORDER_ID", "status": "CREATED", "intent": "CAPTURE"},
+        status=201,
+        match=[matchers.header_matcher({"PayPal-Request-Id": str(request_id)})],
+    )
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+        resilience=domain.Resilience(
+            retry_policy=domain.RetryPolicy(attempts=3, base_delay=0),
+            timeouts={paypal.adapter.CREATE_ORDER: 5},
+        ),
+    )
+    response = adapter.create_order(
+        unit_of_work=unit_of_work,
+        payment_method=payment_method,
+        request_id=request_id,
+        order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+    )
+
+    assert response.external_id == "ORDER_ID"
+    assert unavailable_response.call_count == 1
+    assert service_unavailable_response.call_count == 1
+    assert order_response.call_count == 1
+    timeout = responses.calls[-1].request.req_kwargs["timeout"]  # type:ignore[attr-defined]
+    assert timeout == (adapter.connect_timeout, 5)
+    assert len(unit_of_work.transaction_units) == 1
+
+
+@responses.activate
+def test_givenAnOpenCircuit_whenCreatingAnOrder_thenAFailedResponseIsReturnedWithoutCallingPayPal(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    orders_response = responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"name": "SERVICE_UNAVAILABLE"},
+        status=503,
+    )
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        webhook_id="LONG_ID",
+        resilience=domain.Resilience(
+            retry_policy=domain.RetryPolicy(attempts=2, base_delay=0),
+            circuit_breaker=domain.CircuitBreaker(failure_threshold=2),
+        ),
+    )
+    responses_of_orders = [
+        adapter.create_order(
+            unit_of_work=unit_of_work,
+            payment_method=payment_method,
+            request_id=uuid.uuid4(),
+            order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+        )
+        for _ in range(2)
+    ]
+
+    assert orders_response.call_count == 2
+    assert all(response.status == paypal.PayPalStatusEnum.FAILED for response in responses_of_orders)
+    assert responses_of_orders[-1].raw_data == "Circuit is open, /v2/checkout/orders was not called"
+    assert len(unit_of_work.transaction_units) == 0
+
+
+@responses.activate
+def test_givenPayPalDownOnTheFirstOrder_whenCreatingIt_thenAuthenticatingAndSubscribingAreRetriedAlongWithIt(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    unreachable_token_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        body=requests.exceptions.ConnectionError("Connection refused"),
+    )
+    service_unavailable_token_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"name": "SERVICE_UNAVAILABLE"},
+        status=503,
+    )
+    token_response = responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}",
+        json={"scope": "", "access_token": "long-token", "expires_in": 31668},
+        status=201,
+        content_type="application/json",
+    )
+    responses.add(
+        responses.POST,
+        f"https://api-m.sandbox.paypal.com/{paypal.adapter.CREATE_WEBHOOK}",
+        json={"id": "WEBHOOK_ID"},
+        status=201,
+        content_type="application/json",
+    )
+    responses.add(
+        responses.POST,
+        "https://api-m.sandbox.paypal.com/v2/checkout/orders",
+        json={"id": "ORDER_ID", "status": "CREATED", "intent": "CAPTURE"},
+        status=201,
+    )
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    adapter = paypal.adapter.PayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+        resilience=domain.Resilience(retry_policy=domain.RetryPolicy(attempts=3, base_delay=0)),
+    )
+    response = adapter.create_order(
+        unit_of_work=unit_of_work,
+        payment_method=payment_method,
+        request_id=uuid.uuid4(),
+        order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+    )
+
+    assert response.external_id == "ORDER_ID"
+    assert unreachable_token_response.call_count == 1
+    assert service_unavailable_token_response.call_count == 1
+    assert token_response.call_count == 1
+    assert adapter.webhook_id == "WEBHOOK_ID"
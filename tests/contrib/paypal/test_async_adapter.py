@@ -0,0 +1,301 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+import pytest
+
+from acquiring import domain, protocols, utils
+from acquiring.contrib import paypal
+from tests import protocols as test_protocols
+from tests.contrib.paypal.utils import skip_if_httpx_not_installed
+
+if utils.is_httpx_installed():
+    import httpx
+    import respx
+
+
+@skip_if_httpx_not_installed
+def test_givenInvalidCredentials_whenWarmingUpTheAsyncAdapter_thenAnUnauthorizedResponseIsReturned() -> None:
+
+    async def warm_up() -> None:
+        async with paypal.AsyncPayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+            webhook_id="LONG_ID",
+        ) as adapter:
+            await adapter.warm_up()
+
+    with respx.mock:
+        respx.post(f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}").mock(
+            return_value=httpx.Response(
+                401, json={"error": "invalid_client", "error_description": "Client Authentication failed"}
+            )
+        )
+
+        with pytest.raises(paypal.adapter.UnauthorizedError):
+            asyncio.run(warm_up())
+
+
+@skip_if_httpx_not_installed
+def test_givenAnAsyncAdapter_whenRepresentingIt_thenItsClientSecretIsNotShown() -> None:
+    adapter = paypal.AsyncPayPalAdapter(
+        base_url="https://api-m.sandbox.paypal.com/",
+        client_id="TEST_CLIENT_ID",
+        client_secret="TEST_CLIENT_SECRET",
+        callback_url="https://www.example.com",
+    )
+
+    assert repr(adapter) == "AsyncPayPalAdapter:base_url=https://api-m.sandbox.paypal.com/|client_id=TEST_CLIENT_ID"
+    assert "TEST_CLIENT_SECRET" not in repr(adapter)
+
+    asyncio.run(adapter.aclose())
+
+
+@skip_if_httpx_not_installed
+def test_givenManyOrdersInFlight_whenCreatingThemWithTheAsyncAdapter_thenPayPalGetsAuthenticatedAndSubscribedOnce(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+    payment_methods: list[protocols.PaymentMethod] = [
+        domain.PaymentMethod(
+            id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+            created_at=datetime.now(),
+            payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+        )
+        for _ in range(5)
+    ]
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class(payment_methods),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    async def create_orders() -> list["protocols.AdapterResponse"]:
+        async with paypal.AsyncPayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+        ) as adapter:
+            return await asyncio.gather(
+                *[
+                    adapter.create_order(
+                        unit_of_work=unit_of_work,
+                        payment_method=payment_method,
+                        request_id=uuid.uuid4(),
+                        order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+                    )
+                    for payment_method in payment_methods
+                ]
+            )
+
+    with respx.mock:
+        access_token_route = respx.post(f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}").mock(
+            return_value=httpx.Response(201, json={"scope": "", "access_token": "long-token", "expires_in": 31668})
+        )
+        webhook_route = respx.post(f"https://api-m.sandbox.paypal.com/{paypal.adapter.CREATE_WEBHOOK}").mock(
+            return_value=httpx.Response(201, json={"id": "LONG_ID"})
+        )
+        order_route = respx.post("https://api-m.sandbox.paypal.com/v2/checkout/orders").mock(
+            side_effect=[
+                httpx.Response(
+                    201,
+                    json={
+                        "id": f"ORDER_ID_{index}",
+                        "status": "PAYER_ACTION_REQUIRED",
+                        "intent": "CAPTURE",
+                        "create_time": "2024-04-01T10:00:00+00:00",
+                    },
+                )
+                for index in range(5)
+            ]
+        )
+
+        responses = asyncio.run(create_orders())
+
+    assert access_token_route.call_count == 1
+    assert webhook_route.call_count == 1
+    assert order_route.call_count == 5
+    assert all(call.request.headers["Authorization"] == "Bearer long-token" for call in order_route.calls)
+    assert all(isinstance(response, paypal.PayPalResponse) for response in responses)
+    assert {response.external_id for response in responses} == {f"ORDER_ID_{index}" for index in range(5)}
+    assert {
+        (transaction.external_id, transaction.payment_method_id) for transaction in unit_of_work.transaction_units
+    } == {(response.external_id, payment_method.id) for response, payment_method in zip(responses, payment_methods)}
+
+
+@skip_if_httpx_not_installed
+def test_givenPayPalRejectingTheOrder_whenCreatingItWithTheAsyncAdapter_thenAFailedResponseIsReturnedWithoutTransaction(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    async def create_order() -> "protocols.AdapterResponse":
+        async with paypal.AsyncPayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+            webhook_id="LONG_ID",
+        ) as adapter:
+            return await adapter.create_order(
+                unit_of_work=unit_of_work,
+                payment_method=payment_method,
+                request_id=uuid.uuid4(),
+                order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+            )
+
+    with respx.mock:
+        respx.post(f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}").mock(
+            return_value=httpx.Response(201, json={"scope": "", "access_token": "long-token", "expires_in": 31668})
+        )
+        respx.post("https://api-m.sandbox.paypal.com/v2/checkout/orders").mock(
+            return_value=httpx.Response(422, json={"name": "UNPROCESSABLE_ENTITY"})
+        )
+
+        response = asyncio.run(create_order())
+
+    assert response == paypal.PayPalResponse(
+        external_id=None,
+        timestamp=None,
+        raw_data='{"name":"UNPROCESSABLE_ENTITY"}',
+        status=paypal.PayPalStatusEnum.FAILED,
+        intent=paypal.OrderIntentEnum.CAPTURE,
+    )
+    assert unit_of_work.transaction_units == set()
+
+
+@skip_if_httpx_not_installed
+def test_givenPayPalDownOnTheFirstOrder_whenCreatingItWithTheAsyncAdapter_thenAFailedResponseIsReturned(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    async def create_order() -> "protocols.AdapterResponse":
+        async with paypal.AsyncPayPalAdapter(
+            base_url="https://api-m.sandbox.paypal.com/",
+            client_id="TEST_CLIENT_ID",
+            client_secret="TEST_CLIENT_SECRET",
+            callback_url="https://www.example.com",
+            resilience=domain.Resilience(retry_policy=domain.RetryPolicy(attempts=2, base_delay=0)),
+        ) as adapter:
+            return await adapter.create_order(
+                unit_of_work=unit_of_work,
+                payment_method=payment_method,
+                request_id=uuid.uuid4(),
+                order=paypal.Order(intent=paypal.OrderIntentEnum.CAPTURE, purchase_units=[]),
+            )
+
+    with respx.mock:
+        token_route = respx.post(f"https://api-m.sandbox.paypal.com/{paypal.adapter.GET_ACCESS_TOKEN}").mock(
+            return_value=httpx.Response(503, json={"name": "SERVICE_UNAVAILABLE"})
+        )
+        order_route = respx.post("https://api-m.sandbox.paypal.com/v2/checkout/orders")
+
+        response = asyncio.run(create_order())
+
+    assert response.status == paypal.PayPalStatusEnum.FAILED
+    assert token_route.call_count == 2
+    assert order_route.call_count == 0
+    assert unit_of_work.transaction_units == set()
@@ -0,0 +1,444 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Optional, Sequence
+from unittest import mock
+
+import pytest
+from faker import Faker
+
+from acquiring import domain, enums, protocols
+from acquiring.contrib import paypal
+from tests import protocols as test_protocols
+
+fake = Faker()
+
+
+def webhook(event_type: str, payment_method_id: Optional[uuid.UUID], event_id: Optional[str] = None) -> str:
+    purchase_unit: dict = {"reference_id": fake.uuid4(), "amount": {"currency_code": "USD", "value": "10.00"}}
+    if payment_method_id is not None:
+        purchase_unit["custom_id"] = str(payment_method_id)
+    return json.dumps(
+        {
+            "id": event_id or f"WH-{fake.md5()}",
+            "event_version": "1.0",
+            "create_time": datetime.now(timezone.utc).isoformat(),
+            "resource_type": "checkout-order",
+            "resource_version": "2.0",
+            "event_type": event_type,
+            "summary": fake.sentence(),
+            "resource": {"id": fake.md5(), "purchase_units": [purchase_unit]},
+        }
+    )
+
+
+def test_givenABurstOfWebhooks_whenFlushingPayPalWebhookIngestion_thenEventsAreStoredInASingleCommit(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    approved, declined = [
+        domain.PaymentMethod(
+            id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+            created_at=datetime.now(),
+            payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+        )
+        for _ in range(2)
+    ]
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([approved, declined]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    saga = mock.Mock()
+    ingestion = paypal.PayPalWebhookIngestion(unit_of_work=unit_of_work, saga=saga)
+
+    approved_webhook = webhook("CHECKOUT.ORDER.APPROVED", approved.id)
+    assert ingestion.receive(approved_webhook) is True
+    assert ingestion.receive(approved_webhook) is False  # PayPal delivering it again
+    assert ingestion.receive(webhook("CHECKOUT.ORDER.DECLINED", declined.id)) is True
+    assert ingestion.receive(webhook("CHECKOUT.ORDER.APPROVED", uuid.uuid4())) is True  # unknown payment method
+    assert ingestion.receive(webhook("CHECKOUT.ORDER.APPROVED", None)) is True  # not created by an adapter
+
+    assert unit_of_work.commit_count == 0
+
+    ingestion.flush()
+
+    assert unit_of_work.commit_count == 1
+    assert {transaction.payment_method_id for transaction in unit_of_work.transaction_units} == {
+        approved.id,
+        declined.id,
+    }
+    assert sorted(
+        (block_event.payment_method_id == approved.id, block_event.status)
+        for block_event in unit_of_work.block_event_units
+    ) == [
+        (False, enums.OperationStatusEnum.FAILED),
+        (False, enums.OperationStatusEnum.STARTED),
+        (True, enums.OperationStatusEnum.COMPLETED),
+        (True, enums.OperationStatusEnum.STARTED),
+    ]
+    assert all(block_event.block_name == "PayPalAfterCreatingOrder" for block_event in unit_of_work.block_event_units)
+    saga.after_pay.assert_called_once_with(approved)
+
+
+def test_givenBatchSizeWebhooks_whenReceivingThem_thenPayPalWebhookIngestionStoresThemWithoutFlushing(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    ingestion = paypal.PayPalWebhookIngestion(
+        unit_of_work=unit_of_work, batch_size=3, processed=paypal.webhooks.ProcessedEvents(max_size=2)
+    )
+
+    webhooks = [webhook("PAYMENT.CAPTURE.PENDING", payment_method.id) for _ in range(3)]
+    for raw_data in webhooks:
+        ingestion.receive(raw_data)
+
+    assert unit_of_work.commit_count == 1
+    assert len(unit_of_work.transaction_units) == 3
+
+    assert ingestion.receive(webhooks[0]) is True  # forgotten, as only the last 2 event ids are remembered
+    assert ingestion.receive(webhooks[2]) is False
+
+
+def test_givenAStoredWebhook_whenCheckingIfItIsDuplicate_thenItIsFoundInTheDatabase(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    stored = paypal.webhooks.webhook_data(webhook("CHECKOUT.ORDER.APPROVED", payment_method_id))
+    new = paypal.webhooks.webhook_data(webhook("CHECKOUT.ORDER.APPROVED", payment_method_id))
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(
+            {
+                domain.Transaction(
+                    external_id=stored.id,
+                    timestamp=stored.create_time,
+                    raw_data=stored.raw_data,
+                    provider_name="paypal",
+                    payment_method_id=payment_method_id,
+                )
+            }
+        ),
+    )
+
+    assert paypal.webhooks.is_duplicate(unit_of_work, new) is False
+    assert paypal.webhooks.is_duplicate(unit_of_work, stored) is True
+    assert stored.id in paypal.webhooks.processed_events
+    assert new.id not in paypal.webhooks.processed_events
+
+    # Forgotten by the LRU, or received by another process
+    ingestion = paypal.PayPalWebhookIngestion(unit_of_work=unit_of_work, processed=paypal.webhooks.ProcessedEvents())
+    assert ingestion.receive(stored.raw_data) is True
+    ingestion.flush()
+    assert unit_of_work.block_event_units == set()
+
+
+def test_givenADatabaseFailure_whenFlushingPayPalWebhookIngestion_thenTheBatchIsKeptForTheNextFlush(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    database_is_down = True
+
+    class FailingTransactionRepository(fake_transaction_repository_class(set())):  # type: ignore[misc]
+        def add_many(self, transactions: Sequence[protocols.Transaction]) -> list[protocols.Transaction]:
+            if database_is_down:
+                raise ConnectionError("could not connect to server")
+            return super().add_many(transactions)
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=FailingTransactionRepository,
+    )
+    ingestion = paypal.PayPalWebhookIngestion(unit_of_work=unit_of_work, processed=paypal.webhooks.ProcessedEvents())
+
+    raw_data = webhook("CHECKOUT.ORDER.APPROVED", payment_method.id)
+    assert ingestion.receive(raw_data) is True
+    with pytest.raises(ConnectionError):
+        ingestion.flush()
+
+    assert paypal.webhooks.webhook_data(raw_data).id not in ingestion.processed
+    assert ingestion.receive(raw_data) is False  # still buffered
+
+    database_is_down = False
+    ingestion.flush()
+
+    assert [transaction.raw_data for transaction in unit_of_work.transaction_units] == [raw_data]
+    assert paypal.webhooks.webhook_data(raw_data).id in ingestion.processed
+
+
+def test_givenAnEventStoredByAnotherProcessMeanwhile_whenFlushingPayPalWebhookIngestion_thenTheRestGetsStored(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    raced, other = [
+        paypal.webhooks.webhook_data(webhook("CHECKOUT.ORDER.APPROVED", payment_method.id)) for _ in range(2)
+    ]
+    stored_by_another_process: set[protocols.Transaction] = set()
+
+    class RacingTransactionRepository(fake_transaction_repository_class(set())):  # type: ignore[misc]
+        def __init__(self) -> None:
+            super().__init__()
+            self.units |= stored_by_another_process
+
+        def add_many(self, transactions: Sequence[protocols.Transaction]) -> list[protocols.Transaction]:
+            # The other process stores raced right after it got looked up, but before it gets inserted here
+            if not stored_by_another_process:
+                stored_by_another_process.add(
+                    domain.Transaction(
+                        external_id=raced.id,
+                        timestamp=raced.create_time,
+                        raw_data=raced.raw_data,
+                        provider_name="paypal",
+                        payment_method_id=payment_method.id,
+                    )
+                )
+            if raced.id in {transaction.external_id for transaction in transactions}:
+                raise RuntimeError("UNIQUE constraint failed: acquiring_transaction.provider_name, external_id")
+            return super().add_many(transactions)
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=RacingTransactionRepository,
+    )
+    ingestion = paypal.PayPalWebhookIngestion(unit_of_work=unit_of_work, processed=paypal.webhooks.ProcessedEvents())
+
+    assert ingestion.receive(raced.raw_data) is True
+    assert ingestion.receive(other.raw_data) is True
+    ingestion.flush()
+
+    assert {transaction.external_id for transaction in unit_of_work.transaction_units} == {raced.id, other.id}
+    assert len(unit_of_work.block_event_units) == 2  # STARTED and COMPLETED, only for other
+    assert raced.id in ingestion.processed and other.id in ingestion.processed
+
+
+def test_givenAnEventThatCannotBeStored_whenFlushingPayPalWebhookIngestion_thenItIsSetAsideAndTheRestGetsStored(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+    poisoned, other, later = [
+        paypal.webhooks.webhook_data(webhook("CHECKOUT.ORDER.APPROVED", payment_method.id)) for _ in range(3)
+    ]
+
+    class PoisonedTransactionRepository(fake_transaction_repository_class(set())):  # type: ignore[misc]
+        def add_many(self, transactions: Sequence[protocols.Transaction]) -> list[protocols.Transaction]:
+            if poisoned.id in {transaction.external_id for transaction in transactions}:
+                raise ValueError("value too long for type character varying")
+            return super().add_many(transactions)
+
+    staged_block_events: list[protocols.BlockEvent] = []
+
+    class StagingBlockEventRepository(fake_block_event_repository_class(set())):  # type: ignore[misc]
+        def add_many(
+            self, payment_method: protocols.PaymentMethod, block_events: Sequence[protocols.BlockEvent]
+        ) -> list[protocols.BlockEvent]:
+            staged_block_events.extend(block_events)
+            return super().add_many(payment_method, block_events)
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=StagingBlockEventRepository,
+        transaction_repository_class=PoisonedTransactionRepository,
+    )
+    ingestion = paypal.PayPalWebhookIngestion(unit_of_work=unit_of_work, processed=paypal.webhooks.ProcessedEvents())
+
+    assert ingestion.receive(poisoned.raw_data) is True
+    assert ingestion.receive(other.raw_data) is True
+    ingestion.flush()
+
+    assert ingestion.dead_letters == [poisoned]
+    assert poisoned.id not in ingestion.processed and other.id in ingestion.processed
+
+    assert ingestion.receive(later.raw_data) is True
+    ingestion.flush()
+
+    assert {transaction.external_id for transaction in unit_of_work.transaction_units} == {other.id, later.id}
+    assert len(staged_block_events) == 4
+    assert all(block_event.created_at.tzinfo is not None for block_event in staged_block_events)
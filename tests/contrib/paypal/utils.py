@@ -0,0 +1,7 @@
+"""Decorators to conditionally run tests depending on which optional dependencies load"""
+
+import pytest
+
+from acquiring import utils
+
+skip_if_httpx_not_installed = pytest.mark.skipif(not utils.is_httpx_installed(), reason="httpx is not installed")
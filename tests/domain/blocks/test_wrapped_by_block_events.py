@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from dataclasses import dataclass
 from typing import Callable, Optional, Sequence
@@ -21,6 +22,21 @@ class FooBlock:
         return domain.BlockResponse(status=enums.OperationStatusEnum.COMPLETED)
 
 
+@dataclass
+class AsyncFooBlock:
+
+    @domain.wrapped_by_block_events
+    async def run(
+        self,
+        unit_of_work: protocols.AsyncUnitOfWork,
+        payment_method: protocols.PaymentMethod,
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> protocols.BlockResponse:
+        """This is the expected doc"""
+        return domain.BlockResponse(status=enums.OperationStatusEnum.COMPLETED)
+
+
 def test_givenValidFunction_whenDecoratedWithwrapped_by_block_events_thenStartedAndCompletedBlockEventsGetsCreated(
     fake_payment_attempt_repository_class: Callable[
         [Optional[list[protocols.PaymentAttempt]]],
@@ -80,3 +96,64 @@ def test_givenValidFunction_whenDecoratedWithwrapped_by_block_events_thenStarted
     # Name and Doc are Preserved
     assert FooBlock.run.__name__ == "run"
     assert FooBlock.run.__doc__ == "This is the expected doc"
+
+
+def test_givenValidAsyncFunction_whenDecoratedWithwrapped_by_block_events_thenStartedAndCompletedBlockEventsGetsCreated(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+    )
+
+    asyncio.run(AsyncFooBlock().run(unit_of_work=unit_of_work, payment_method=payment_method))
+
+    block_events = unit_of_work.block_event_units
+    assert len(block_events) == 2
+
+    assert sorted([be.status for be in block_events]) == [
+        enums.OperationStatusEnum.COMPLETED,
+        enums.OperationStatusEnum.STARTED,
+    ]
+    assert all([be.payment_method_id == payment_method.id for be in block_events])
+    assert all([be.block_name == AsyncFooBlock.__name__ for be in block_events])
+
+    # Name and Doc are Preserved
+    assert AsyncFooBlock.run.__name__ == "run"
+    assert AsyncFooBlock.run.__doc__ == "This is the expected doc"
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from dataclasses import dataclass
 from datetime import datetime
@@ -51,6 +52,7 @@ def test_givenValidFunction_whenDecoratedWithwrapped_by_transaction_thenTransact
         timestamp: Optional[datetime]
         raw_data: str
         status: str
+        data: dict
 
     @dataclass
     class FakeAdapter:
@@ -72,6 +74,7 @@ def test_givenValidFunction_whenDecoratedWithwrapped_by_transaction_thenTransact
                 timestamp=timestamp,
                 raw_data=raw_data,
                 status=enums.OperationStatusEnum.COMPLETED,
+                data={},
             )
 
     payment_attempt = factories.PaymentAttemptFactory()
@@ -111,3 +114,102 @@ def test_givenValidFunction_whenDecoratedWithwrapped_by_transaction_thenTransact
 
     assert FakeAdapter.do_something.__name__ == "do_something"
     assert FakeAdapter.do_something.__doc__ == "This is the expected doc"
+
+
+def test_givenValidAsyncFunction_whenDecoratedWithwrapped_by_transaction_thenTransactionGetsCorrectlyCreated(
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    external_id = "external"
+    timestamp = datetime.now()
+    raw_data = fake.json()
+    provider_name = fake.company()
+
+    @dataclass(match_args=False)
+    class FakeAdapterResponse:
+        external_id: Optional[str]
+        timestamp: Optional[datetime]
+        raw_data: str
+        status: str
+        data: dict
+
+    @dataclass
+    class FakeAsyncAdapter:
+        base_url: str
+        provider_name: str
+
+        @domain.wrapped_by_transaction
+        async def do_something(
+            self: protocols.Adapter,
+            unit_of_work: protocols.AsyncUnitOfWork,
+            payment_method: protocols.PaymentMethod,
+            *args: Sequence,
+            **kwargs: dict,
+        ) -> protocols.AdapterResponse:
+            """This is the expected doc"""
+            await asyncio.sleep(0)
+            return FakeAdapterResponse(
+                external_id=external_id,
+                timestamp=timestamp,
+                raw_data=raw_data,
+                status=enums.OperationStatusEnum.COMPLETED,
+                data={},
+            )
+
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    asyncio.run(
+        FakeAsyncAdapter(
+            base_url=fake.url(),
+            provider_name=provider_name,
+        ).do_something(unit_of_work, payment_method)
+    )
+
+    assert unit_of_work.transaction_units == {
+        domain.Transaction(
+            external_id=external_id,
+            timestamp=timestamp,
+            raw_data=raw_data,
+            provider_name=provider_name,
+            payment_method_id=payment_method.id,
+        )
+    }
+    assert FakeAsyncAdapter.do_something.__name__ == "do_something"
+    assert FakeAsyncAdapter.do_something.__doc__ == "This is the expected doc"
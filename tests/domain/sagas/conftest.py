@@ -1,4 +1,5 @@
-from typing import Sequence
+import asyncio
+from typing import Optional, Sequence
 
 import pytest
 
@@ -61,3 +62,33 @@ def fake_process_action_block() -> type[protocols.Block]:
             return domain.BlockResponse(status=self.response_status)
 
     return FakeProcessActionsBlock
+
+
+@pytest.fixture(scope="module")
+def fake_async_block() -> type[protocols.AsyncBlock]:
+
+    class FakeAsyncBlock:
+
+        def __init__(
+            self,
+            fake_response_status: enums.OperationStatusEnum = enums.OperationStatusEnum.COMPLETED,
+            fake_response_actions: Optional[list[dict]] = None,
+        ):
+            self.response_status = fake_response_status
+            self.response_actions = fake_response_actions or []
+
+        @domain.wrapped_by_block_events
+        async def run(
+            self,
+            unit_of_work: protocols.AsyncUnitOfWork,
+            payment_method: protocols.PaymentMethod,
+            *args: Sequence,
+            **kwargs: dict,
+        ) -> protocols.BlockResponse:
+            await asyncio.sleep(0)  # Hands control back to the event loop, as a provider call would
+            return domain.BlockResponse(
+                status=self.response_status,
+                actions=self.response_actions,
+            )
+
+    return FakeAsyncBlock
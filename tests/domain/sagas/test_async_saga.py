@@ -0,0 +1,376 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+import pytest
+
+from acquiring import domain, enums, protocols
+from tests import protocols as test_protocols
+from tests.domain import factories
+
+
+@pytest.mark.parametrize(
+    "single_transaction, staged_block_events, commit_count", [(True, False, 1), (False, False, 8), (False, True, 4)]
+)
+def test_givenAValidPaymentMethod_whenInitializingWithAsyncBlocks_thenPaymentMethodGetsPaidAndEventsGetCreated(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+    single_transaction: bool,
+    staged_block_events: bool,
+    commit_count: int,
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=fake_async_block(),
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[],
+            confirm_block=None,
+            after_confirm_blocks=[],
+            single_transaction=single_transaction,
+            staged_block_events=staged_block_events,
+        ).initialize(payment_method)
+    )
+
+    assert result.type == enums.OperationTypeEnum.PAY
+    assert result.status == enums.OperationStatusEnum.COMPLETED
+
+    assert [(event.type, event.status) for event in payment_method.operation_events] == [
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.COMPLETED),
+    ]
+    assert len(unit_of_work.operation_event_units) == 4
+
+    # Started and completed BlockEvents, for the initialize block and the pay block
+    assert len(unit_of_work.block_event_units) == 4
+
+    assert unit_of_work.commit_count == commit_count
+
+
+def test_givenAPaymentMethodThatCannotInitialize_whenInitializingWithAsyncSaga_thenFailedOperationResponseIsReturned(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    operation_event = domain.OperationEvent(
+        created_at=datetime.now(),
+        type=enums.OperationTypeEnum.INITIALIZE,
+        status=enums.OperationStatusEnum.STARTED,
+        payment_method_id=payment_method_id,
+    )
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+        operation_events=[operation_event],
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class({operation_event}),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=fake_async_block(),
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[],
+            confirm_block=None,
+            after_confirm_blocks=[],
+        ).initialize(payment_method)
+    )
+
+    assert result.type == enums.OperationTypeEnum.INITIALIZE
+    assert result.status == enums.OperationStatusEnum.FAILED
+    assert result.error_message == "PaymentMethod cannot go through this operation"
+
+    assert unit_of_work.operation_event_units == {operation_event}
+    assert len(unit_of_work.block_event_units) == 0
+
+
+def test_givenANonExistingPaymentMethod_whenInitializingWithAsyncSaga_thenFailedOperationResponseIsReturned(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=fake_async_block(),
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[],
+            confirm_block=None,
+            after_confirm_blocks=[],
+        ).initialize(payment_method)
+    )
+
+    assert result.type == enums.OperationTypeEnum.INITIALIZE
+    assert result.status == enums.OperationStatusEnum.FAILED
+    assert result.error_message == "PaymentMethod not found"
+    assert len(unit_of_work.operation_event_units) == 0
+
+
+def test_givenAnAsyncSagaWithoutAfterPayBlocks_whenAfterPaying_thenTypeErrorGetsRaised(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    with pytest.raises(TypeError):
+        asyncio.run(
+            domain.AsyncPaymentMethodSaga(
+                unit_of_work=unit_of_work,
+                initialize_block=fake_async_block(),
+                process_action_block=None,
+                pay_block=fake_async_block(),
+                after_pay_blocks=[],
+                confirm_block=None,
+                after_confirm_blocks=[],
+            ).after_pay(payment_method)
+        )
+
+
+@pytest.mark.parametrize(
+    "block_statuses, result_status",
+    [
+        ([enums.OperationStatusEnum.COMPLETED] * 2, enums.OperationStatusEnum.COMPLETED),
+        ([enums.OperationStatusEnum.COMPLETED, enums.OperationStatusEnum.PENDING], enums.OperationStatusEnum.PENDING),
+        ([enums.OperationStatusEnum.COMPLETED, enums.OperationStatusEnum.FAILED], enums.OperationStatusEnum.FAILED),
+    ],
+)
+def test_givenAConfirmedPaymentMethod_whenAfterConfirmingWithAsyncBlocks_thenStatusCombinesEveryBlockResponse(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+    block_statuses: list[enums.OperationStatusEnum],
+    result_status: enums.OperationStatusEnum,
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    operation_events = [
+        domain.OperationEvent(
+            created_at=datetime.now(),
+            type=type,
+            status=status,
+            payment_method_id=payment_method_id,
+        )
+        for type, status in [
+            (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED),
+            (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+            (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+            (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.COMPLETED),
+            (enums.OperationTypeEnum.AFTER_PAY, enums.OperationStatusEnum.STARTED),
+            (enums.OperationTypeEnum.AFTER_PAY, enums.OperationStatusEnum.COMPLETED),
+            (enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.STARTED),
+            (enums.OperationTypeEnum.CONFIRM, enums.OperationStatusEnum.COMPLETED),
+        ]
+    ]
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+        operation_events=operation_events,
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=None,
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[fake_async_block()],
+            confirm_block=fake_async_block(),
+            after_confirm_blocks=[
+                fake_async_block(fake_response_status=status)  # type:ignore[call-arg]
+                for status in block_statuses
+            ],
+        ).after_confirm(payment_method)
+    )
+
+    assert result.type == enums.OperationTypeEnum.AFTER_CONFIRM
+    assert result.status == result_status
+    assert [(event.type, event.status) for event in payment_method.operation_events[-2:]] == [
+        (enums.OperationTypeEnum.AFTER_CONFIRM, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.AFTER_CONFIRM, result_status),
+    ]
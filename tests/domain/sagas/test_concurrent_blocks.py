@@ -0,0 +1,299 @@
+import asyncio
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+import pytest
+
+from acquiring import domain, enums, protocols
+from tests import protocols as test_protocols
+from tests.domain import factories
+
+
+@dataclass
+class SleepingBlock:
+    seconds: float
+    status: enums.OperationStatusEnum = enums.OperationStatusEnum.COMPLETED
+
+    @domain.wrapped_by_block_events
+    def run(
+        self,
+        unit_of_work: protocols.UnitOfWork,
+        payment_method: protocols.PaymentMethod,
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> protocols.BlockResponse:
+        time.sleep(self.seconds)
+        return domain.BlockResponse(status=self.status)
+
+
+@dataclass
+class AsyncSleepingBlock:
+    seconds: float
+    status: enums.OperationStatusEnum = enums.OperationStatusEnum.COMPLETED
+
+    @domain.wrapped_by_block_events
+    async def run(
+        self,
+        unit_of_work: protocols.AsyncUnitOfWork,
+        payment_method: protocols.PaymentMethod,
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> protocols.BlockResponse:
+        await asyncio.sleep(self.seconds)
+        return domain.BlockResponse(status=self.status)
+
+
+def paid_payment_method() -> protocols.PaymentMethod:
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    return factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+        operation_events=[
+            domain.OperationEvent(
+                type=type,
+                status=status,
+                payment_method_id=payment_method_id,
+                created_at=datetime.now(),
+            )
+            for type, status in [
+                (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED),
+                (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+                (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+                (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.COMPLETED),
+            ]
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "block_statuses, result_status",
+    [
+        ([enums.OperationStatusEnum.COMPLETED] * 3, enums.OperationStatusEnum.COMPLETED),
+        (
+            [enums.OperationStatusEnum.COMPLETED] * 2 + [enums.OperationStatusEnum.PENDING],
+            enums.OperationStatusEnum.FAILED,
+        ),
+    ],
+)
+def test_givenConcurrentBlocks_whenAfterPaying_thenBlocksRunAtTheSameTimeAndStatusesGetAggregated(
+    fake_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+    block_statuses: list[enums.OperationStatusEnum],
+    result_status: enums.OperationStatusEnum,
+) -> None:
+
+    payment_method = paid_payment_method()
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(payment_method.operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    start = time.monotonic()
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=None,
+        process_action_block=None,
+        pay_block=fake_block(),
+        after_pay_blocks=[SleepingBlock(seconds=0.2, status=status) for status in block_statuses],
+        confirm_block=None,
+        after_confirm_blocks=[],
+        concurrent_blocks=True,
+    ).after_pay(payment_method)
+    elapsed = time.monotonic() - start
+
+    assert result.type == enums.OperationTypeEnum.AFTER_PAY
+    assert result.status == result_status
+
+    # Latency is that of the slowest block, not the sum of all of them
+    assert elapsed < 0.2 * len(block_statuses)
+
+    # Every block writes its events through its own copy of the unit of work
+    assert len(unit_of_work.block_event_units) == 2 * len(block_statuses)
+
+    # And closes the connections of its thread once done
+    assert len(unit_of_work.closing_threads) == len(block_statuses)
+    assert threading.get_ident() not in unit_of_work.closing_threads
+
+
+def test_givenASlowConcurrentBlock_whenAfterConfirming_thenTheBlockCountsAsFailedOnceItTimesOut(
+    fake_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+
+    payment_method = paid_payment_method()
+    for type in [enums.OperationTypeEnum.AFTER_PAY, enums.OperationTypeEnum.CONFIRM]:
+        for status in [enums.OperationStatusEnum.STARTED, enums.OperationStatusEnum.COMPLETED]:
+            payment_method.operation_events.append(
+                domain.OperationEvent(
+                    type=type,
+                    status=status,
+                    payment_method_id=payment_method.id,
+                    created_at=datetime.now(),
+                )
+            )
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(payment_method.operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=None,
+        process_action_block=None,
+        pay_block=fake_block(),
+        after_pay_blocks=[],
+        confirm_block=fake_block(),
+        after_confirm_blocks=[SleepingBlock(seconds=0), SleepingBlock(seconds=1)],
+        concurrent_blocks=True,
+        block_timeout=0.1,
+    ).after_confirm(payment_method)
+
+    assert result.type == enums.OperationTypeEnum.AFTER_CONFIRM
+    assert result.status == enums.OperationStatusEnum.FAILED
+    assert result.error_message == "SleepingBlock timed out after 0.1 seconds"
+
+
+def test_givenConcurrentBlocksInSingleTransactionMode_whenCreatingPaymentMethodSaga_thenValueErrorGetsRaised(
+    fake_block: type[protocols.Block],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+
+    with pytest.raises(ValueError):
+        domain.PaymentMethodSaga(
+            unit_of_work=fake_unit_of_work,  # type:ignore[arg-type]
+            initialize_block=None,
+            process_action_block=None,
+            pay_block=fake_block(),
+            after_pay_blocks=[],
+            confirm_block=None,
+            after_confirm_blocks=[],
+            single_transaction=True,
+            concurrent_blocks=True,
+        )
+
+
+@pytest.mark.parametrize(
+    "block_timeout, result_status",
+    [(None, enums.OperationStatusEnum.COMPLETED), (0.1, enums.OperationStatusEnum.FAILED)],
+)
+def test_givenConcurrentAsyncBlocks_whenAfterPaying_thenBlocksGetGatheredAndSlowOnesTimeOut(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+    block_timeout: Optional[float],
+    result_status: enums.OperationStatusEnum,
+) -> None:
+
+    payment_method = paid_payment_method()
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(payment_method.operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    start = time.monotonic()
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=None,
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[AsyncSleepingBlock(seconds=0.2) for _ in range(3)],
+            confirm_block=None,
+            after_confirm_blocks=[],
+            concurrent_blocks=True,
+            block_timeout=block_timeout,
+        ).after_pay(payment_method)
+    )
+    elapsed = time.monotonic() - start
+
+    assert result.type == enums.OperationTypeEnum.AFTER_PAY
+    assert result.status == result_status
+    assert elapsed < 0.6
@@ -0,0 +1,152 @@
+import uuid
+from typing import Callable, Optional
+
+import pytest
+
+from acquiring import domain, enums, protocols
+from tests import protocols as test_protocols
+from tests.domain import factories
+
+
+@pytest.mark.parametrize("single_transaction, commit_count", [(True, 1), (False, 4)])
+def test_givenAValidPaymentMethod_whenInitializingCompletes_thenUnitOfWorkCommitsOncePerOperationInSingleTransaction(
+    fake_block: type[protocols.Block],
+    fake_process_action_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+    single_transaction: bool,
+    commit_count: int,
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+    )
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set()),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=fake_block(),
+        process_action_block=fake_process_action_block(),
+        pay_block=fake_block(),
+        after_pay_blocks=[],
+        confirm_block=None,
+        after_confirm_blocks=[],
+        single_transaction=single_transaction,
+    ).initialize(payment_method)
+
+    assert result.type == enums.OperationTypeEnum.PAY
+    assert result.status == enums.OperationStatusEnum.COMPLETED
+
+    assert [(event.type, event.status) for event in payment_method.operation_events] == [
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.COMPLETED),
+    ]
+    assert len(unit_of_work.operation_event_units) == 4
+
+    assert unit_of_work.commit_count == commit_count
+
+
+def test_givenAPaymentMethodThatCannotInitialize_whenInitializingInSingleTransactionMode_thenNothingGetsWritten(
+    fake_block: type[protocols.Block],
+    fake_process_action_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    operation_event = domain.OperationEvent(
+        created_at=payment_attempt.created_at,
+        type=enums.OperationTypeEnum.INITIALIZE,
+        status=enums.OperationStatusEnum.STARTED,
+        payment_method_id=payment_method_id,
+    )
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+        operation_events=[operation_event],
+    )
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class({operation_event}),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=fake_block(),
+        process_action_block=fake_process_action_block(),
+        pay_block=fake_block(),
+        after_pay_blocks=[],
+        confirm_block=None,
+        after_confirm_blocks=[],
+        single_transaction=True,
+    ).initialize(payment_method)
+
+    assert result.type == enums.OperationTypeEnum.INITIALIZE
+    assert result.status == enums.OperationStatusEnum.FAILED
+
+    assert len(payment_method.operation_events) == 1
+    assert unit_of_work.operation_event_units == {operation_event}
+    assert unit_of_work.commit_count == 1
@@ -0,0 +1,115 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+import pytest
+
+from acquiring import domain, enums, protocols
+from tests import protocols as test_protocols
+from tests.domain import factories
+
+
+@dataclass
+class AuditedBlock:
+    status: enums.OperationStatusEnum = enums.OperationStatusEnum.COMPLETED
+
+    @domain.wrapped_by_block_events
+    def run(
+        self,
+        unit_of_work: protocols.UnitOfWork,
+        payment_method: protocols.PaymentMethod,
+        *args: Sequence,
+        **kwargs: dict,
+    ) -> protocols.BlockResponse:
+        return domain.BlockResponse(status=self.status)
+
+
+@pytest.mark.parametrize(
+    "staged_block_events, concurrent_blocks, commit_count",
+    [(False, False, 6), (True, False, 2), (True, True, 2)],
+)
+def test_givenStagedBlockEvents_whenAfterPaying_thenBlockEventsGetCommittedAlongWithTheOperationEvent(
+    fake_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+    staged_block_events: bool,
+    concurrent_blocks: bool,
+    commit_count: int,
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+        operation_events=[
+            domain.OperationEvent(
+                type=type,
+                status=status,
+                payment_method_id=payment_method_id,
+                created_at=datetime.now(),
+            )
+            for type, status in [
+                (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED),
+                (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+                (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+                (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.COMPLETED),
+            ]
+        ],
+    )
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class(set(payment_method.operation_events)),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=None,
+        process_action_block=None,
+        pay_block=fake_block(),
+        after_pay_blocks=[AuditedBlock(), AuditedBlock()],
+        confirm_block=None,
+        after_confirm_blocks=[],
+        concurrent_blocks=concurrent_blocks,
+        staged_block_events=staged_block_events,
+    ).after_pay(payment_method)
+
+    assert result.type == enums.OperationTypeEnum.AFTER_PAY
+    assert result.status == enums.OperationStatusEnum.COMPLETED
+
+    assert sorted(block_event.status for block_event in unit_of_work.block_event_units) == [
+        enums.OperationStatusEnum.COMPLETED,
+        enums.OperationStatusEnum.COMPLETED,
+        enums.OperationStatusEnum.STARTED,
+        enums.OperationStatusEnum.STARTED,
+    ]
+    assert unit_of_work.commit_count == commit_count
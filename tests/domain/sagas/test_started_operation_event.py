@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+from acquiring import domain, enums, protocols
+from tests import protocols as test_protocols
+from tests.domain import factories
+
+
+def test_givenAnotherProcessStartedTheOperation_whenInitializing_thenItFailsBeforeRunningAnyBlock(
+    fake_block: type[protocols.Block],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_unit_of_work: type[test_protocols.FakeUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+    )
+
+    # Stored by the other process after this one refreshed the PaymentMethod
+    started_elsewhere = domain.OperationEvent(
+        created_at=datetime.now(),
+        type=enums.OperationTypeEnum.INITIALIZE,
+        status=enums.OperationStatusEnum.STARTED,
+        payment_method_id=payment_method_id,
+    )
+
+    unit_of_work = fake_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class({started_elsewhere}),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    result = domain.PaymentMethodSaga(
+        unit_of_work=unit_of_work,
+        initialize_block=fake_block(),
+        process_action_block=None,
+        pay_block=fake_block(),
+        after_pay_blocks=[],
+        confirm_block=None,
+        after_confirm_blocks=[],
+    ).initialize(payment_method)
+
+    assert result.type == enums.OperationTypeEnum.INITIALIZE
+    assert result.status == enums.OperationStatusEnum.FAILED
+    assert result.error_message == "PaymentMethod is already going through this operation"
+
+    assert unit_of_work.operation_event_units == {started_elsewhere}
+
+
+def test_givenAnotherProcessStartedTheOperation_whenInitializingWithAsyncBlocks_thenItFailsBeforeRunningAnyBlock(
+    fake_async_block: type[protocols.AsyncBlock],
+    fake_payment_attempt_repository_class: Callable[
+        [Optional[list[protocols.PaymentAttempt]]],
+        type[protocols.Repository],
+    ],
+    fake_milestone_repository_class: Callable[
+        [Optional[list[protocols.Milestone]]],
+        type[protocols.Repository],
+    ],
+    fake_payment_method_repository_class: Callable[
+        [Optional[list[protocols.PaymentMethod]]],
+        type[protocols.Repository],
+    ],
+    fake_operation_event_repository_class: Callable[
+        [Optional[set[protocols.OperationEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_block_event_repository_class: Callable[
+        [Optional[set[protocols.BlockEvent]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_transaction_repository_class: Callable[
+        [Optional[set[protocols.Transaction]]],
+        type[test_protocols.FakeRepository],
+    ],
+    fake_async_unit_of_work: type[test_protocols.FakeAsyncUnitOfWork],
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = factories.PaymentMethodFactory(
+        payment_attempt_id=payment_attempt.id,
+        id=payment_method_id,
+    )
+
+    # Stored by the other process after this one refreshed the PaymentMethod
+    started_elsewhere = domain.OperationEvent(
+        created_at=datetime.now(),
+        type=enums.OperationTypeEnum.INITIALIZE,
+        status=enums.OperationStatusEnum.STARTED,
+        payment_method_id=payment_method_id,
+    )
+
+    unit_of_work = fake_async_unit_of_work(
+        payment_attempt_repository_class=fake_payment_attempt_repository_class([]),
+        milestone_repository_class=fake_milestone_repository_class([]),
+        payment_method_repository_class=fake_payment_method_repository_class([payment_method]),
+        operation_event_repository_class=fake_operation_event_repository_class({started_elsewhere}),
+        block_event_repository_class=fake_block_event_repository_class(set()),
+        transaction_repository_class=fake_transaction_repository_class(set()),
+    )
+
+    result = asyncio.run(
+        domain.AsyncPaymentMethodSaga(
+            unit_of_work=unit_of_work,
+            initialize_block=fake_async_block(),
+            process_action_block=None,
+            pay_block=fake_async_block(),
+            after_pay_blocks=[],
+            confirm_block=None,
+            after_confirm_blocks=[],
+        ).initialize(payment_method)
+    )
+
+    assert result.type == enums.OperationTypeEnum.INITIALIZE
+    assert result.status == enums.OperationStatusEnum.FAILED
+    assert result.error_message == "PaymentMethod is already going through this operation"
+
+    assert unit_of_work.operation_event_units == {started_elsewhere}
@@ -1,9 +1,14 @@
+import itertools
 import uuid
 from datetime import datetime
+from typing import Callable
 
 import pytest
+from hypothesis import given
+from hypothesis import strategies as st
 
 from acquiring import domain, enums, protocols
+from acquiring.domain import decision_logic, decision_rules
 from tests.domain import factories
 
 # See fixtures specifics for these tests below
@@ -825,6 +830,154 @@ class TestRefund:
 ### DECISION LOGIC SPECIFIC FIXTURES
 
 
+OPERATION_EVENT_PAIRS = list(itertools.product(enums.OperationTypeEnum, enums.OperationStatusEnum))
+
+HAPPY_PATH_PAIRS = [
+    (type, status)
+    for type in [
+        enums.OperationTypeEnum.INITIALIZE,
+        enums.OperationTypeEnum.PAY,
+        enums.OperationTypeEnum.AFTER_PAY,
+        enums.OperationTypeEnum.CONFIRM,
+        enums.OperationTypeEnum.AFTER_CONFIRM,
+    ]
+    for status in [enums.OperationStatusEnum.STARTED, enums.OperationStatusEnum.COMPLETED]
+]
+
+# Random OperationEvents rarely get past initialize, so half of the examples start from a prefix of the happy path
+operation_event_pairs = st.one_of(
+    st.lists(st.sampled_from(OPERATION_EVENT_PAIRS), max_size=20),
+    st.builds(
+        lambda length, extra_pairs: HAPPY_PATH_PAIRS[:length] + extra_pairs,
+        st.integers(min_value=0, max_value=len(HAPPY_PATH_PAIRS)),
+        st.lists(st.sampled_from(OPERATION_EVENT_PAIRS), max_size=8),
+    ),
+)
+
+
+class TestCompiledDecisionLogic:
+
+    @pytest.mark.parametrize(
+        "compiled_function, rule_function",
+        [
+            (decision_logic.can_initialize, decision_rules.can_initialize),
+            (decision_logic.can_process_action, decision_rules.can_process_action),
+            (decision_logic.can_after_pay, decision_rules.can_after_pay),
+            (decision_logic.can_confirm, decision_rules.can_confirm),
+            (decision_logic.can_after_confirm, decision_rules.can_after_confirm),
+            (decision_logic.can_refund, decision_rules.can_refund),
+        ],
+    )
+    @given(pairs=operation_event_pairs)
+    def test_compiledDecisionLogicMatchesDecisionRules(
+        self,
+        compiled_function: Callable[[protocols.PaymentMethod], bool],
+        rule_function: Callable[[protocols.PaymentMethod], bool],
+        pairs: list[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]],
+    ) -> None:
+        """A compiled decision logic function returns the same outcome as the rule it was compiled from."""
+        payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+        payment_method = domain.PaymentMethod(
+            id=payment_method_id,
+            payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+            created_at=datetime.now(),
+            operation_events=[
+                domain.OperationEvent(
+                    created_at=datetime.now(),
+                    type=type,
+                    status=status,
+                    payment_method_id=payment_method_id,
+                )
+                for type, status in pairs
+            ],
+        )
+
+        assert compiled_function(payment_method) is rule_function(payment_method)
+
+    def test_givenACheckedPaymentMethod_whenAnOperationEventGetsAppended_thenDecisionsIncludeIt(self) -> None:
+        """Decisions come from the counts PaymentMethod keeps, which follow operation_events as it grows."""
+        payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+        payment_method = domain.PaymentMethod(
+            id=payment_method_id,
+            payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+            created_at=datetime.now(),
+        )
+        assert decision_logic.can_initialize(payment_method) is True
+
+        payment_method.operation_events.append(
+            domain.OperationEvent(
+                created_at=datetime.now(),
+                type=enums.OperationTypeEnum.INITIALIZE,
+                status=enums.OperationStatusEnum.STARTED,
+                payment_method_id=payment_method_id,
+            )
+        )
+
+        assert decision_logic.can_initialize(payment_method) is False
+
+    @given(pairs_per_payment_method=st.lists(operation_event_pairs, min_size=1, max_size=5))
+    def test_givenOperationEventRowsOfManyPaymentMethods_whenEvaluatedInBulk_thenEligibilityMatchesDecisionRules(
+        self,
+        pairs_per_payment_method: list[list[tuple[enums.OperationTypeEnum, enums.OperationStatusEnum]]],
+    ) -> None:
+        """Bulk evaluation over raw (payment_method_id, type, status) rows returns the same outcome as each rule."""
+        payment_methods = [
+            domain.PaymentMethod(
+                id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+                payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+                created_at=datetime.now(),
+                operation_events=[],
+            )
+            for _ in pairs_per_payment_method
+        ]
+        for payment_method, pairs in zip(payment_methods, pairs_per_payment_method):
+            payment_method.operation_events = [
+                domain.OperationEvent(
+                    created_at=datetime.now(),
+                    type=type,
+                    status=status,
+                    payment_method_id=payment_method.id,
+                )
+                for type, status in pairs
+            ]
+
+        # Rows come interleaved and with raw values, as they would from storage
+        rows = sorted(
+            (
+                (str(event.payment_method_id), event.type.value, event.status.value)
+                for payment_method in payment_methods
+                for event in payment_method.operation_events
+            ),
+            key=lambda row: (row[1], row[2]),
+        )
+        payment_method_ids, types, statuses = [list(column) for column in zip(*rows)] or [[], [], []]
+
+        ids, eligibility = decision_logic.bulk_eligibility(payment_method_ids, types, statuses)
+
+        assert set(eligibility) == set(decision_logic.DECISION_BITS)
+        payment_methods_by_id = {str(payment_method.id): payment_method for payment_method in payment_methods}
+        for operation_type, rule_function in [
+            (enums.OperationTypeEnum.INITIALIZE, decision_rules.can_initialize),
+            (enums.OperationTypeEnum.PROCESS_ACTION, decision_rules.can_process_action),
+            (enums.OperationTypeEnum.AFTER_PAY, decision_rules.can_after_pay),
+            (enums.OperationTypeEnum.CONFIRM, decision_rules.can_confirm),
+            (enums.OperationTypeEnum.AFTER_CONFIRM, decision_rules.can_after_confirm),
+            (enums.OperationTypeEnum.REFUND, decision_rules.can_refund),
+        ]:
+            assert eligibility[operation_type] == [
+                rule_function(payment_methods_by_id[payment_method_id]) for payment_method_id in ids
+            ]
+
+        assert set(ids) == {
+            str(payment_method.id) for payment_method in payment_methods if payment_method.operation_events
+        }
+
+    def test_givenMismatchedColumns_whenEvaluatedInBulk_thenValueErrorIsRaised(self) -> None:
+        """Columns of different lengths mean rows got lost on the way, so no partial answer is returned."""
+        with pytest.raises(ValueError):
+            decision_logic.bulk_decisions(["id"], ["initialize", "initialize"], ["started"])
+
+
 @pytest.fixture(scope="module")
 def operation_event_initialize_started() -> protocols.OperationEvent:
     return factories.OperationEventFactory(
@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime
+
+from acquiring import domain, enums, protocols
+
+
+def test_givenAPaymentMethod_whenOperationEventsGetAppended_thenCountsIncludeTheNewOperationEvents() -> None:
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = domain.PaymentMethod(
+        id=payment_method_id,
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+        created_at=datetime.now(),
+        operation_events=[
+            domain.OperationEvent(
+                created_at=datetime.now(),
+                type=enums.OperationTypeEnum.REFUND,
+                status=enums.OperationStatusEnum.STARTED,
+                payment_method_id=payment_method_id,
+            )
+        ],
+    )
+    assert (
+        payment_method.count_operation_event(
+            type=enums.OperationTypeEnum.REFUND, status=enums.OperationStatusEnum.STARTED
+        )
+        == 1
+    )
+    assert (
+        payment_method.has_operation_event(
+            type=enums.OperationTypeEnum.REFUND, status=enums.OperationStatusEnum.COMPLETED
+        )
+        is False
+    )
+
+    payment_method.operation_events.append(
+        domain.OperationEvent(
+            created_at=datetime.now(),
+            type=enums.OperationTypeEnum.REFUND,
+            status=enums.OperationStatusEnum.STARTED,
+            payment_method_id=payment_method_id,
+        )
+    )
+    payment_method.operation_events.append(
+        domain.OperationEvent(
+            created_at=datetime.now(),
+            type=enums.OperationTypeEnum.REFUND,
+            status=enums.OperationStatusEnum.COMPLETED,
+            payment_method_id=payment_method_id,
+        )
+    )
+
+    assert (
+        payment_method.count_operation_event(
+            type=enums.OperationTypeEnum.REFUND, status=enums.OperationStatusEnum.STARTED
+        )
+        == 2
+    )
+    assert (
+        payment_method.has_operation_event(
+            type=enums.OperationTypeEnum.REFUND, status=enums.OperationStatusEnum.COMPLETED
+        )
+        is True
+    )
+
+
+def test_givenAPaymentMethod_whenOperationEventsGetReplaced_thenCountsAreRebuilt() -> None:
+    payment_method_id = protocols.ExistingPaymentMethodId(uuid.uuid4())
+    payment_method = domain.PaymentMethod(
+        id=payment_method_id,
+        payment_attempt_id=protocols.ExistingPaymentAttemptId(uuid.uuid4()),
+        created_at=datetime.now(),
+        operation_events=[
+            domain.OperationEvent(
+                created_at=datetime.now(),
+                type=enums.OperationTypeEnum.INITIALIZE,
+                status=enums.OperationStatusEnum.STARTED,
+                payment_method_id=payment_method_id,
+            )
+        ],
+    )
+    assert (
+        payment_method.has_operation_event(
+            type=enums.OperationTypeEnum.INITIALIZE, status=enums.OperationStatusEnum.STARTED
+        )
+        is True
+    )
+
+    payment_method.operation_events = [
+        domain.OperationEvent(
+            created_at=datetime.now(),
+            type=enums.OperationTypeEnum.PAY,
+            status=enums.OperationStatusEnum.STARTED,
+            payment_method_id=payment_method_id,
+        )
+    ]
+
+    assert (
+        payment_method.has_operation_event(
+            type=enums.OperationTypeEnum.INITIALIZE, status=enums.OperationStatusEnum.STARTED
+        )
+        is False
+    )
+    assert (
+        payment_method.has_operation_event(type=enums.OperationTypeEnum.PAY, status=enums.OperationStatusEnum.STARTED)
+        is True
+    )
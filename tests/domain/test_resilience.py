@@ -0,0 +1,165 @@
+import asyncio
+import time
+from typing import Optional
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from acquiring import domain, enums
+
+
+@given(attempt=st.integers(min_value=0, max_value=20))
+def test_givenAnyAttempt_whenComputingTheDelayOfARetry_thenItNeverExceedsTheBackoffCap(attempt: int) -> None:
+    retry_policy = domain.RetryPolicy(base_delay=0.2, max_delay=5)
+
+    assert 0 <= retry_policy.delay(attempt) <= min(5, 0.2 * 2**attempt)
+
+
+def test_givenAProviderFailingTransiently_whenCalledWithResilience_thenTheCallIsRetriedUntilItSucceeds() -> None:
+    timeouts: list[Optional[float]] = []
+
+    def function(timeout: Optional[float]) -> str:
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise domain.Resilience.Unavailable("503 Service Unavailable")
+        return "OK"
+
+    resilience = domain.Resilience(retry_policy=domain.RetryPolicy(attempts=3, base_delay=0), timeouts={"orders": 5})
+
+    assert resilience.call("orders", function) == "OK"
+    assert timeouts == [5, 5, 5]
+    assert resilience.circuit_breaker.state == enums.CircuitStateEnum.CLOSED
+
+
+def test_givenAProviderThatKeepsFailing_whenCalledWithResilience_thenTheLastErrorIsRaisedAfterEveryAttempt() -> None:
+    calls: list[Optional[float]] = []
+
+    def function(timeout: Optional[float]) -> str:
+        calls.append(timeout)
+        raise domain.Resilience.Unavailable("Connection reset by peer")
+
+    resilience = domain.Resilience(retry_policy=domain.RetryPolicy(attempts=4, base_delay=0))
+
+    with pytest.raises(domain.Resilience.Unavailable, match="Connection reset by peer"):
+        resilience.call("orders", function)
+
+    assert calls == [None, None, None, None]
+
+
+def test_givenAnErrorThatIsNotTransient_whenCalledWithResilience_thenItIsRaisedWithoutRetrying() -> None:
+    calls: list[Optional[float]] = []
+
+    def function(timeout: Optional[float]) -> str:
+        calls.append(timeout)
+        raise ValueError
+
+    resilience = domain.Resilience(retry_policy=domain.RetryPolicy(attempts=3, base_delay=0))
+
+    with pytest.raises(ValueError):
+        resilience.call("orders", function)
+
+    assert len(calls) == 1
+
+
+def test_givenManyConsecutiveFailures_whenCalledWithResilience_thenTheCircuitOpensAndFailsFastUntilItRecovers() -> None:
+    calls: list[Optional[float]] = []
+    provider_is_down = True
+
+    def function(timeout: Optional[float]) -> str:
+        calls.append(timeout)
+        if provider_is_down:
+            raise domain.Resilience.Unavailable("504 Gateway Timeout")
+        return "OK"
+
+    resilience = domain.Resilience(
+        retry_policy=domain.RetryPolicy(attempts=1),
+        circuit_breaker=domain.CircuitBreaker(failure_threshold=2, recovery_timeout=0.05),
+    )
+    for _ in range(2):
+        with pytest.raises(domain.Resilience.Unavailable):
+            resilience.call("orders", function)
+
+    assert resilience.circuit_breaker.state == enums.CircuitStateEnum.OPEN
+    with pytest.raises(domain.Resilience.CircuitOpen):
+        resilience.call("orders", function)
+    assert len(calls) == 2
+
+    # A failed trial call, once recovery_timeout has passed, opens the circuit again
+    time.sleep(0.05)
+    with pytest.raises(domain.Resilience.Unavailable):
+        resilience.call("orders", function)
+    assert resilience.circuit_breaker.state == enums.CircuitStateEnum.OPEN
+    assert len(calls) == 3
+
+    provider_is_down = False
+    time.sleep(0.05)
+    assert resilience.call("orders", function) == "OK"
+    assert resilience.circuit_breaker.allows_request() is True
+
+
+def test_givenATrialCallRaisingANonTransientError_whenCalledWithResilience_thenTheNextCallIsLetThrough() -> None:
+    calls: list[Optional[float]] = []
+
+    def function(timeout: Optional[float]) -> str:
+        calls.append(timeout)
+        raise ValueError("400 Bad Request")
+
+    resilience = domain.Resilience(
+        retry_policy=domain.RetryPolicy(attempts=1),
+        circuit_breaker=domain.CircuitBreaker(failure_threshold=1, recovery_timeout=0.05),
+    )
+    resilience.circuit_breaker.record_failure()
+    time.sleep(0.05)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            resilience.call("orders", function)
+
+    assert len(calls) == 2
+    assert resilience.circuit_breaker.allows_request() is True
+
+
+def test_givenATrialCallThatNeverEnds_whenRecoveryTimeoutPasses_thenAnotherTrialCallIsLetThrough() -> None:
+    circuit_breaker = domain.CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    circuit_breaker.record_failure()
+    time.sleep(0.05)
+
+    assert circuit_breaker.allows_request() is True
+    assert circuit_breaker.allows_request() is False
+
+    time.sleep(0.05)
+    assert circuit_breaker.allows_request() is True
+
+
+def test_givenAProviderFailingTransiently_whenAwaitedWithResilience_thenTheCallIsRetriedUntilItSucceeds() -> None:
+    timeouts: list[Optional[float]] = []
+
+    async def function(timeout: Optional[float]) -> str:
+        timeouts.append(timeout)
+        if len(timeouts) < 2:
+            raise domain.Resilience.Unavailable("502 Bad Gateway")
+        return "OK"
+
+    resilience = domain.Resilience(retry_policy=domain.RetryPolicy(attempts=2, base_delay=0), timeouts={"orders": 5})
+
+    assert asyncio.run(resilience.acall("orders", function)) == "OK"
+    assert timeouts == [5, 5]
+
+
+def test_givenACancelledTrialCall_whenAwaitedWithResilience_thenTheNextCallIsLetThrough() -> None:
+    async def function(timeout: Optional[float]) -> str:
+        await asyncio.sleep(1)
+        return "OK"
+
+    resilience = domain.Resilience(
+        retry_policy=domain.RetryPolicy(attempts=1),
+        circuit_breaker=domain.CircuitBreaker(failure_threshold=1, recovery_timeout=0.05),
+    )
+    resilience.circuit_breaker.record_failure()
+    time.sleep(0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(resilience.acall("orders", function), timeout=0.01))
+
+    assert resilience.circuit_breaker.allows_request() is True
@@ -47,3 +47,19 @@ class FakeUnitOfWork(protocols.UnitOfWork, Protocol):
     block_event_units: set[protocols.BlockEvent] = field(init=False, repr=False)
 
     transaction_units: set[protocols.Transaction] = field(init=False, repr=False)
+
+    commit_count: int = field(init=False, repr=False)
+    closing_threads: list[int] = field(init=False, repr=False)
+
+
+@dataclass(match_args=False)
+class FakeAsyncUnitOfWork(protocols.AsyncUnitOfWork, Protocol):
+    """Same as FakeUnitOfWork, combined with the interface of protocols.AsyncUnitOfWork"""
+
+    payment_method_units: list[protocols.PaymentMethod] = field(init=False, repr=False)
+    operation_event_units: set[protocols.OperationEvent] = field(init=False, repr=False)
+    block_event_units: set[protocols.BlockEvent] = field(init=False, repr=False)
+
+    transaction_units: set[protocols.Transaction] = field(init=False, repr=False)
+
+    commit_count: int = field(init=False, repr=False)
@@ -1,5 +1,6 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Callable
 
 import pytest
 from faker import Faker
@@ -77,3 +78,55 @@ def test_givenPaymentMethodWithDifferentIdThanTheOneStoredInBlockEvent_thenError
 
     with pytest.raises(ValueError):
         storage.django.BlockEventRepository().add(db_payment_method.to_domain(), block_event)
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenCorrectData_whenCallingRepositoryAddMany_thenBlockEventsGetCreatedInASingleQuery(
+    django_assert_num_queries: Callable,
+) -> None:
+
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    block_events = [
+        domain.BlockEvent(
+            created_at=datetime.now(timezone.utc) - timedelta(minutes=index),  # staged a while ago
+            status=status,
+            payment_method_id=db_payment_method.id,
+            block_name=fake.name(),
+        )
+        for index, status in enumerate(enums.OperationStatusEnum)
+    ]
+
+    payment_method = db_payment_method.to_domain()
+
+    with django_assert_num_queries(1):
+        result = storage.django.BlockEventRepository().add_many(payment_method, block_events)
+
+    db_block_events = storage.django.models.BlockEvent.objects.all()
+    assert {db_block_event.to_domain() for db_block_event in db_block_events} == set(result)
+    assert [(event.status, event.block_name, event.created_at) for event in result] == [
+        (event.status, event.block_name, event.created_at) for event in block_events
+    ]
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenAnyBlockEventWithDifferentPaymentMethodId_whenCallingRepositoryAddMany_thenNoBlockEventGetsCreated() -> (
+    None
+):
+
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    block_events = [
+        domain.BlockEvent(
+            created_at=datetime.now(),
+            status=enums.OperationStatusEnum.STARTED,
+            payment_method_id=payment_method_id,
+            block_name=fake.name(),
+        )
+        for payment_method_id in [db_payment_method.id, protocols.ExistingPaymentMethodId(uuid.uuid4())]
+    ]
+
+    with pytest.raises(ValueError):
+        storage.django.BlockEventRepository().add_many(db_payment_method.to_domain(), block_events)
+
+    assert not storage.django.models.BlockEvent.objects.exists()
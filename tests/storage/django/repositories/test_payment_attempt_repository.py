@@ -1,3 +1,4 @@
+import dataclasses
 import uuid
 from typing import Callable
 
@@ -35,12 +36,12 @@ def test_givenExistingPaymentAttemptRow_whenCallingRepositoryGet_thenPaymentAtte
         timestamp=timezone.now(),
         payment_method=db_payment_method,
     )
-    OperationEventFactory.create(
+    started = OperationEventFactory.create(
         payment_method_id=db_payment_method.id,
         status=enums.OperationStatusEnum.STARTED,
         type=enums.OperationTypeEnum.INITIALIZE,
     )
-    OperationEventFactory.create(
+    completed = OperationEventFactory.create(
         payment_method_id=db_payment_method.id,
         status=enums.OperationStatusEnum.COMPLETED,
         type=enums.OperationTypeEnum.INITIALIZE,
@@ -49,7 +50,15 @@ def test_givenExistingPaymentAttemptRow_whenCallingRepositoryGet_thenPaymentAtte
     with django_assert_num_queries(5):
         result = storage.django.PaymentAttemptRepository().get(id=db_payment_attempt.id)
 
-    assert result == db_payment_attempt.to_domain()
+    assert result.payment_methods[0].operation_events == [started.to_domain(), completed.to_domain()]
+    assert result == dataclasses.replace(
+        db_payment_attempt.to_domain(),
+        payment_methods=[
+            dataclasses.replace(
+                db_payment_method.to_domain(), operation_events=result.payment_methods[0].operation_events
+            )
+        ],
+    )
 
 
 @skip_if_django_not_installed
@@ -1,3 +1,4 @@
+import dataclasses
 import uuid
 from typing import Callable
 
@@ -57,12 +58,12 @@ def test_givenExistingPaymentMethodRow_whenCallingRepositoryGet_thenPaymentMetho
         timestamp=timezone.now(),
         payment_method=db_payment_method,
     )
-    OperationEventFactory.create(
+    started = OperationEventFactory.create(
         payment_method_id=db_payment_method.id,
         status=enums.OperationStatusEnum.STARTED,
         type=enums.OperationTypeEnum.INITIALIZE,
     )
-    OperationEventFactory.create(
+    completed = OperationEventFactory.create(
         payment_method_id=db_payment_method.id,
         status=enums.OperationStatusEnum.COMPLETED,
         type=enums.OperationTypeEnum.INITIALIZE,
@@ -71,7 +72,8 @@ def test_givenExistingPaymentMethodRow_whenCallingRepositoryGet_thenPaymentMetho
     with django_assert_num_queries(3):
         result = storage.django.PaymentMethodRepository().get(id=db_payment_method.id)
 
-    assert result == db_payment_method.to_domain()
+    assert result.operation_events == [started.to_domain(), completed.to_domain()]
+    assert result == dataclasses.replace(db_payment_method.to_domain(), operation_events=result.operation_events)
 
 
 @skip_if_django_not_installed
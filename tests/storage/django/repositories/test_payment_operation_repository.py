@@ -1,8 +1,9 @@
 from itertools import product
+from typing import Callable
 
 import pytest
 
-from acquiring import enums
+from acquiring import domain, enums
 from acquiring.utils import is_django_installed
 from tests.storage.utils import skip_if_django_not_installed
 
@@ -39,3 +40,51 @@ def test_givenExistingPaymentMethodRow_whenCallingRepositoryAdd_thenOperationEve
 
     assert len(payment_method.operation_events) == 1
     assert payment_method.operation_events[0] == operation_event.to_domain()
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenExistingPaymentMethodRow_whenCallingRepositoryAddMany_thenOperationEventsGetCreatedInASingleQuery(
+    django_assert_num_queries: Callable,
+) -> None:
+
+    db_payment_attempt = PaymentAttemptFactory()
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=db_payment_attempt.id)
+    payment_method = db_payment_method.to_domain()
+    types_and_statuses = list(product(enums.OperationTypeEnum, enums.OperationStatusEnum))
+
+    with django_assert_num_queries(1):
+        result = storage.django.OperationEventRepository().add_many(
+            payment_method=payment_method,
+            types_and_statuses=types_and_statuses,
+        )
+
+    db_operation_events = storage.django.models.OperationEvent.objects.filter(payment_method_id=db_payment_method.id)
+    assert {(event.type, event.status) for event in db_operation_events} == set(types_and_statuses)
+    assert {event.to_domain() for event in db_operation_events} == set(result)
+    assert payment_method.operation_events == result
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("operation_type", enums.OperationTypeEnum)
+def test_givenAStartedOperationEvent_whenCallingRepositoryAddForTheSameOperation_thenOnlyRefundsGetStartedTwice(
+    operation_type: enums.OperationTypeEnum,
+) -> None:
+
+    db_payment_attempt = PaymentAttemptFactory()
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=db_payment_attempt.id)
+    payment_method = db_payment_method.to_domain()
+
+    repository = storage.django.OperationEventRepository()
+    repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+
+    if operation_type == enums.OperationTypeEnum.REFUND:
+        repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+    else:
+        with pytest.raises(domain.OperationEvent.Duplicated):
+            repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+
+    assert storage.django.models.OperationEvent.objects.filter(payment_method_id=db_payment_method.id).count() == (
+        2 if operation_type == enums.OperationTypeEnum.REFUND else 1
+    )
@@ -1,3 +1,5 @@
+import pathlib
+import uuid
 from typing import Callable
 
 import pytest
@@ -10,6 +12,8 @@ fake = Faker()
 
 
 if is_django_installed():
+    import django.db
+    import django.db.transaction
     from django.utils import timezone
 
     from acquiring import domain, storage
@@ -31,7 +35,8 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenOperationEventGetsCreated
         raw_data="",
     )
 
-    with django_assert_num_queries(1):
+    # The insert gets its own savepoint, see test_givenAStoredTransaction_whenCallingRepositoryAddForItAgain...
+    with django_assert_num_queries(3):
         storage.django.TransactionRepository().add(
             transaction=transaction,
         )
@@ -40,3 +45,209 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenOperationEventGetsCreated
     db_transaction = storage.django.models.Transaction.objects.first()
 
     assert transaction == db_transaction.to_domain()
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenLargeRawData_whenCallingRepositoryAdd_thenItIsStoredCompressedAndDecodedOnRead() -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    transaction = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=timezone.now(),
+        provider_name=fake.company(),
+        payment_method_id=db_payment_method.id,
+        raw_data=fake.json(num_rows=200),
+    )
+
+    storage.django.TransactionRepository().add(transaction=transaction)
+
+    db_transaction = storage.django.models.Transaction.objects.get()
+    assert db_transaction.raw_data is None
+    assert db_transaction.raw_data_codec == "gzip"
+    assert len(db_transaction.encoded_raw_data) < len(transaction.raw_data.encode())
+    assert transaction == db_transaction.to_domain()
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenATransactionStoredBeforeRawDataGotEncoded_whenConvertingItToDomain_thenItsRawDataIsReturnedAsIs() -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    raw_data = fake.json()
+    storage.django.models.Transaction.objects.create(
+        external_id=fake.uuid4(),
+        timestamp=timezone.now(),
+        provider_name=fake.company(),
+        payment_method_id=db_payment_method.id,
+        raw_data=raw_data,
+    )
+
+    assert storage.django.models.Transaction.objects.get().to_domain().raw_data == raw_data
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenManyTransactions_whenCallingRepositoryAddMany_thenTheyGetCreatedInASingleQuery(
+    django_assert_num_queries: Callable,
+) -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    transactions = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=timezone.now(),
+            provider_name=fake.company(),
+            payment_method_id=db_payment_method.id,
+            raw_data=fake.json(),
+        )
+        for _ in range(3)
+    ]
+
+    with django_assert_num_queries(1):
+        storage.django.TransactionRepository().add_many(transactions)
+
+    assert sorted(
+        (db_transaction.to_domain() for db_transaction in storage.django.models.Transaction.objects.all()),
+        key=lambda transaction: transaction.external_id,
+    ) == sorted(transactions, key=lambda transaction: transaction.external_id)
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenStoredTransactions_whenCallingRepositoryExistingExternalIds_thenOnlyThoseOfTheProviderAreReturned(
+    django_assert_num_queries: Callable,
+) -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    stored = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=timezone.now(),
+        provider_name="paypal",
+        payment_method_id=db_payment_method.id,
+        raw_data="",
+    )
+    repository = storage.django.TransactionRepository()
+    repository.add(stored)
+
+    with django_assert_num_queries(1):
+        assert repository.existing_external_ids("paypal", [stored.external_id, fake.uuid4()]) == {stored.external_id}
+    assert repository.existing_external_ids("other", [stored.external_id]) == set()
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenAStoredTransaction_whenCallingRepositoryAddForItAgain_thenItIsADuplicateAndTheRestStillCommits() -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    stored, other = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=timezone.now(),
+            provider_name="paypal",
+            payment_method_id=db_payment_method.id,
+            raw_data="",
+        )
+        for _ in range(2)
+    ]
+    repository = storage.django.TransactionRepository()
+    repository.add(stored)
+
+    with django.db.transaction.atomic():
+        repository.add(other)
+        with pytest.raises(domain.Transaction.Duplicated):
+            repository.add(stored)
+
+    assert repository.existing_external_ids("paypal", [stored.external_id, other.external_id]) == {
+        stored.external_id,
+        other.external_id,
+    }
+    assert storage.django.models.Transaction.objects.count() == 2
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenRawDataSpilledOverIntoAStore_whenCallingRepositoryAddAndGet_thenItIsOnlyKeptIfItGetsStored(
+    tmp_path: pathlib.Path,
+) -> None:
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+    transaction = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=timezone.now(),
+        provider_name=fake.company(),
+        payment_method_id=db_payment_method.id,
+        raw_data=fake.json(),
+    )
+
+    class SpillingTransactionRepository(storage.django.TransactionRepository):
+        raw_data_policy = storage.codecs.RawDataPolicy(
+            max_inline_size=0,
+            store=storage.codecs.FileSystemRawDataStore(directory=tmp_path),
+        )
+
+    repository = SpillingTransactionRepository()
+    repository.add(transaction)
+    db_transaction = storage.django.models.Transaction.objects.get()
+    assert [path.name for path in tmp_path.iterdir()] == [db_transaction.raw_data_reference]
+    assert repository.get(db_transaction.id) == transaction
+
+    with pytest.raises(domain.Transaction.Duplicated):
+        repository.add(transaction)
+    assert [path.name for path in tmp_path.iterdir()] == [db_transaction.raw_data_reference]
+
+    with pytest.raises(domain.Transaction.DoesNotExist):
+        repository.get(uuid.uuid4())
+
+
+@skip_if_django_not_installed
+def test_givenRawDataSpilledOverIntoAStore_whenItsUnitOfWorkRollsBack_thenItIsDiscarded(
+    transactional_db: type,
+    tmp_path: pathlib.Path,
+    django_assert_num_queries: Callable,
+) -> None:
+    """This test should not be wrapped inside mark.django_db"""
+
+    class TestException(Exception):
+        pass
+
+    class SpillingTransactionRepository(storage.django.TransactionRepository):
+        raw_data_policy = storage.codecs.RawDataPolicy(
+            max_inline_size=0,
+            store=storage.codecs.FileSystemRawDataStore(directory=tmp_path),
+        )
+
+    db_payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id)
+
+    def transaction() -> "domain.Transaction":
+        return domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=timezone.now(),
+            provider_name=fake.company(),
+            payment_method_id=db_payment_method.id,
+            raw_data=fake.json(),
+        )
+
+    unit_of_work = storage.django.DjangoUnitOfWork(
+        payment_attempt_repository_class=storage.django.PaymentAttemptRepository,
+        milestone_repository_class=storage.django.MilestoneRepository,
+        payment_method_repository_class=storage.django.PaymentMethodRepository,
+        operation_event_repository_class=storage.django.OperationEventRepository,
+        block_event_repository_class=storage.django.BlockEventRepository,
+        transaction_repository_class=SpillingTransactionRepository,
+    )
+
+    with pytest.raises(TestException):
+        with unit_of_work as uow:
+            uow.transactions.add(transaction())
+            raise TestException
+    assert list(tmp_path.iterdir()) == []
+
+    with unit_of_work as uow:
+        committed = uow.transactions.add(transaction())
+        uow.commit()
+
+        savepoint = uow.savepoint()
+        uow.transactions.add(transaction())
+        uow.rollback_to_savepoint(savepoint)
+        uow.commit()
+
+    db_transaction = storage.django.models.Transaction.objects.get()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [db_transaction.raw_data_reference]
+
+    with django_assert_num_queries(1):
+        assert SpillingTransactionRepository().get(db_transaction.id) == committed
@@ -12,7 +12,7 @@ fake = Faker()
 if is_django_installed():
     import django
 
-    from acquiring import domain, protocols, storage
+    from acquiring import domain, enums, protocols, storage
     from tests.storage.django.factories import PaymentAttemptFactory, PaymentMethodFactory
 
     @pytest.fixture
@@ -190,7 +190,8 @@ def test_givenAMoreComplexData_whenTwoFakeRepositoriesAddUnderUnitOfWorkWithComm
 
     payment_attempt = PaymentAttemptFactory().to_domain()
 
-    with django_assert_num_queries(7), pytest.raises(TestException):
+    # The transaction that follows the commit never begins, as nothing uses the unit of work again
+    with django_assert_num_queries(5), pytest.raises(TestException):
         with storage.django.DjangoUnitOfWork(
             payment_attempt_repository_class=TemporaryRepository,
             milestone_repository_class=TemporaryRepository,
@@ -257,3 +258,157 @@ def test_givenAMoreComplexData_whenTwoFakeRepositoriesAddUnderUnitOfWorkWithRoll
             TemporaryFakeModelRepository().add()
 
     assert storage.django.models.PaymentMethod.objects.count() == 0
+
+
+@skip_if_django_not_installed
+def test_givenNestedUnitsOfWork_whenInnerUnitOfWorkCommits_thenCommitIsDeferredToTheOutermostOne(
+    transactional_db: type,
+) -> None:
+    """This test should not be wrapped inside mark.django_db"""
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt = PaymentAttemptFactory().to_domain()
+
+    unit_of_work = storage.django.DjangoUnitOfWork(
+        payment_attempt_repository_class=storage.django.PaymentAttemptRepository,
+        milestone_repository_class=storage.django.MilestoneRepository,
+        payment_method_repository_class=storage.django.PaymentMethodRepository,
+        operation_event_repository_class=storage.django.OperationEventRepository,
+        block_event_repository_class=storage.django.BlockEventRepository,
+        transaction_repository_class=storage.django.TransactionRepository,
+    )
+
+    with pytest.raises(TestException):
+        with unit_of_work:
+            with unit_of_work as uow:
+                uow.payment_methods.add(
+                    domain.DraftPaymentMethod(
+                        payment_attempt_id=payment_attempt.id,
+                    )
+                )
+                uow.commit()
+            raise TestException
+
+    assert storage.django.models.PaymentMethod.objects.count() == 0
+
+    with unit_of_work:
+        with unit_of_work as uow:
+            uow.payment_methods.add(
+                domain.DraftPaymentMethod(
+                    payment_attempt_id=payment_attempt.id,
+                )
+            )
+            uow.commit()
+        uow.commit()
+
+    assert storage.django.models.PaymentMethod.objects.count() == 1
+
+
+@skip_if_django_not_installed
+def test_givenACommittedUnitOfWork_whenUsingItAgain_thenAnotherTransactionBeginsWithTheSameRepositories(
+    transactional_db: type,
+) -> None:
+    """This test should not be wrapped inside mark.django_db"""
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt = PaymentAttemptFactory().to_domain()
+
+    unit_of_work = storage.django.DjangoUnitOfWork(
+        payment_attempt_repository_class=storage.django.PaymentAttemptRepository,
+        milestone_repository_class=storage.django.MilestoneRepository,
+        payment_method_repository_class=storage.django.PaymentMethodRepository,
+        operation_event_repository_class=storage.django.OperationEventRepository,
+        block_event_repository_class=storage.django.BlockEventRepository,
+        transaction_repository_class=storage.django.TransactionRepository,
+    )
+
+    with pytest.raises(TestException):
+        with unit_of_work as uow:
+            payment_methods = uow.payment_methods
+            uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+            uow.commit()
+
+            assert uow.payment_methods is payment_methods
+            uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+            raise TestException
+
+    assert storage.django.models.PaymentMethod.objects.count() == 1
+
+
+@skip_if_django_not_installed
+def test_givenASavepoint_whenRollingBackToIt_thenOnlyWhatCameAfterItRollsBack(
+    transactional_db: type,
+) -> None:
+    """This test should not be wrapped inside mark.django_db"""
+
+    payment_attempt = PaymentAttemptFactory().to_domain()
+
+    with storage.django.DjangoUnitOfWork(
+        payment_attempt_repository_class=storage.django.PaymentAttemptRepository,
+        milestone_repository_class=storage.django.MilestoneRepository,
+        payment_method_repository_class=storage.django.PaymentMethodRepository,
+        operation_event_repository_class=storage.django.OperationEventRepository,
+        block_event_repository_class=storage.django.BlockEventRepository,
+        transaction_repository_class=storage.django.TransactionRepository,
+    ) as uow:
+        kept = uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+
+        savepoint = uow.savepoint()
+        uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+        uow.rollback_to_savepoint(savepoint)
+
+        savepoint = uow.savepoint()
+        released = uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+        uow.release_savepoint(savepoint)
+
+        uow.commit()
+
+    assert set(storage.django.models.PaymentMethod.objects.values_list("id", flat=True)) == {kept.id, released.id}
+
+
+@skip_if_django_not_installed
+def test_givenAnOperationStartedElsewhere_whenStartingItInsideAUnitOfWork_thenTheRestOfTheUnitOfWorkCommits(
+    transactional_db: type,
+) -> None:
+    """This test should not be wrapped inside mark.django_db"""
+
+    payment_method = PaymentMethodFactory(payment_attempt_id=PaymentAttemptFactory().id).to_domain()
+    storage.django.OperationEventRepository().add(
+        payment_method=payment_method,
+        type=enums.OperationTypeEnum.PAY,
+        status=enums.OperationStatusEnum.STARTED,
+    )
+
+    unit_of_work = storage.django.DjangoUnitOfWork(
+        payment_attempt_repository_class=storage.django.PaymentAttemptRepository,
+        milestone_repository_class=storage.django.MilestoneRepository,
+        payment_method_repository_class=storage.django.PaymentMethodRepository,
+        operation_event_repository_class=storage.django.OperationEventRepository,
+        block_event_repository_class=storage.django.BlockEventRepository,
+        transaction_repository_class=storage.django.TransactionRepository,
+    )
+
+    # As PaymentMethodSaga does with single_transaction, when an operation chains another one
+    with unit_of_work as uow:
+        uow.operation_events.add(
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.INITIALIZE,
+            status=enums.OperationStatusEnum.COMPLETED,
+        )
+        with unit_of_work as inner_uow:
+            with pytest.raises(domain.OperationEvent.Duplicated):
+                inner_uow.operation_events.add(
+                    payment_method=payment_method,
+                    type=enums.OperationTypeEnum.PAY,
+                    status=enums.OperationStatusEnum.STARTED,
+                )
+        uow.commit()
+
+    assert set(storage.django.models.OperationEvent.objects.values_list("type", "status")) == {
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+    }
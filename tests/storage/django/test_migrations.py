@@ -4,6 +4,8 @@ from acquiring.utils import is_django_installed
 from tests.storage.utils import skip_if_django_not_installed
 
 if is_django_installed():
+    from django.utils import timezone
+    from django_test_migrations.migrator import Migrator
     from django_test_migrations.plan import all_migrations, nodes_to_tuples
 
 
@@ -17,4 +19,122 @@ def test_migrationOrderingIsCorrect() -> None:
         ],
     )
 
-    assert nodes_to_tuples(main_migrations) == [("acquiring", "0001_initial")]
+    assert nodes_to_tuples(main_migrations) == [
+        ("acquiring", "0001_initial"),
+        ("acquiring", "0002_encoded_raw_data"),
+        ("acquiring", "0003_transaction_provider_external_id"),
+        ("acquiring", "0004_operationevent_started"),
+        ("acquiring", "0005_event_payment_method_indexes"),
+        ("acquiring", "0006_identifiable_id_generator"),
+        ("acquiring", "0007_blockevent_created_at"),
+    ]
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenDuplicateTransactions_whenMigratingToUniqueExternalIds_thenTheEarliestOfEachIsKeptAndTheRestArchived(
+    migrator: "Migrator",
+) -> None:
+    old_state = migrator.apply_initial_migration(("acquiring", "0002_encoded_raw_data"))
+    PaymentAttempt = old_state.apps.get_model("acquiring", "PaymentAttempt")
+    PaymentMethod = old_state.apps.get_model("acquiring", "PaymentMethod")
+    Transaction = old_state.apps.get_model("acquiring", "Transaction")
+
+    payment_method = PaymentMethod.objects.create(
+        payment_attempt=PaymentAttempt.objects.create(amount=1000, currency="USD")
+    )
+    transactions = [
+        Transaction.objects.create(
+            external_id=external_id,
+            provider_name=provider_name,
+            timestamp=timezone.now(),
+            raw_data="{}",
+            raw_data_codec="zlib",
+            encoded_raw_data=external_id.encode(),
+            payment_method=payment_method,
+        )
+        for provider_name, external_id in [
+            ("paypal", "WH-1"),
+            ("paypal", "WH-1"),
+            ("paypal", "WH-1"),
+            ("stripe", "WH-1"),
+            ("paypal", "WH-2"),
+        ]
+    ]
+    earliest = transactions[0]
+
+    new_state = migrator.apply_tested_migration(("acquiring", "0003_transaction_provider_external_id"))
+    Transaction = new_state.apps.get_model("acquiring", "Transaction")
+
+    assert sorted(Transaction.objects.values_list("provider_name", "external_id")) == [
+        ("paypal", "WH-1"),
+        ("paypal", "WH-2"),
+        ("stripe", "WH-1"),
+    ]
+    assert Transaction.objects.get(provider_name="paypal", external_id="WH-1").id == earliest.id
+
+    ArchivedRecord = new_state.apps.get_model("acquiring", "ArchivedRecord")
+    assert (
+        sorted(
+            (record.table_name, record.data["provider_name"], record.data["external_id"])
+            for record in ArchivedRecord.objects.all()
+        )
+        == [("acquiring_transaction", "paypal", "WH-1")] * 2
+    )
+
+    old_state = migrator.apply_tested_migration(("acquiring", "0002_encoded_raw_data"))
+    Transaction = old_state.apps.get_model("acquiring", "Transaction")
+
+    assert sorted(Transaction.objects.values_list("id", "provider_name", "external_id", "timestamp", "raw_data")) == [
+        (transaction.id, transaction.provider_name, transaction.external_id, transaction.timestamp, "{}")
+        for transaction in transactions
+    ]
+    assert [bytes(transaction.encoded_raw_data) for transaction in Transaction.objects.order_by("id")] == [
+        transaction.external_id.encode() for transaction in transactions
+    ]
+
+
+@skip_if_django_not_installed
+@pytest.mark.django_db
+def test_givenDuplicateStartedOperationEvents_whenMigratingToUniqueStartedOperations_thenTheRestGetArchived(
+    migrator: "Migrator",
+) -> None:
+    old_state = migrator.apply_initial_migration(("acquiring", "0003_transaction_provider_external_id"))
+    PaymentAttempt = old_state.apps.get_model("acquiring", "PaymentAttempt")
+    PaymentMethod = old_state.apps.get_model("acquiring", "PaymentMethod")
+    OperationEvent = old_state.apps.get_model("acquiring", "OperationEvent")
+
+    payment_method = PaymentMethod.objects.create(
+        payment_attempt=PaymentAttempt.objects.create(amount=1000, currency="USD")
+    )
+    operation_events = [
+        OperationEvent.objects.create(type=type, status=status, payment_method=payment_method)
+        for type, status in [
+            ("pay", "started"),
+            ("pay", "started"),
+            ("pay", "completed"),
+            ("pay", "started"),
+            ("refund", "started"),
+            ("refund", "started"),
+        ]
+    ]
+
+    new_state = migrator.apply_tested_migration(("acquiring", "0004_operationevent_started"))
+    OperationEvent = new_state.apps.get_model("acquiring", "OperationEvent")
+    ArchivedRecord = new_state.apps.get_model("acquiring", "ArchivedRecord")
+
+    assert sorted(OperationEvent.objects.values_list("id", flat=True)) == [
+        operation_events[index].id for index in [0, 2, 4, 5]
+    ]
+    assert sorted(int(record.record_id) for record in ArchivedRecord.objects.all()) == [
+        operation_events[index].id for index in [1, 3]
+    ]
+
+    old_state = migrator.apply_tested_migration(("acquiring", "0003_transaction_provider_external_id"))
+    OperationEvent = old_state.apps.get_model("acquiring", "OperationEvent")
+
+    assert sorted(OperationEvent.objects.values_list("id", "type", "status", "created_at")) == [
+        (operation_event.id, operation_event.type, operation_event.status, operation_event.created_at)
+        for operation_event in operation_events
+    ]
+    assert not old_state.apps.get_model("acquiring", "ArchivedRecord").objects.exists()
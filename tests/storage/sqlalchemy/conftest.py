@@ -1,6 +1,7 @@
 from acquiring import utils
 
 if utils.is_sqlalchemy_installed():
+    import asyncio
     import contextlib
     from typing import Callable, Generator
 
@@ -9,6 +10,7 @@ if utils.is_sqlalchemy_installed():
     import sqlalchemy
     from alembic.config import Config
     from sqlalchemy import orm
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
     @pytest.fixture
     def session() -> orm.Session:
@@ -41,22 +43,39 @@ if utils.is_sqlalchemy_installed():
 
     @pytest.fixture
     def sqlalchemy_assert_num_queries() -> Callable:
-        """TODO implement django_assert_num_queries functionality for sqlalchemy
-
-        It must be some version of this:
-
-        from sqlalchemy.testing import assertions
-        with assertions.AssertsExecutionResults.assert_execution(
-        assertions.assertsql.CountStatements(count=1),
-        db=session,
-        )
+        """
+        SQLAlchemy version of pytest-django's django_assert_num_queries.
 
-        For now, it is an empty context manager that can be place where we want
-        to eventually check for the number of queries.
+        Counts the statements that any engine executes inside the context,
+        and fails if there are not exactly num of them.
         """
 
         @contextlib.contextmanager
         def context(num: int) -> Generator:
-            yield
+            statements: list[str] = []
+
+            def count_statement(  # type:ignore[no-untyped-def]
+                conn, cursor, statement, parameters, context, executemany
+            ) -> None:
+                statements.append(statement)
+
+            sqlalchemy.event.listen(sqlalchemy.engine.Engine, "before_cursor_execute", count_statement)
+            try:
+                yield
+            finally:
+                sqlalchemy.event.remove(sqlalchemy.engine.Engine, "before_cursor_execute", count_statement)
+
+            assert len(statements) == num, "Expected to perform {} queries but {} were done:\n\n{}".format(
+                num, len(statements), "\n\n".join(statements)
+            )
 
         return context
+
+    @pytest.fixture
+    def async_session_factory(session: orm.Session) -> Generator:
+        """Factory of AsyncSessions on the same database that the session fixture migrates"""
+        async_engine = create_async_engine("sqlite+aiosqlite:///./db.sqlite3")
+        try:
+            yield orm.sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        finally:
+            asyncio.run(async_engine.dispose())
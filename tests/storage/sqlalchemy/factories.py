@@ -7,7 +7,12 @@ fake = Faker()
 
 
 if utils.is_sqlalchemy_installed():
-    from acquiring.storage.sqlalchemy import models
+    from sqlalchemy import orm
+
+    from acquiring.storage.sqlalchemy import engine, models
+
+    # Created on first use, so that importing the factories does not create the engine
+    session = orm.scoped_session(lambda: engine.get_session_factory()())
 
     class PaymentAttemptFactory(factory.alchemy.SQLAlchemyModelFactory):
         # currency = factory.LazyAttribute(lambda _: fake.currency_code())
@@ -15,12 +20,19 @@ if utils.is_sqlalchemy_installed():
 
         class Meta:
             model = models.PaymentAttempt
-            sqlalchemy_session = models.session
+            sqlalchemy_session = session
             sqlalchemy_session_persistence = "commit"
 
     class PaymentMethodFactory(factory.alchemy.SQLAlchemyModelFactory):
 
         class Meta:
             model = models.PaymentMethod
-            sqlalchemy_session = models.session
+            sqlalchemy_session = session
+            sqlalchemy_session_persistence = "commit"
+
+    class OperationEventFactory(factory.alchemy.SQLAlchemyModelFactory):
+
+        class Meta:
+            model = models.OperationEvent
+            sqlalchemy_session = session
             sqlalchemy_session_persistence = "commit"
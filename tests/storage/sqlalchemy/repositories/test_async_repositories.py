@@ -0,0 +1,268 @@
+import asyncio
+import dataclasses
+import pathlib
+import uuid
+from datetime import datetime
+from typing import Callable
+
+import pytest
+from faker import Faker
+
+from acquiring import enums, protocols, utils
+from tests.storage.utils import skip_if_aiosqlite_not_installed, skip_if_sqlalchemy_not_installed
+
+if utils.is_sqlalchemy_installed():
+    from sqlalchemy import orm
+
+    from acquiring import domain, storage
+    from tests.storage.sqlalchemy import factories
+
+fake = Faker()
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenExistingPaymentAttemptRowWithManyPaymentMethods_whenCallingAsyncRepositoryGet_thenQueryCountDoesNotGrow(
+    async_session_factory: "orm.sessionmaker",
+    sqlalchemy_assert_num_queries: Callable,
+) -> None:
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_attempt_id = payment_attempt.id
+    for _ in range(3):
+        payment_method = factories.PaymentMethodFactory(payment_attempt_id=payment_attempt_id)
+        factories.OperationEventFactory(
+            payment_method_id=payment_method.id,
+            type=enums.OperationTypeEnum.INITIALIZE,
+            status=enums.OperationStatusEnum.STARTED,
+        )
+
+    async def get() -> "protocols.PaymentAttempt":
+        async with async_session_factory() as async_session:
+            return await storage.sqlalchemy.AsyncPaymentAttemptRepository(session=async_session).get(
+                id=payment_attempt_id
+            )
+
+    with sqlalchemy_assert_num_queries(3):
+        result = asyncio.run(get())
+
+    assert len(result.payment_methods) == 3
+    assert all(len(payment_method.operation_events) == 1 for payment_method in result.payment_methods)
+    assert result == payment_attempt.to_domain()
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenNonExistingPaymentAttemptRow_whenCallingAsyncRepositoryGet_thenDoesNotExistGetsRaised(
+    async_session_factory: "orm.sessionmaker",
+) -> None:
+
+    async def get() -> "protocols.PaymentAttempt":
+        async with async_session_factory() as async_session:
+            return await storage.sqlalchemy.AsyncPaymentAttemptRepository(session=async_session).get(
+                id=str(uuid.uuid4())  # type: ignore[arg-type]
+            )
+
+    with pytest.raises(domain.PaymentAttempt.DoesNotExist):
+        asyncio.run(get())
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenCorrectData_whenCallingAsyncRepositoryAdd_thenPaymentMethodCanBeRetrievedWithItsOperationEvents(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+    payment_attempt_id = factories.PaymentAttemptFactory().id
+
+    async def add_and_get() -> tuple["protocols.PaymentMethod", "protocols.PaymentMethod"]:
+        async with async_session_factory() as async_session:
+            payment_method = await storage.sqlalchemy.AsyncPaymentMethodRepository(session=async_session).add(
+                domain.DraftPaymentMethod(payment_attempt_id=payment_attempt_id)
+            )
+            await storage.sqlalchemy.AsyncOperationEventRepository(session=async_session).add(
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.INITIALIZE,
+                status=enums.OperationStatusEnum.STARTED,
+            )
+            await storage.sqlalchemy.AsyncOperationEventRepository(session=async_session).add_many(
+                payment_method=payment_method,
+                types_and_statuses=[
+                    (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+                    (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+                ],
+            )
+            await async_session.commit()
+
+        async with async_session_factory() as async_session:
+            return payment_method, await storage.sqlalchemy.AsyncPaymentMethodRepository(session=async_session).get(
+                id=payment_method.id
+            )
+
+    payment_method, result = asyncio.run(add_and_get())
+
+    assert result.id == payment_method.id
+    assert result.payment_attempt_id == payment_attempt_id
+    assert [(event.type, event.status) for event in result.operation_events] == [
+        (event.type, event.status) for event in payment_method.operation_events
+    ]
+    assert session.query(storage.sqlalchemy.models.OperationEvent).count() == 3
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenCorrectData_whenCallingAsyncRepositoryAdd_thenMilestoneBlockEventsAndTransactionGetCreated(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    payment_method = db_payment_method.to_domain()
+
+    async def add() -> None:
+        async with async_session_factory() as async_session:
+            await storage.sqlalchemy.AsyncMilestoneRepository(session=async_session).add(
+                payment_method, enums.AtemptStatusEnum.PROCESSING
+            )
+            await storage.sqlalchemy.AsyncBlockEventRepository(session=async_session).add_many(
+                payment_method,
+                [
+                    domain.BlockEvent(
+                        created_at=datetime.now(),
+                        status=status,
+                        payment_method_id=payment_method.id,
+                        block_name=fake.name(),
+                    )
+                    for status in [enums.OperationStatusEnum.STARTED, enums.OperationStatusEnum.COMPLETED]
+                ],
+            )
+            await storage.sqlalchemy.AsyncTransactionRepository(session=async_session).add(
+                domain.Transaction(
+                    external_id=fake.uuid4(),
+                    timestamp=datetime.now(),
+                    raw_data=fake.json(),
+                    provider_name=fake.company(),
+                    payment_method_id=payment_method.id,
+                )
+            )
+            await async_session.commit()
+
+    asyncio.run(add())
+
+    assert session.query(storage.sqlalchemy.models.Milestone).count() == 1
+    assert session.query(storage.sqlalchemy.models.BlockEvent).count() == 2
+    assert session.query(storage.sqlalchemy.models.Transaction).count() == 1
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenAStoredTransaction_whenCallingAsyncRepositoryAddForItAgain_thenItIsADuplicateAndTheRestStillCommits(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    stored, other = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=datetime.now(),
+            raw_data=fake.json(),
+            provider_name="paypal",
+            payment_method_id=db_payment_method.id,
+        )
+        for _ in range(2)
+    ]
+
+    async def add() -> None:
+        async with async_session_factory() as async_session:
+            repository = storage.sqlalchemy.AsyncTransactionRepository(session=async_session)
+            await repository.add(stored)
+            await async_session.commit()
+
+            await repository.add(other)
+            with pytest.raises(domain.Transaction.Duplicated):
+                await repository.add(stored)
+            await async_session.commit()
+
+    asyncio.run(add())
+
+    assert session.query(storage.sqlalchemy.models.Transaction).count() == 2
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenBlockEventWithDifferentPaymentMethodId_whenCallingAsyncRepositoryAdd_thenErrorGetsRaised(
+    async_session_factory: "orm.sessionmaker",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    payment_method = db_payment_method.to_domain()
+
+    async def add() -> "protocols.BlockEvent":
+        async with async_session_factory() as async_session:
+            return await storage.sqlalchemy.AsyncBlockEventRepository(session=async_session).add(
+                payment_method,
+                domain.BlockEvent(
+                    created_at=datetime.now(),
+                    status=enums.OperationStatusEnum.PENDING,
+                    payment_method_id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+                    block_name=fake.name(),
+                ),
+            )
+
+    with pytest.raises(ValueError):
+        asyncio.run(add())
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenRawDataSpilledOverIntoAStore_whenTheAsyncUnitOfWorkRollsBack_thenItIsDiscarded(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+    tmp_path: pathlib.Path,
+) -> None:
+    payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id).to_domain()
+    session.commit()
+
+    @dataclasses.dataclass
+    class SpillingTransactionRepository(storage.sqlalchemy.AsyncTransactionRepository):
+        raw_data_policy: storage.codecs.RawDataPolicy = storage.codecs.RawDataPolicy(
+            max_inline_size=0,
+            store=storage.codecs.FileSystemRawDataStore(directory=tmp_path),
+        )
+
+    unit_of_work = storage.sqlalchemy.AsyncSqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.AsyncPaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.AsyncMilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.AsyncPaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.AsyncOperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.AsyncBlockEventRepository,
+        transaction_repository_class=SpillingTransactionRepository,
+        session_factory=async_session_factory,
+    )
+    transaction = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=datetime.now(),
+        raw_data=fake.json(),
+        provider_name=fake.company(),
+        payment_method_id=payment_method.id,
+    )
+
+    async def add(commit: bool) -> None:
+        async with unit_of_work as uow:
+            await uow.transactions.add(transaction)
+            if commit:
+                await uow.commit()
+
+    asyncio.run(add(commit=False))
+    assert list(tmp_path.iterdir()) == []
+
+    asyncio.run(add(commit=True))
+    db_transaction = session.query(storage.sqlalchemy.models.Transaction).one()
+    assert [path.name for path in tmp_path.iterdir()] == [db_transaction.raw_data_reference]
+
+    async def get() -> "protocols.Transaction":
+        async with unit_of_work as uow:
+            return await uow.transactions.get(db_transaction.id)
+
+    assert asyncio.run(get()) == transaction
+
+    # Downgrading the migrations refuses to drop the references to raw data that spilled over
+    session.delete(db_transaction)
+    session.commit()
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from acquiring import enums, utils
+from tests.storage.utils import skip_if_aiosqlite_not_installed, skip_if_sqlalchemy_not_installed
+
+if utils.is_sqlalchemy_installed():
+    from sqlalchemy import orm
+
+    from acquiring import domain, storage
+    from tests.storage.sqlalchemy import factories
+
+
+def async_unit_of_work(async_session_factory: "orm.sessionmaker") -> "storage.sqlalchemy.AsyncSqlAlchemyUnitOfWork":
+    return storage.sqlalchemy.AsyncSqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.AsyncPaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.AsyncMilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.AsyncPaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.AsyncOperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.AsyncBlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.AsyncTransactionRepository,
+        session_factory=async_session_factory,
+    )
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenCorrectData_whenAsyncUnitOfWorkCommits_thenDataGetsStored(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+    payment_attempt_id = factories.PaymentAttemptFactory().id
+
+    async def run() -> None:
+        async with async_unit_of_work(async_session_factory) as uow:
+            payment_method = await uow.payment_methods.add(
+                domain.DraftPaymentMethod(payment_attempt_id=payment_attempt_id)
+            )
+            await uow.operation_events.add(
+                payment_method=payment_method,
+                type=enums.OperationTypeEnum.INITIALIZE,
+                status=enums.OperationStatusEnum.STARTED,
+            )
+            await uow.commit()
+
+    asyncio.run(run())
+
+    assert session.query(storage.sqlalchemy.models.PaymentMethod).count() == 1
+    assert session.query(storage.sqlalchemy.models.OperationEvent).count() == 1
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenAnException_whenRaisedInsideAsyncUnitOfWork_thenDataRollsBack(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt_id = factories.PaymentAttemptFactory().id
+
+    async def run() -> None:
+        async with async_unit_of_work(async_session_factory) as uow:
+            await uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt_id))
+            raise TestException
+
+    with pytest.raises(TestException):
+        asyncio.run(run())
+
+    assert session.query(storage.sqlalchemy.models.PaymentMethod).count() == 0
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenNestedAsyncUnitsOfWork_whenInnerUnitOfWorkCommits_thenCommitIsDeferredToTheOutermostOne(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt_id = factories.PaymentAttemptFactory().id
+    unit_of_work = async_unit_of_work(async_session_factory)
+
+    async def run() -> None:
+        async with unit_of_work:
+            async with unit_of_work as inner_uow:
+                await inner_uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt_id))
+                await inner_uow.commit()
+            raise TestException
+
+    with pytest.raises(TestException):
+        asyncio.run(run())
+
+    assert unit_of_work.depth == 0
+    assert session.query(storage.sqlalchemy.models.PaymentMethod).count() == 0
+
+
+@skip_if_sqlalchemy_not_installed
+@skip_if_aiosqlite_not_installed
+def test_givenTwoTasksSharingAnAsyncUnitOfWork_whenOneFailsAfterTheOtherCommits_thenEachKeepsItsOwnTransaction(
+    async_session_factory: "orm.sessionmaker",
+    session: "orm.Session",
+) -> None:
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt_id = factories.PaymentAttemptFactory().id
+    unit_of_work = async_unit_of_work(async_session_factory)
+
+    async def run() -> None:
+        committing_entered, failing_entered, committed = asyncio.Event(), asyncio.Event(), asyncio.Event()
+
+        async def commits() -> None:
+            async with unit_of_work as uow:
+                committing_entered.set()
+                await failing_entered.wait()
+                assert uow.depth == 1
+                await uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt_id))
+                await uow.commit()
+            committed.set()
+
+        async def fails() -> None:
+            await committing_entered.wait()
+            async with unit_of_work as uow:
+                failing_entered.set()
+                assert uow.depth == 1
+                await committed.wait()
+                raise TestException
+
+        await asyncio.gather(commits(), fails())
+
+    with pytest.raises(TestException):
+        asyncio.run(run())
+
+    assert session.query(storage.sqlalchemy.models.PaymentMethod).count() == 1
@@ -1,5 +1,6 @@
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Callable
 
 import pytest
@@ -33,10 +34,12 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenBlockEventGetsCreated(
         block_name="test",
     )
 
-    with sqlalchemy_assert_num_queries(5):
+    payment_method = db_payment_method.to_domain()
+
+    with sqlalchemy_assert_num_queries(1):
         storage.sqlalchemy.BlockEventRepository(
             session=session,
-        ).add(db_payment_method.to_domain(), block_event)
+        ).add(payment_method, block_event)
         session.commit()
 
     db_block_events = session.query(storage.sqlalchemy.models.BlockEvent).all()
@@ -65,10 +68,12 @@ def test_givenAllData_whenCallingRepositoryAdd_thenBlockEventGetsCreated(
         block_name=block_name,
     )
 
-    with sqlalchemy_assert_num_queries(5):
+    payment_method = db_payment_method.to_domain()
+
+    with sqlalchemy_assert_num_queries(1):
         storage.sqlalchemy.BlockEventRepository(
             session=session,
-        ).add(db_payment_method.to_domain(), block_event)
+        ).add(payment_method, block_event)
         session.commit()
 
     db_block_event = (
@@ -100,3 +105,85 @@ def test_givenPaymentMethodWithDifferentIdThanTheOneStoredInBlockEvent_thenError
         storage.sqlalchemy.BlockEventRepository(
             session=session,
         ).add(db_payment_method.to_domain(), block_event)
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenCorrectData_whenCallingRepositoryAddMany_thenBlockEventsGetCreated(
+    session: "orm.Session",
+) -> None:
+
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    block_events = [
+        domain.BlockEvent(
+            created_at=datetime.now(timezone.utc) - timedelta(minutes=index),  # staged a while ago
+            status=status,
+            payment_method_id=db_payment_method.id,
+            block_name=fake.name(),
+        )
+        for index, status in enumerate(enums.OperationStatusEnum)
+    ]
+
+    result = storage.sqlalchemy.BlockEventRepository(session=session).add_many(
+        db_payment_method.to_domain(), block_events
+    )
+    session.commit()
+
+    db_block_events = session.query(storage.sqlalchemy.models.BlockEvent).all()
+    assert {
+        # SQLite keeps no offset
+        (event.status, event.block_name, event.payment_method_id, event.created_at.replace(tzinfo=timezone.utc))
+        for event in db_block_events
+    } == {(event.status, event.block_name, event.payment_method_id, event.created_at) for event in result}
+    assert [(event.status, event.block_name, event.created_at) for event in result] == [
+        (event.status, event.block_name, event.created_at) for event in block_events
+    ]
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenNaiveBlockEventsStagedInAnotherTimeZone_whenCallingRepositoryAddMany_thenTheyGetStoredInUTC(
+    session: "orm.Session",
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    try:
+        block_event = domain.BlockEvent(
+            created_at=datetime.now(),  # local time, 9 hours ahead of UTC
+            status=enums.OperationStatusEnum.STARTED,
+            payment_method_id=db_payment_method.id,
+            block_name=fake.name(),
+        )
+        storage.sqlalchemy.BlockEventRepository(session=session).add_many(db_payment_method.to_domain(), [block_event])
+        session.commit()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    db_block_event = session.query(storage.sqlalchemy.models.BlockEvent).one()
+    assert abs(db_block_event.created_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)) < timedelta(
+        minutes=1
+    )
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenAnyBlockEventWithDifferentPaymentMethodId_whenCallingRepositoryAddMany_thenErrorGetsRaised(
+    session: "orm.Session",
+) -> None:
+
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    block_events = [
+        domain.BlockEvent(
+            created_at=datetime.now(),
+            status=enums.OperationStatusEnum.STARTED,
+            payment_method_id=payment_method_id,
+            block_name=fake.name(),
+        )
+        for payment_method_id in [db_payment_method.id, protocols.ExistingPaymentMethodId(uuid.uuid4())]
+    ]
+
+    with pytest.raises(ValueError):
+        storage.sqlalchemy.BlockEventRepository(session=session).add_many(db_payment_method.to_domain(), block_events)
+
+    assert session.query(storage.sqlalchemy.models.BlockEvent).count() == 0
@@ -27,8 +27,10 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenMilestoneGetsCreated(
 
     db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
 
-    with sqlalchemy_assert_num_queries(5):
-        storage.sqlalchemy.MilestoneRepository(session).add(db_payment_method.to_domain(), type)
+    payment_method = db_payment_method.to_domain()
+
+    with sqlalchemy_assert_num_queries(1):
+        storage.sqlalchemy.MilestoneRepository(session).add(payment_method, type)
         session.commit()
 
     db_milestones = session.query(storage.sqlalchemy.models.Milestone).all()
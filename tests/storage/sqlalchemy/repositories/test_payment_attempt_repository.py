@@ -4,7 +4,7 @@ from typing import Callable
 import pytest
 from faker import Faker
 
-from acquiring import domain, storage, utils
+from acquiring import domain, enums, storage, utils
 from tests.storage.utils import skip_if_sqlalchemy_not_installed
 
 fake = Faker()
@@ -21,22 +21,49 @@ def test_givenExistingPaymentMethodRow_whenCallingRepositoryGet_thenPaymentMetho
     sqlalchemy_assert_num_queries: Callable,
 ) -> None:
     payment_attempt = factories.PaymentAttemptFactory()
+    payment_attempt_id = payment_attempt.id
 
-    with sqlalchemy_assert_num_queries(5):
+    with sqlalchemy_assert_num_queries(2):
         result = storage.sqlalchemy.PaymentAttemptRepository(
             session=session,
-        ).get(id=payment_attempt.id)
+        ).get(id=payment_attempt_id)
 
     assert result == payment_attempt.to_domain()
 
 
+@skip_if_sqlalchemy_not_installed
+def test_givenExistingPaymentAttemptRowWithManyPaymentMethods_whenCallingRepositoryGet_thenQueryCountDoesNotGrow(
+    session: "orm.Session",
+    sqlalchemy_assert_num_queries: Callable,
+) -> None:
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_attempt_id = payment_attempt.id
+    for _ in range(3):
+        payment_method = factories.PaymentMethodFactory(payment_attempt_id=payment_attempt_id)
+        for status in [enums.OperationStatusEnum.STARTED, enums.OperationStatusEnum.COMPLETED]:
+            factories.OperationEventFactory(
+                payment_method_id=payment_method.id,
+                type=enums.OperationTypeEnum.INITIALIZE,
+                status=status,
+            )
+
+    with sqlalchemy_assert_num_queries(3):
+        result = storage.sqlalchemy.PaymentAttemptRepository(
+            session=session,
+        ).get(id=payment_attempt_id)
+
+    assert len(result.payment_methods) == 3
+    assert all(len(payment_method.operation_events) == 2 for payment_method in result.payment_methods)
+    assert result == payment_attempt.to_domain()
+
+
 @skip_if_sqlalchemy_not_installed
 def test_givenNonExistingPaymentMethodRow_whenCallingRepositoryGet_thenDoesNotExistGetsRaise(
     session: "orm.Session",
     sqlalchemy_assert_num_queries: Callable,
 ) -> None:
 
-    with sqlalchemy_assert_num_queries(5), pytest.raises(domain.PaymentAttempt.DoesNotExist):
+    with sqlalchemy_assert_num_queries(2), pytest.raises(domain.PaymentAttempt.DoesNotExist):
         storage.sqlalchemy.PaymentAttemptRepository(
             session=session,
         ).get(id=str(uuid.uuid4()))
@@ -3,7 +3,7 @@ from typing import Callable
 import pytest
 from faker import Faker
 
-from acquiring import domain, storage, utils
+from acquiring import domain, enums, storage, utils
 from tests.storage.utils import skip_if_sqlalchemy_not_installed
 
 fake = Faker()
@@ -21,16 +21,38 @@ def test_givenExistingPaymentMethodRow_whenCallingRepositoryGet_thenPaymentMetho
 ) -> None:
     payment_attempt = factories.PaymentAttemptFactory()
     payment_method = factories.PaymentMethodFactory(payment_attempt_id=payment_attempt.id)
+    payment_method_id = payment_method.id
 
-    with sqlalchemy_assert_num_queries(5):
+    with sqlalchemy_assert_num_queries(2):
         result = storage.sqlalchemy.PaymentMethodRepository(
             session=session,
-        ).get(id=payment_method.id)
+        ).get(id=payment_method_id)
 
     assert result.payment_attempt_id == payment_attempt.id
     assert result == payment_method.to_domain()
 
 
+@skip_if_sqlalchemy_not_installed
+def test_givenExistingPaymentMethodRowWithOperationEvents_whenCallingRepositoryGet_thenOperationEventsLoadInOneQuery(
+    session: "orm.Session",
+    sqlalchemy_assert_num_queries: Callable,
+) -> None:
+    payment_attempt = factories.PaymentAttemptFactory()
+    payment_method = factories.PaymentMethodFactory(payment_attempt_id=payment_attempt.id)
+    payment_method_id = payment_method.id
+    for type in [enums.OperationTypeEnum.INITIALIZE, enums.OperationTypeEnum.PAY]:
+        for status in [enums.OperationStatusEnum.STARTED, enums.OperationStatusEnum.COMPLETED]:
+            factories.OperationEventFactory(payment_method_id=payment_method_id, type=type, status=status)
+
+    with sqlalchemy_assert_num_queries(2):
+        result = storage.sqlalchemy.PaymentMethodRepository(
+            session=session,
+        ).get(id=payment_method_id)
+
+    assert len(result.operation_events) == 4
+    assert result == payment_method.to_domain()
+
+
 @skip_if_sqlalchemy_not_installed
 def test_givenNonExistingPaymentMethodRow_whenCallingRepositoryGet_thenDoesNotExistGetsRaise(
     session: "orm.Session",
@@ -42,7 +64,7 @@ def test_givenNonExistingPaymentMethodRow_whenCallingRepositoryGet_thenDoesNotEx
         payment_attempt_id=domain_factories.PaymentAttemptFactory().id,
     )
 
-    with sqlalchemy_assert_num_queries(5), pytest.raises(domain.PaymentMethod.DoesNotExist):
+    with sqlalchemy_assert_num_queries(2), pytest.raises(domain.PaymentMethod.DoesNotExist):
         storage.sqlalchemy.PaymentMethodRepository(
             session=session,
         ).get(id=payment_method.id)
@@ -60,7 +82,7 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenPaymentMethodGetsCreated(
         payment_attempt_id=payment_attempt.id,
     )
 
-    with sqlalchemy_assert_num_queries(7):
+    with sqlalchemy_assert_num_queries(1):
         result = storage.sqlalchemy.PaymentMethodRepository(session=session).add(data)
         session.commit()
 
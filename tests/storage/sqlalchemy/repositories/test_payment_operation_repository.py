@@ -1,15 +1,18 @@
+import uuid
+from datetime import datetime
 from itertools import product
 from typing import Callable
 
 import pytest
 from faker import Faker
 
-from acquiring import enums, storage, utils
+from acquiring import domain, enums, protocols, storage, utils
 from tests.storage.utils import skip_if_sqlalchemy_not_installed
 
 fake = Faker()
 
 if utils.is_sqlalchemy_installed():
+    import sqlalchemy
     from sqlalchemy import orm
 
     from tests.storage.sqlalchemy import factories
@@ -31,7 +34,7 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenOperationEventGetsCreated
     db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=db_payment_attempt.id)
     payment_method = db_payment_method.to_domain()
 
-    with sqlalchemy_assert_num_queries(5):
+    with sqlalchemy_assert_num_queries(1):
         result = storage.sqlalchemy.OperationEventRepository(session=session).add(
             payment_method=payment_method,
             type=operation_type,
@@ -49,3 +52,83 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenOperationEventGetsCreated
 
     assert len(payment_method.operation_events) == 1
     assert payment_method.operation_events[0] == result
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenCorrectData_whenCallingRepositoryAddMany_thenOperationEventsGetCreated(
+    session: "orm.Session",
+) -> None:
+
+    db_payment_attempt = factories.PaymentAttemptFactory()
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=db_payment_attempt.id)
+    payment_method = db_payment_method.to_domain()
+    types_and_statuses = list(product(enums.OperationTypeEnum, enums.OperationStatusEnum))
+
+    result = storage.sqlalchemy.OperationEventRepository(session=session).add_many(
+        payment_method=payment_method,
+        types_and_statuses=types_and_statuses,
+    )
+    session.commit()
+
+    db_operation_events = session.query(storage.sqlalchemy.models.OperationEvent).all()
+    assert {(event.type, event.status) for event in db_operation_events} == set(types_and_statuses)
+    assert {event.payment_method_id for event in db_operation_events} == {db_payment_method.id}
+    assert [(event.type, event.status) for event in result] == types_and_statuses
+    assert payment_method.operation_events == result
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenAPaymentMethodNotYetFlushed_whenCallingRepositoryAddMany_thenOperationEventsGetInsertedAfterIt(
+    session: "orm.Session",
+) -> None:
+    session.execute(sqlalchemy.text("PRAGMA foreign_keys = ON"))
+
+    db_payment_attempt = factories.PaymentAttemptFactory()
+    payment_method = domain.PaymentMethod(
+        id=protocols.ExistingPaymentMethodId(uuid.uuid4()),
+        created_at=datetime.now(),
+        payment_attempt_id=db_payment_attempt.id,
+    )
+    session.add(
+        storage.sqlalchemy.models.PaymentMethod(
+            id=payment_method.id,
+            created_at=payment_method.created_at,
+            payment_attempt_id=payment_method.payment_attempt_id,
+        )
+    )
+
+    storage.sqlalchemy.OperationEventRepository(session=session).add_many(
+        payment_method=payment_method,
+        types_and_statuses=[(enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.STARTED)],
+    )
+    session.commit()
+
+    assert session.query(storage.sqlalchemy.models.OperationEvent).count() == 1
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.parametrize("operation_type", enums.OperationTypeEnum)
+def test_givenAStartedOperationEvent_whenCallingRepositoryAddForTheSameOperation_thenOnlyRefundsGetStartedTwice(
+    session: "orm.Session",
+    operation_type: enums.OperationTypeEnum,
+) -> None:
+
+    db_payment_attempt = factories.PaymentAttemptFactory()
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=db_payment_attempt.id)
+    payment_method = db_payment_method.to_domain()
+
+    repository = storage.sqlalchemy.OperationEventRepository(session=session)
+    repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+    session.commit()
+
+    if operation_type == enums.OperationTypeEnum.REFUND:
+        repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+        session.commit()
+    else:
+        with pytest.raises(domain.OperationEvent.Duplicated):
+            repository.add(payment_method=payment_method, type=operation_type, status=enums.OperationStatusEnum.STARTED)
+        session.rollback()
+
+    assert session.query(storage.sqlalchemy.models.OperationEvent).count() == (
+        2 if operation_type == enums.OperationTypeEnum.REFUND else 1
+    )
@@ -1,3 +1,5 @@
+import pathlib
+import uuid
 from datetime import datetime
 from typing import Callable
 
@@ -44,3 +46,177 @@ def test_givenCorrectData_whenCallingRepositoryAdd_thenOperationEventGetsCreated
     db_transaction = db_transactions[0]
 
     assert transaction == db_transaction.to_domain()
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenLargeRawData_whenCallingRepositoryAdd_thenItIsStoredCompressedAndDecodedOnRead(
+    session: "orm.Session",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    transaction = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=datetime.now(),
+        provider_name=fake.company(),
+        payment_method_id=db_payment_method.id,
+        raw_data=fake.json(num_rows=200),
+    )
+
+    storage.sqlalchemy.TransactionRepository(session=session).add(transaction=transaction)
+    session.commit()
+
+    db_transaction = session.query(storage.sqlalchemy.models.Transaction).one()
+    assert db_transaction.raw_data is None
+    assert db_transaction.raw_data_codec == "gzip"
+    assert len(db_transaction.encoded_raw_data) < len(transaction.raw_data.encode())
+    assert transaction == db_transaction.to_domain()
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenATransactionStoredBeforeRawDataGotEncoded_whenConvertingItToDomain_thenItsRawDataIsReturnedAsIs(
+    session: "orm.Session",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    raw_data = fake.json()
+    session.add(
+        storage.sqlalchemy.models.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=datetime.now(),
+            provider_name=fake.company(),
+            payment_method_id=db_payment_method.id,
+            raw_data=raw_data,
+        )
+    )
+    session.commit()
+
+    assert session.query(storage.sqlalchemy.models.Transaction).one().to_domain().raw_data == raw_data
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenManyTransactions_whenCallingRepositoryAddMany_thenTheyGetCreatedInASingleQuery(
+    session: "orm.Session",
+    sqlalchemy_assert_num_queries: Callable,
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    transactions = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=datetime.now(),
+            provider_name=fake.company(),
+            payment_method_id=db_payment_method.id,
+            raw_data=fake.json(),
+        )
+        for _ in range(3)
+    ]
+
+    with sqlalchemy_assert_num_queries(1):
+        storage.sqlalchemy.TransactionRepository(session=session).add_many(transactions)
+        session.commit()
+
+    assert sorted(
+        (db_transaction.to_domain() for db_transaction in session.query(storage.sqlalchemy.models.Transaction)),
+        key=lambda transaction: transaction.external_id,
+    ) == sorted(transactions, key=lambda transaction: transaction.external_id)
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenStoredTransactions_whenCallingRepositoryExistingExternalIds_thenOnlyThoseOfTheProviderAreReturned(
+    session: "orm.Session",
+    sqlalchemy_assert_num_queries: Callable,
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    stored = domain.Transaction(
+        external_id=fake.uuid4(),
+        timestamp=datetime.now(),
+        provider_name="paypal",
+        payment_method_id=db_payment_method.id,
+        raw_data="",
+    )
+    repository = storage.sqlalchemy.TransactionRepository(session=session)
+    repository.add(stored)
+    session.commit()
+
+    with sqlalchemy_assert_num_queries(1):
+        assert repository.existing_external_ids("paypal", [stored.external_id, fake.uuid4()]) == {stored.external_id}
+    assert repository.existing_external_ids("other", [stored.external_id]) == set()
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenAStoredTransaction_whenCallingRepositoryAddForItAgain_thenItIsADuplicateAndTheRestStillCommits(
+    session: "orm.Session",
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    stored, other = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=datetime.now(),
+            provider_name="paypal",
+            payment_method_id=db_payment_method.id,
+            raw_data="",
+        )
+        for _ in range(2)
+    ]
+    repository = storage.sqlalchemy.TransactionRepository(session=session)
+    repository.add(stored)
+    session.commit()
+
+    repository.add(other)
+    with pytest.raises(domain.Transaction.Duplicated):
+        repository.add(stored)
+    session.commit()
+
+    assert repository.existing_external_ids("paypal", [stored.external_id, other.external_id]) == {
+        stored.external_id,
+        other.external_id,
+    }
+    assert session.query(storage.sqlalchemy.models.Transaction).count() == 2
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenRawDataSpilledOverIntoAStore_whenTheTransactionCommitsOrNot_thenItIsOnlyKeptIfItCommits(
+    session: "orm.Session",
+    tmp_path: pathlib.Path,
+) -> None:
+    db_payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id)
+    session.commit()
+
+    repository = storage.sqlalchemy.TransactionRepository(
+        session=session,
+        raw_data_policy=storage.codecs.RawDataPolicy(
+            max_inline_size=0,
+            store=storage.codecs.FileSystemRawDataStore(directory=tmp_path),
+        ),
+    )
+    transactions = [
+        domain.Transaction(
+            external_id=fake.uuid4(),
+            timestamp=datetime.now(),
+            provider_name=fake.company(),
+            payment_method_id=db_payment_method.id,
+            raw_data=fake.json(),
+        )
+        for _ in range(3)
+    ]
+
+    repository.add(transactions[0])
+    repository.add_many(transactions[1:])
+    session.rollback()
+    assert list(tmp_path.iterdir()) == []
+
+    repository.add(transactions[0])
+    session.commit()
+    db_transaction = session.query(storage.sqlalchemy.models.Transaction).one()
+    assert [path.name for path in tmp_path.iterdir()] == [db_transaction.raw_data_reference]
+    assert repository.get(db_transaction.id) == transactions[0]
+
+    with pytest.raises(domain.Transaction.DoesNotExist):
+        repository.get(uuid.uuid4())
+
+    # Downgrading the migrations refuses to drop the references to raw data that spilled over
+    session.delete(db_transaction)
+    session.commit()
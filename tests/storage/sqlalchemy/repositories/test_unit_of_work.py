@@ -14,7 +14,7 @@ if is_sqlalchemy_installed():
     import sqlalchemy
     from sqlalchemy import orm
 
-    from acquiring import domain, protocols, storage
+    from acquiring import domain, enums, protocols, storage
     from tests.storage.sqlalchemy import factories
 
     # TODO Refactor typing for SQLAlchemy v2.1
@@ -32,7 +32,7 @@ if is_sqlalchemy_installed():
 
             name = sqlalchemy.Column(sqlalchemy.String(30))
             payment_method_id = sqlalchemy.Column(
-                sqlalchemy.String, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
+                storage.sqlalchemy.models.Uuid, sqlalchemy.ForeignKey("acquiring_paymentmethods.id"), nullable=False
             )
 
         return Klass
@@ -96,7 +96,7 @@ def test_givenAMoreComplexData_whenFakeRepositoryAddUnderUnitOfWork_thenComplexD
 
     payment_attempt = factories.PaymentAttemptFactory().to_domain()
 
-    with sqlalchemy_assert_num_queries(5):
+    with sqlalchemy_assert_num_queries(3):
         with storage.sqlalchemy.SqlAlchemyUnitOfWork(
             payment_attempt_repository_class=TemporaryRepository,
             milestone_repository_class=TemporaryRepository,
@@ -151,7 +151,7 @@ def test_givenAMoreComplexData_whenFakeRepositoryAddFailsUnderUnitOfWork_thenCom
 
     payment_attempt = factories.PaymentAttemptFactory().to_domain()
 
-    with sqlalchemy_assert_num_queries(5), pytest.raises(TestException):
+    with sqlalchemy_assert_num_queries(1), pytest.raises(TestException):
         with storage.sqlalchemy.SqlAlchemyUnitOfWork(
             payment_attempt_repository_class=TemporaryRepository,
             milestone_repository_class=TemporaryRepository,
@@ -210,7 +210,7 @@ def test_givenAMoreComplexData_whenTwoFakeRepositoriesAddUnderUnitOfWorkWithComm
             return factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id).to_domain()
 
     payment_attempt = factories.PaymentAttemptFactory().to_domain()
-    with sqlalchemy_assert_num_queries(5), pytest.raises(TestException):
+    with sqlalchemy_assert_num_queries(3), pytest.raises(TestException):
         with storage.sqlalchemy.SqlAlchemyUnitOfWork(
             payment_attempt_repository_class=TemporaryRepository,
             milestone_repository_class=TemporaryRepository,
@@ -266,7 +266,7 @@ def test_givenAMoreComplexData_whenTwoFakeRepositoriesAddUnderUnitOfWorkWithRoll
             return factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id).to_domain()
 
     payment_attempt = factories.PaymentAttemptFactory().to_domain()
-    with sqlalchemy_assert_num_queries(5):
+    with sqlalchemy_assert_num_queries(2):
         with storage.sqlalchemy.SqlAlchemyUnitOfWork(
             payment_attempt_repository_class=TemporaryRepository,
             milestone_repository_class=TemporaryRepository,
@@ -284,3 +284,154 @@ def test_givenAMoreComplexData_whenTwoFakeRepositoriesAddUnderUnitOfWorkWithRoll
             FakeModelRepository(uow.session).add()
 
     assert session.query(sqlalchemy.func.count(storage.sqlalchemy.models.PaymentMethod.id)).scalar() == 0
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenNestedUnitsOfWork_whenInnerUnitOfWorkCommits_thenCommitIsDeferredToTheOutermostOne(
+    session: "orm.Session",
+) -> None:
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt = factories.PaymentAttemptFactory().to_domain()
+
+    unit_of_work = storage.sqlalchemy.SqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.PaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.MilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.PaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.OperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.BlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.TransactionRepository,
+    )
+
+    with pytest.raises(TestException):
+        with unit_of_work:
+            with unit_of_work as uow:
+                uow.payment_methods.add(
+                    domain.DraftPaymentMethod(
+                        payment_attempt_id=payment_attempt.id,
+                    )
+                )
+                uow.commit()
+            raise TestException
+
+    assert session.query(sqlalchemy.func.count(storage.sqlalchemy.models.PaymentMethod.id)).scalar() == 0
+
+    with unit_of_work:
+        with unit_of_work as uow:
+            uow.payment_methods.add(
+                domain.DraftPaymentMethod(
+                    payment_attempt_id=payment_attempt.id,
+                )
+            )
+            uow.commit()
+        uow.commit()
+
+    assert session.query(sqlalchemy.func.count(storage.sqlalchemy.models.PaymentMethod.id)).scalar() == 1
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenACommittedUnitOfWork_whenUsingItAgain_thenAnotherTransactionBeginsWithTheSameRepositories(
+    session: "orm.Session",
+) -> None:
+
+    class TestException(Exception):
+        pass
+
+    payment_attempt = factories.PaymentAttemptFactory().to_domain()
+
+    unit_of_work = storage.sqlalchemy.SqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.PaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.MilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.PaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.OperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.BlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.TransactionRepository,
+    )
+
+    with pytest.raises(TestException):
+        with unit_of_work as uow:
+            payment_methods = uow.payment_methods
+            uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+            uow.commit()
+
+            assert uow.payment_methods is payment_methods
+            uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+            raise TestException
+
+    assert session.query(sqlalchemy.func.count(storage.sqlalchemy.models.PaymentMethod.id)).scalar() == 1
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenASavepoint_whenRollingBackToIt_thenOnlyWhatCameAfterItRollsBack(
+    session: "orm.Session",
+) -> None:
+
+    payment_attempt = factories.PaymentAttemptFactory().to_domain()
+
+    with storage.sqlalchemy.SqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.PaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.MilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.PaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.OperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.BlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.TransactionRepository,
+    ) as uow:
+        kept = uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+
+        savepoint = uow.savepoint()
+        uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+        uow.rollback_to_savepoint(savepoint)
+
+        savepoint = uow.savepoint()
+        released = uow.payment_methods.add(domain.DraftPaymentMethod(payment_attempt_id=payment_attempt.id))
+        uow.release_savepoint(savepoint)
+
+        uow.commit()
+
+    assert {id for (id,) in session.query(storage.sqlalchemy.models.PaymentMethod.id)} == {kept.id, released.id}
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenAnOperationStartedElsewhere_whenStartingItInsideAUnitOfWork_thenTheRestOfTheUnitOfWorkCommits(
+    session: "orm.Session",
+) -> None:
+
+    payment_method = factories.PaymentMethodFactory(payment_attempt_id=factories.PaymentAttemptFactory().id).to_domain()
+    storage.sqlalchemy.OperationEventRepository(session=session).add(
+        payment_method=payment_method,
+        type=enums.OperationTypeEnum.PAY,
+        status=enums.OperationStatusEnum.STARTED,
+    )
+    session.commit()
+
+    unit_of_work = storage.sqlalchemy.SqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.PaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.MilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.PaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.OperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.BlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.TransactionRepository,
+    )
+
+    # As PaymentMethodSaga does with single_transaction, when an operation chains another one
+    with unit_of_work as uow:
+        uow.operation_events.add(
+            payment_method=payment_method,
+            type=enums.OperationTypeEnum.INITIALIZE,
+            status=enums.OperationStatusEnum.COMPLETED,
+        )
+        with unit_of_work as inner_uow:
+            with pytest.raises(domain.OperationEvent.Duplicated):
+                inner_uow.operation_events.add(
+                    payment_method=payment_method,
+                    type=enums.OperationTypeEnum.PAY,
+                    status=enums.OperationStatusEnum.STARTED,
+                )
+        uow.commit()
+
+    assert {(event.type, event.status) for event in session.query(storage.sqlalchemy.models.OperationEvent)} == {
+        (enums.OperationTypeEnum.PAY, enums.OperationStatusEnum.STARTED),
+        (enums.OperationTypeEnum.INITIALIZE, enums.OperationStatusEnum.COMPLETED),
+    }
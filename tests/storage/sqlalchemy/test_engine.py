@@ -0,0 +1,99 @@
+from typing import Generator
+from unittest import mock
+
+import pytest
+
+from acquiring import utils
+from tests.storage.utils import skip_if_sqlalchemy_not_installed
+
+if utils.is_sqlalchemy_installed():
+    from acquiring import storage
+
+
+@pytest.fixture
+def restore_engine_settings() -> Generator:
+    yield
+    storage.sqlalchemy.engine.configure(storage.sqlalchemy.EngineSettings.from_environment())
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenAConfiguredEngine_whenCreatingAUnitOfWork_thenNoEngineGetsCreatedUntilItIsEntered(
+    restore_engine_settings: None,
+) -> None:
+    storage.sqlalchemy.engine.configure(storage.sqlalchemy.EngineSettings(url="sqlite://"))
+
+    unit_of_work = storage.sqlalchemy.SqlAlchemyUnitOfWork(
+        payment_attempt_repository_class=storage.sqlalchemy.PaymentAttemptRepository,
+        milestone_repository_class=storage.sqlalchemy.MilestoneRepository,
+        payment_method_repository_class=storage.sqlalchemy.PaymentMethodRepository,
+        operation_event_repository_class=storage.sqlalchemy.OperationEventRepository,
+        block_event_repository_class=storage.sqlalchemy.BlockEventRepository,
+        transaction_repository_class=storage.sqlalchemy.TransactionRepository,
+    )
+    assert storage.sqlalchemy.engine._engine is None
+
+    with unit_of_work as uow:
+        assert uow.session.get_bind() is storage.sqlalchemy.engine.get_engine()
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenConfiguredSettings_whenGettingTheEngine_thenTheSameEngineIsSharedWithThoseSettings(
+    restore_engine_settings: None,
+) -> None:
+    storage.sqlalchemy.engine.configure(
+        storage.sqlalchemy.EngineSettings(
+            url="sqlite://",
+            pool_size=3,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            query_cache_size=100,
+        )
+    )
+
+    engine = storage.sqlalchemy.engine.get_engine()
+
+    assert engine is storage.sqlalchemy.engine.get_engine()
+    assert engine.pool.size == 3
+    assert engine.pool._pre_ping is True
+    assert engine.pool._recycle == 3600
+    assert engine._compiled_cache.capacity == 100
+
+    assert storage.sqlalchemy.engine.get_session_factory().kw["bind"] is engine
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenEnvironmentVariables_whenReadingEngineSettings_thenPoolSettingsAreParsed() -> None:
+    with mock.patch.dict(
+        "os.environ",
+        {
+            "SQLALCHEMY_DATABASE_URL": "postgresql://localhost/acquiring",
+            "SQLALCHEMY_POOL_SIZE": "20",
+            "SQLALCHEMY_MAX_OVERFLOW": "0",
+            "SQLALCHEMY_POOL_PRE_PING": "true",
+            "SQLALCHEMY_POOL_RECYCLE": "1800",
+        },
+    ):
+        settings = storage.sqlalchemy.EngineSettings.from_environment()
+
+    assert settings == storage.sqlalchemy.EngineSettings(
+        url="postgresql://localhost/acquiring",
+        pool_size=20,
+        max_overflow=0,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        query_cache_size=None,
+    )
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenAForkedProcess_whenGettingTheEngine_thenInheritedConnectionsAreDroppedWithoutClosingThem(
+    restore_engine_settings: None,
+) -> None:
+    storage.sqlalchemy.engine.configure(storage.sqlalchemy.EngineSettings(url="sqlite://"))
+    engine = storage.sqlalchemy.engine.get_engine()
+
+    with mock.patch("os.getpid", return_value=-1), mock.patch.object(engine, "dispose") as dispose:
+        assert storage.sqlalchemy.engine.get_engine() is engine
+        assert storage.sqlalchemy.engine.get_engine() is engine
+
+    dispose.assert_called_once_with(close=False)
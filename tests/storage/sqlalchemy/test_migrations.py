@@ -1 +1,141 @@
 # TODO Implement pytest-alembic
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from acquiring import utils
+from tests.storage.utils import skip_if_sqlalchemy_not_installed
+
+if utils.is_sqlalchemy_installed():
+    import alembic
+    import sqlalchemy
+    from alembic.config import Config
+    from sqlalchemy import orm
+
+    from acquiring.storage.sqlalchemy import models
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenDuplicateTransactions_whenMigratingToUniqueExternalIds_thenTheEarliestOfEachIsKeptAndTheRestArchived(
+    session: "orm.Session",
+) -> None:
+    configuration = Config("alembic.ini")
+    alembic.command.downgrade(configuration, "81cec72420c0")
+
+    now = datetime.now()
+    rows = [
+        ("first", "paypal", "WH-1", now),
+        ("second", "paypal", "WH-1", now + timedelta(seconds=1)),
+        ("third", "paypal", "WH-1", now + timedelta(seconds=2)),
+        ("other provider", "stripe", "WH-1", now + timedelta(seconds=3)),
+        ("other event", "paypal", "WH-2", now + timedelta(seconds=4)),
+    ]
+    # Newest first, so that the earliest is not the first one inserted
+    for id, provider_name, external_id, timestamp in reversed(rows):
+        session.execute(
+            sqlalchemy.text(
+                "INSERT INTO acquiring_transactions"
+                " (id, external_id, timestamp, raw_data, encoded_raw_data, provider_name, payment_method_id)"
+                " VALUES (:id, :external_id, :timestamp, '{}', :encoded_raw_data, :provider_name, :payment_method_id)"
+            ),
+            {
+                "id": id,
+                "encoded_raw_data": id.encode(),
+                "external_id": external_id,
+                "timestamp": timestamp,
+                "provider_name": provider_name,
+                "payment_method_id": str(uuid.uuid4()),
+            },
+        )
+    session.commit()
+
+    alembic.command.upgrade(configuration, "c3f1a9d2b7e4")
+
+    assert sorted(id for (id,) in session.execute(sqlalchemy.text("SELECT id FROM acquiring_transactions"))) == [
+        "first",
+        "other event",
+        "other provider",
+    ]
+    assert sorted(
+        session.execute(sqlalchemy.text("SELECT table_name, record_id FROM acquiring_archivedrecords")).fetchall()
+    ) == [("acquiring_transactions", "second"), ("acquiring_transactions", "third")]
+
+    alembic.command.downgrade(configuration, "81cec72420c0")
+
+    assert sorted(
+        session.execute(
+            sqlalchemy.text(
+                "SELECT id, provider_name, external_id, timestamp, encoded_raw_data FROM acquiring_transactions"
+            )
+        ).fetchall()
+    ) == sorted(
+        (id, provider_name, external_id, str(timestamp), id.encode())
+        for id, provider_name, external_id, timestamp in rows
+    )
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.django_db
+def test_givenDuplicateStartedOperationEvents_whenMigratingToUniqueStartedOperations_thenTheRestGetArchived(
+    session: "orm.Session",
+) -> None:
+    configuration = Config("alembic.ini")
+    alembic.command.downgrade(configuration, "c3f1a9d2b7e4")
+
+    now = datetime.now()
+    payment_method_id = str(uuid.uuid4())
+    rows = [
+        ("first", "pay", "started", now),
+        ("second", "pay", "started", now + timedelta(seconds=1)),
+        ("completed", "pay", "completed", now + timedelta(seconds=2)),
+        ("first refund", "refund", "started", now + timedelta(seconds=3)),
+        ("second refund", "refund", "started", now + timedelta(seconds=4)),
+    ]
+    for id, type, status, created_at in reversed(rows):
+        session.execute(
+            sqlalchemy.text(
+                "INSERT INTO acquiring_paymentoperations (id, created_at, type, status, payment_method_id)"
+                " VALUES (:id, :created_at, :type, :status, :payment_method_id)"
+            ),
+            {
+                "id": id,
+                "created_at": created_at,
+                "type": type,
+                "status": status,
+                "payment_method_id": payment_method_id,
+            },
+        )
+    session.commit()
+
+    alembic.command.upgrade(configuration, "d8e2b5c61f3a")
+
+    assert sorted(id for (id,) in session.execute(sqlalchemy.text("SELECT id FROM acquiring_paymentoperations"))) == [
+        "completed",
+        "first",
+        "first refund",
+        "second refund",
+    ]
+    assert session.execute(
+        sqlalchemy.text("SELECT table_name, record_id FROM acquiring_archivedrecords")
+    ).fetchall() == [("acquiring_paymentoperations", "second")]
+
+    alembic.command.downgrade(configuration, "c3f1a9d2b7e4")
+
+    assert sorted(
+        session.execute(
+            sqlalchemy.text("SELECT id, type, status, created_at FROM acquiring_paymentoperations")
+        ).fetchall()
+    ) == sorted((id, type, status, str(created_at)) for id, type, status, created_at in rows)
+
+
+@skip_if_sqlalchemy_not_installed
+@pytest.mark.parametrize("url", ["mysql://", "mssql://", "oracle://"])
+def test_givenADialectWithoutPartialIndexes_whenCreatingTheSchema_thenItFailsInsteadOfMakingEveryOperationUnique(
+    url: str,
+) -> None:
+    engine = sqlalchemy.create_mock_engine(url, lambda *args, **kwargs: None)
+
+    with pytest.raises(NotImplementedError, match="partial unique index"):
+        models.OperationEvent.__table__.create(engine, checkfirst=False)
@@ -0,0 +1,61 @@
+import pathlib
+
+import pytest
+from faker import Faker
+
+from acquiring import protocols, storage, utils
+
+fake = Faker()
+
+skip_if_zstandard_not_installed = pytest.mark.skipif(
+    not utils.is_zstandard_installed(), reason="zstandard is not installed"
+)
+
+
+@pytest.mark.parametrize(
+    "codec",
+    [
+        storage.codecs.PlainCodec(),
+        storage.codecs.GzipCodec(),
+        pytest.param(storage.codecs.ZstdCodec(), marks=skip_if_zstandard_not_installed),
+    ],
+)
+def test_givenRawData_whenEncodedAndDecodedWithACodec_thenTheSameRawDataIsReturned(
+    codec: protocols.RawDataCodec,
+) -> None:
+    raw_data = fake.json(num_rows=50)
+
+    assert codec.decode(codec.encode(raw_data)) == raw_data
+
+
+def test_givenRawDataLargerThanTheCap_whenEncodedWithAStore_thenItSpillsOverIntoTheStore(
+    tmp_path: pathlib.Path,
+) -> None:
+    raw_data = fake.json(num_rows=500)
+    policy = storage.codecs.RawDataPolicy(
+        codec=storage.codecs.PlainCodec(),
+        max_inline_size=1024,
+        store=storage.codecs.FileSystemRawDataStore(directory=tmp_path),
+    )
+
+    encoded_raw_data = policy.encode(raw_data)
+
+    assert encoded_raw_data.data is None
+    assert encoded_raw_data.reference is not None
+    assert (tmp_path / encoded_raw_data.reference).read_text() == raw_data
+    assert policy.decode(encoded_raw_data) == raw_data
+
+    small_encoded_raw_data = policy.encode("{}")
+    assert small_encoded_raw_data == storage.codecs.EncodedRawData(codec="plain", data=b"{}")
+
+
+def test_givenRawDataEncodedWithAnotherCodec_whenDecoded_thenTheCodecItWasEncodedWithIsUsed() -> None:
+    raw_data = fake.json()
+    encoded_raw_data = storage.codecs.RawDataPolicy(codec=storage.codecs.GzipCodec()).encode(raw_data)
+
+    assert storage.codecs.RawDataPolicy(codec=storage.codecs.PlainCodec()).decode(encoded_raw_data) == raw_data
+
+
+def test_givenRawDataThatSpilledOver_whenDecodedWithoutAStore_thenValueErrorIsRaised() -> None:
+    with pytest.raises(ValueError):
+        storage.codecs.RawDataPolicy().decode(storage.codecs.EncodedRawData(codec="gzip", reference="missing"))
@@ -0,0 +1,46 @@
+import uuid
+
+import pytest
+
+from acquiring import storage, utils
+from tests.storage.utils import skip_if_django_not_installed, skip_if_sqlalchemy_not_installed
+
+if utils.is_django_installed():
+    from django.test import override_settings
+
+if utils.is_sqlalchemy_installed():
+    import acquiring.storage.sqlalchemy.models
+
+
+def test_givenManyUuid7_whenMadeOneAfterTheOther_thenTheyKeepIncreasing() -> None:
+    ids = [storage.ids.uuid7() for _ in range(10_000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(id.version == 7 and id.variant == uuid.RFC_4122 for id in ids)
+
+
+def test_givenAGeneratorName_whenGettingTheGenerator_thenItIsFoundByNameOrDottedPath() -> None:
+    assert storage.ids.generator("uuid7") is storage.ids.uuid7
+    assert storage.ids.generator("uuid.uuid1") is uuid.uuid1
+
+    with pytest.raises(ValueError):
+        storage.ids.generator("uuid8")
+
+
+@skip_if_django_not_installed
+def test_givenTheUuid7Setting_whenCreatingADjangoModel_thenItsIdIsTimeOrdered() -> None:
+    assert storage.django.models.PaymentAttempt().id.version == 4
+
+    with override_settings(ACQUIRING_ID_GENERATOR="uuid7"):
+        assert storage.django.models.PaymentAttempt().id.version == 7
+
+
+@skip_if_sqlalchemy_not_installed
+def test_givenTheUuid7EnvironmentVariable_whenCreatingASqlAlchemyId_thenItIsTimeOrdered(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert acquiring.storage.sqlalchemy.models.u().version == 4
+
+    monkeypatch.setenv("ACQUIRING_ID_GENERATOR", "uuid7")
+    assert acquiring.storage.sqlalchemy.models.u().version == 7
@@ -1,5 +1,7 @@
 """Decorators to conditionally run tests depending on which ORM loads"""
 
+import importlib.util
+
 import pytest
 
 from acquiring import utils
@@ -8,3 +10,6 @@ skip_if_django_not_installed = pytest.mark.skipif(not utils.is_django_installed(
 skip_if_sqlalchemy_not_installed = pytest.mark.skipif(
     not utils.is_sqlalchemy_installed(), reason="sqlalchemy is not installed"
 )
+skip_if_aiosqlite_not_installed = pytest.mark.skipif(
+    not importlib.util.find_spec("aiosqlite"), reason="aiosqlite is not installed"
+)